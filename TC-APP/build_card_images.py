@@ -0,0 +1,273 @@
+"""
+Card image derivative builder.
+
+Turns the full-size card PNGs in downloads/ into web derivatives under
+frontend/public/cards/: several widths in WebP and AVIF, plus a tiny blurred
+placeholder inlined as a data URI. Work is spread over a process pool and
+unchanged inputs are skipped using the content hashes recorded in the manifest,
+so re-runs only touch new or edited cards.
+
+    python build_card_images.py
+    python build_card_images.py --workers 8 --formats webp
+    python build_card_images.py --force          # rebuild everything
+
+The manifest (frontend/public/cards/manifest.json) is what the frontend reads:
+
+    {
+      "images": {
+        "shohei_ohtani_front.png": {
+          "card": "shohei_ohtani", "side": "front", "width": 1024, "height": 1434,
+          "placeholder": "data:image/webp;base64,...",
+          "variants": {"avif": [{"width": 320, "height": 448, "src": "/cards/...-320.avif", "bytes": 9120}, ...],
+                       "webp": [...]},
+          "source_hash": "..."
+        }
+      },
+      "cards": {"shohei_ohtani": {"front": "shohei_ohtani_front.png", "back": "shohei_ohtani_back.png"}}
+    }
+
+Requires Pillow (AVIF needs Pillow >= 11.3 built with libavif; otherwise AVIF is skipped).
+"""
+import argparse
+import base64
+import hashlib
+import io
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+# --- Settings ---
+SOURCE_DIR = "downloads"
+OUTPUT_DIR = "frontend/public/cards"
+PUBLIC_PREFIX = "/cards"
+MANIFEST_NAME = "manifest.json"
+
+# Target widths in px (never upscaled; the source width is used if it is smaller)
+WIDTHS = [160, 320, 640, 1080]
+
+# Encoder options per output format
+FORMATS = {
+    "avif": {"quality": 50, "speed": 6},
+    "webp": {"quality": 80, "method": 4},
+}
+
+# Blurred placeholder (inlined into the manifest)
+PLACEHOLDER_WIDTH = 16
+PLACEHOLDER_QUALITY = 30
+
+SOURCE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp")
+
+# Bump when the resize/encode logic changes so every image is rebuilt
+PIPELINE_VERSION = 1
+
+# "<card>_front_1768266203603.png" / "<card>_back_final.png" -> card, side
+SIDE_PATTERN = re.compile(r"^(?P<card>.+?)_(?P<side>front|back)(?:_.*)?$")
+
+
+def settings_hash(formats, widths, placeholder):
+    blob = json.dumps([PIPELINE_VERSION, {f: FORMATS[f] for f in formats}, widths, placeholder,
+                       PLACEHOLDER_WIDTH, PLACEHOLDER_QUALITY], sort_keys=True)
+    return hashlib.sha256(blob.encode()).hexdigest()[:16]
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def parse_name(filename):
+    stem = os.path.splitext(filename)[0]
+    match = SIDE_PATTERN.match(stem)
+    if match:
+        return match.group("card"), match.group("side")
+    # Wide promo images (e.g. the 16:9 ultimate_phantom_ace) have no side
+    return stem, "main"
+
+
+# --- Worker (runs in a child process) ---
+def build_derivatives(source_path, source_hash, formats, widths, placeholder, output_dir):
+    from PIL import Image, ImageFilter
+
+    filename = os.path.basename(source_path)
+    card, side = parse_name(filename)
+    stem = f"{os.path.splitext(filename)[0]}-{source_hash[:8]}"
+
+    with Image.open(source_path) as img:
+        img.load()
+        if img.mode not in ("RGB", "RGBA"):
+            img = img.convert("RGBA" if img.mode in ("LA", "PA") or "transparency" in img.info else "RGB")
+        src_w, src_h = img.size
+
+        targets = sorted({min(w, src_w) for w in widths})
+        variants = {fmt: [] for fmt in formats}
+        for width in targets:
+            height = round(src_h * width / src_w)
+            # reducing_gap makes large downscales much faster with no visible loss
+            resized = img if width == src_w else img.resize((width, height), Image.LANCZOS, reducing_gap=3.0)
+            for fmt in formats:
+                name = f"{stem}-{width}.{fmt}"
+                path = os.path.join(output_dir, name)
+                resized.save(path, fmt.upper(), **FORMATS[fmt])
+                variants[fmt].append({
+                    "width": width,
+                    "height": height,
+                    "src": f"{PUBLIC_PREFIX}/{name}",
+                    "bytes": os.path.getsize(path),
+                })
+
+        entry = {
+            "card": card,
+            "side": side,
+            "width": src_w,
+            "height": src_h,
+            "variants": variants,
+            "source_hash": source_hash,
+        }
+        if placeholder:
+            tiny_h = max(1, round(src_h * PLACEHOLDER_WIDTH / src_w))
+            tiny = img.resize((PLACEHOLDER_WIDTH, tiny_h), Image.BILINEAR).filter(ImageFilter.GaussianBlur(1))
+            buf = io.BytesIO()
+            tiny.save(buf, "WEBP", quality=PLACEHOLDER_QUALITY)
+            entry["placeholder"] = "data:image/webp;base64," + base64.b64encode(buf.getvalue()).decode("ascii")
+    return filename, entry
+
+
+# --- Driver ---
+def load_manifest(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def write_manifest(path, manifest):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def _outputs_exist(entry, output_dir):
+    return all(
+        os.path.exists(os.path.join(output_dir, v["src"].rsplit("/", 1)[-1]))
+        for variants in entry["variants"].values() for v in variants
+    )
+
+
+def available_formats(requested):
+    from PIL import features
+
+    usable = []
+    for fmt in requested:
+        if features.check(fmt):
+            usable.append(fmt)
+        else:
+            print(f"Warning: Pillow has no {fmt.upper()} support; skipping {fmt}")
+    return usable
+
+
+def build(source_dir=SOURCE_DIR, output_dir=OUTPUT_DIR, formats=None, widths=None, placeholder=True,
+          workers=None, force=False):
+    formats = available_formats(formats or list(FORMATS))
+    widths = widths or WIDTHS
+    if not formats:
+        print("Error: no usable output format")
+        sys.exit(1)
+    os.makedirs(output_dir, exist_ok=True)
+    manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+    previous = load_manifest(manifest_path)
+    current_settings = settings_hash(formats, widths, placeholder)
+    reuse = not force and previous.get("settings_hash") == current_settings
+    old_images = previous.get("images", {}) if reuse else {}
+
+    sources = sorted(f for f in os.listdir(source_dir) if f.lower().endswith(SOURCE_EXTENSIONS))
+    started = time.monotonic()
+    # Hashing is I/O bound and hashlib releases the GIL, so threads are enough here
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        hashes = dict(zip(sources, pool.map(file_hash, (os.path.join(source_dir, f) for f in sources))))
+
+    images, todo = {}, []
+    for filename in sources:
+        old = old_images.get(filename)
+        if old and old["source_hash"] == hashes[filename] and _outputs_exist(old, output_dir):
+            images[filename] = old
+        else:
+            todo.append(filename)
+    print(f"{len(sources)} source images: {len(images)} unchanged, {len(todo)} to build "
+          f"({', '.join(formats)} @ {widths})")
+
+    failed = []
+    if todo:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                pool.submit(build_derivatives, os.path.join(source_dir, f), hashes[f], formats, widths,
+                            placeholder, output_dir): f
+                for f in todo
+            }
+            for done, future in enumerate(as_completed(futures), 1):
+                filename = futures[future]
+                try:
+                    _, entry = future.result()
+                    images[filename] = entry
+                    print(f"  [{done}/{len(todo)}] {filename}")
+                except Exception as e:
+                    failed.append(filename)
+                    print(f"  [{done}/{len(todo)}] Error processing {filename}: {e}")
+                    # Keep serving the previous derivatives if there are any
+                    if filename in old_images and _outputs_exist(old_images[filename], output_dir):
+                        images[filename] = old_images[filename]
+
+    # Remove derivatives that no manifest entry points at any more (edited or deleted sources)
+    referenced = {
+        v["src"].rsplit("/", 1)[-1]
+        for entry in images.values() for variants in entry["variants"].values() for v in variants
+    }
+    removed = 0
+    for name in os.listdir(output_dir):
+        if name != MANIFEST_NAME and name.endswith(tuple(f".{fmt}" for fmt in FORMATS)) and name not in referenced:
+            os.remove(os.path.join(output_dir, name))
+            removed += 1
+
+    cards = {}
+    for filename, entry in sorted(images.items()):
+        cards.setdefault(entry["card"], {})[entry["side"]] = filename
+    write_manifest(manifest_path, {
+        "version": PIPELINE_VERSION,
+        "settings_hash": current_settings,
+        "formats": formats,
+        "widths": widths,
+        "images": images,
+        "cards": cards,
+    })
+
+    source_bytes = sum(os.path.getsize(os.path.join(source_dir, f)) for f in images)
+    print(f"Done in {time.monotonic() - started:.1f}s: built {len(todo) - len(failed)}, "
+          f"reused {len(sources) - len(todo)}, failed {len(failed)}, removed {removed} stale files")
+    for fmt in formats:
+        # Compare the widest derivative (what a detail page would load) against the source PNGs
+        largest = sum(max(e["variants"][fmt], key=lambda v: v["width"])["bytes"] for e in images.values())
+        print(f"  {fmt}: {source_bytes / 1e6:.1f} MB source -> {largest / 1e6:.1f} MB at max width")
+    return failed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build web derivatives for card images")
+    parser.add_argument("--source", default=SOURCE_DIR)
+    parser.add_argument("--output", default=OUTPUT_DIR)
+    parser.add_argument("--formats", nargs="+", choices=list(FORMATS), help="default: all")
+    parser.add_argument("--widths", nargs="+", type=int, help=f"default: {WIDTHS}")
+    parser.add_argument("--no-placeholder", action="store_true", help="skip blurred placeholders")
+    parser.add_argument("--workers", type=int, help="process pool size (default: CPU count)")
+    parser.add_argument("--force", action="store_true", help="ignore the manifest and rebuild everything")
+    args = parser.parse_args()
+
+    failed = build(args.source, args.output, args.formats, args.widths, not args.no_placeholder,
+                   args.workers, args.force)
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,393 @@
+"""
+Perceptual-hash index for card images.
+
+Computes a 64-bit DCT perceptual hash (pHash) for each front/back image and keeps
+them in a multi-index hash table, so near-duplicate and same-card lookups probe
+only a few hundred table keys instead of scanning the index (well under a millisecond).
+
+    python card_hash_index.py build                  # index downloads/ (incremental)
+    python card_hash_index.py dups                   # list near-duplicate groups
+    python card_hash_index.py query photo.jpg        # match one image
+    python card_hash_index.py serve --port 8790      # HTTP lookup for the analyze-card route
+
+The analyze-card API route calls POST /match before sending an upload to the AI
+model (set CARD_HASH_INDEX_URL in frontend/.env.local), and POST /add afterwards
+so the next upload of the same card is answered from the stored analysis. An /add
+that names a card (card, side) replaces that card's previous image, as does a rebuilt
+source file, so stale hashes stop matching.
+
+Requires Pillow and NumPy.
+"""
+import argparse
+import base64
+import io
+import itertools
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+# --- Settings ---
+INDEX_PATH = "card_hashes.jsonl"
+SOURCE_DIR = "downloads"
+SOURCE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp")
+
+# Hamming distance thresholds (out of 64 bits)
+DUPLICATE_DISTANCE = 4    # same image re-uploaded / re-exported
+SAME_CARD_DISTANCE = 10   # same card, different scan or photo
+
+# Rewrite the index file once this many replaced lines (and this share of the file) are dead
+COMPACT_MIN_STALE = 1000
+COMPACT_STALE_RATIO = 0.25
+
+SERVER_HOST = "127.0.0.1"
+SERVER_PORT = 8790
+MAX_MATCHES = 5
+
+HASH_SIZE = 8
+DCT_SIZE = 32
+
+
+def _dct_matrix(n):
+    k = np.arange(n)
+    m = np.cos(np.pi * (2 * k[None, :] + 1) * k[:, None] / (2 * n)) * np.sqrt(2.0 / n)
+    m[0] /= np.sqrt(2.0)
+    return m
+
+
+_DCT = _dct_matrix(DCT_SIZE)
+
+
+def phash(image):
+    """64-bit pHash: low-frequency DCT coefficients of a 32x32 grayscale thumbnail vs their median."""
+    from PIL import Image
+
+    gray = image.convert("L").resize((DCT_SIZE, DCT_SIZE), Image.LANCZOS, reducing_gap=2.0)
+    pixels = np.asarray(gray, dtype=np.float64)
+    low = (_DCT @ pixels @ _DCT.T)[:HASH_SIZE, :HASH_SIZE].flatten()
+    # Skip the DC term when taking the median so overall brightness does not matter
+    bits = low > np.median(low[1:])
+    return int("".join("1" if b else "0" for b in bits), 2)
+
+
+def phash_file(path):
+    from PIL import Image
+
+    with Image.open(path) as img:
+        return phash(img)
+
+
+def phash_bytes(data):
+    from PIL import Image
+
+    with Image.open(io.BytesIO(data)) as img:
+        return phash(img)
+
+
+def hamming(a, b):
+    return (a ^ b).bit_count()
+
+
+class MultiIndexHashTable:
+    """
+    Multi-index hashing: the 64-bit hash is split into CHUNKS 16-bit pieces, each with its
+    own exact-match table. If two hashes differ in at most r bits, at least one piece differs
+    in at most r // CHUNKS bits (pigeonhole), so a query only probes the few table keys near
+    each of its pieces instead of walking the whole index.
+    """
+
+    CHUNKS = 4
+    CHUNK_BITS = 16
+
+    def __init__(self):
+        self.tables = [{} for _ in range(self.CHUNKS)]
+        self.hashes = []
+        self._flip_masks = {}
+
+    def _pieces(self, value):
+        mask = (1 << self.CHUNK_BITS) - 1
+        return [(value >> (i * self.CHUNK_BITS)) & mask for i in range(self.CHUNKS)]
+
+    def _masks(self, radius):
+        # Every 16-bit mask with at most `radius` bits set (137 masks for radius 2)
+        if radius not in self._flip_masks:
+            self._flip_masks[radius] = [
+                sum(1 << b for b in bits)
+                for r in range(radius + 1)
+                for bits in itertools.combinations(range(self.CHUNK_BITS), r)
+            ]
+        return self._flip_masks[radius]
+
+    def add(self, value, entry_id):
+        self.hashes.append(value)
+        for table, piece in zip(self.tables, self._pieces(value)):
+            table.setdefault(piece, []).append(entry_id)
+
+    def remove(self, entry_id):
+        for table, piece in zip(self.tables, self._pieces(self.hashes[entry_id])):
+            bucket = table.get(piece)
+            if bucket and entry_id in bucket:
+                bucket.remove(entry_id)
+                if not bucket:
+                    del table[piece]
+
+    def search(self, value, radius):
+        """All (distance, entry_id) within radius, nearest first."""
+        masks = self._masks(radius // self.CHUNKS)
+        candidates = set()
+        for table, piece in zip(self.tables, self._pieces(value)):
+            for m in masks:
+                bucket = table.get(piece ^ m)
+                if bucket:
+                    candidates.update(bucket)
+        found = []
+        for entry_id in candidates:
+            d = hamming(value, self.hashes[entry_id])
+            if d <= radius:
+                found.append((d, entry_id))
+        found.sort()
+        return found
+
+
+def parse_name(filename):
+    """"<card>_front_1768266203603.png" -> ("<card>", "front"); files without a side -> "main"."""
+    stem = os.path.splitext(os.path.basename(filename))[0]
+    for side in ("front", "back"):
+        marker = f"_{side}"
+        if marker in stem:
+            return stem.split(marker, 1)[0], side
+    return stem, "main"
+
+
+def entry_key(entry):
+    """
+    Identity of an indexed image: the source file, or the card id and side.
+    A newer entry with the same key replaces the older one. Entries with neither have no key.
+    """
+    if entry.get("source"):
+        return ("source", entry["source"])
+    if entry.get("card"):
+        return ("card", entry["card"], entry.get("side"))
+    return None
+
+
+class CardHashIndex:
+    """
+    JSONL store of image hashes with an in-memory multi-index table on top.
+    Adding an image for a card that is already indexed replaces the old entry (the old hash
+    stops matching). The file stays append-only, with the last line for a key winning on load;
+    it is rewritten without the replaced lines once they pile up.
+    """
+
+    def __init__(self, path=INDEX_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        self.entries = []          # replaced entries become None so entry ids stay stable
+        self.by_key = {}
+        self.table = MultiIndexHashTable()
+        self.replaced = 0
+        self.file_lines = 0
+        self.stale_lines = 0
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        self._insert(json.loads(line))
+                        self.file_lines += 1
+
+    def __len__(self):
+        return len(self.entries) - self.replaced
+
+    def _insert(self, entry):
+        entry_id = len(self.entries)
+        entry["hash"] = int(entry["hash"], 16) if isinstance(entry["hash"], str) else entry["hash"]
+        key = entry_key(entry)
+        if key is not None and key in self.by_key:
+            old_id = self.by_key[key]
+            self.table.remove(old_id)
+            self.entries[old_id] = None
+            self.replaced += 1
+            self.stale_lines += 1
+        self.entries.append(entry)
+        self.table.add(entry["hash"], entry_id)
+        if key is not None:
+            self.by_key[key] = entry_id
+        return entry_id
+
+    def add(self, value, **fields):
+        entry = dict(fields, hash=value)
+        with self.lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(self._line(entry))
+            self.file_lines += 1
+            self._insert(entry)
+            if self.stale_lines >= COMPACT_MIN_STALE and self.stale_lines >= self.file_lines * COMPACT_STALE_RATIO:
+                self._compact()
+        return entry
+
+    @staticmethod
+    def _line(entry):
+        return json.dumps(dict(entry, hash=f"{entry['hash']:016x}"), ensure_ascii=False) + "\n"
+
+    def _compact(self):
+        # Rewrite the file with live entries only (atomic replace; called with the lock held)
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            for entry in self.entries:
+                if entry is not None:
+                    f.write(self._line(entry))
+        os.replace(tmp, self.path)
+        self.file_lines = len(self)
+        self.stale_lines = 0
+
+    def live_entries(self):
+        """(entry_id, entry) for every entry that has not been replaced."""
+        return [(i, e) for i, e in enumerate(self.entries) if e is not None]
+
+    def sources(self):
+        return {e["source"]: e for _, e in self.live_entries() if e.get("source")}
+
+    def match(self, value, radius=SAME_CARD_DISTANCE, side=None, limit=MAX_MATCHES):
+        with self.lock:
+            matches = []
+            for distance, entry_id in self.table.search(value, radius):
+                entry = self.entries[entry_id]
+                if side and entry.get("side") not in (side, None):
+                    continue
+                matches.append(dict(
+                    {k: v for k, v in entry.items() if k != "hash"},
+                    hash=f"{entry['hash']:016x}",
+                    distance=distance,
+                    kind="duplicate" if distance <= DUPLICATE_DISTANCE else "same_card",
+                ))
+                if len(matches) >= limit:
+                    break
+            return matches
+
+
+# --- Commands ---
+def build(index, source_dir=SOURCE_DIR):
+    known = index.sources()
+    added = 0
+    started = time.monotonic()
+    for filename in sorted(os.listdir(source_dir)):
+        if not filename.lower().endswith(SOURCE_EXTENSIONS):
+            continue
+        path = os.path.join(source_dir, filename)
+        stat = os.stat(path)
+        old = known.get(path)
+        if old and old.get("size") == stat.st_size and old.get("mtime") == int(stat.st_mtime):
+            continue
+        card, side = parse_name(filename)
+        index.add(phash_file(path), source=path, card=card, side=side, size=stat.st_size, mtime=int(stat.st_mtime))
+        added += 1
+    print(f"Indexed {added} new images in {time.monotonic() - started:.1f}s ({len(index)} total)")
+
+
+def report_duplicates(index, radius=SAME_CARD_DISTANCE):
+    seen = set()
+    for entry_id, entry in index.live_entries():
+        if entry_id in seen:
+            continue
+        group = [(d, i) for d, i in index.table.search(entry["hash"], radius) if i != entry_id and i not in seen]
+        if not group:
+            continue
+        seen.update(i for _, i in group)
+        print(f"{entry.get('source') or entry.get('card')}")
+        for d, i in group:
+            other = index.entries[i]
+            kind = "duplicate" if d <= DUPLICATE_DISTANCE else "same card"
+            print(f"  {d:2d} bits  {kind:9}  {other.get('source') or other.get('card')}")
+
+
+def _decode_image(value):
+    # Accept plain base64 or a data URL ("data:image/jpeg;base64,...")
+    if value.startswith("data:"):
+        value = value.split(",", 1)[1]
+    return base64.b64decode(value)
+
+
+class IndexHandler(BaseHTTPRequestHandler):
+    index = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, body):
+        payload = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        if self.path == "/stats":
+            self._send_json(200, {"entries": len(self.index)})
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            value = phash_bytes(_decode_image(body["image"]))
+        except Exception as e:
+            self._send_json(400, {"error": f"bad request: {e}"})
+            return
+
+        if self.path == "/match":
+            started = time.perf_counter()
+            matches = self.index.match(value, side=body.get("side"))
+            self._send_json(200, {
+                "hash": f"{value:016x}",
+                "matches": matches,
+                "lookup_us": round((time.perf_counter() - started) * 1e6, 1),
+            })
+        elif self.path == "/add":
+            fields = {k: body[k] for k in ("card", "side", "analysis", "listing_id") if body.get(k) is not None}
+            self.index.add(value, **fields)
+            self._send_json(200, {"hash": f"{value:016x}"})
+        else:
+            self._send_json(404, {"error": "not found"})
+
+
+def make_server(index, host=SERVER_HOST, port=SERVER_PORT):
+    handler = type("BoundIndexHandler", (IndexHandler,), {"index": index})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Perceptual-hash index for card images")
+    parser.add_argument("--index", default=INDEX_PATH)
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("build", help="hash new or changed images in a directory")
+    p.add_argument("--source", default=SOURCE_DIR)
+    sub.add_parser("dups", help="print near-duplicate groups")
+    p = sub.add_parser("query", help="find matches for one image")
+    p.add_argument("image")
+    p.add_argument("--radius", type=int, default=SAME_CARD_DISTANCE)
+    p = sub.add_parser("serve", help="serve /match and /add over HTTP")
+    p.add_argument("--host", default=SERVER_HOST)
+    p.add_argument("--port", type=int, default=SERVER_PORT)
+    args = parser.parse_args()
+
+    index = CardHashIndex(args.index)
+    if args.command == "build":
+        build(index, args.source)
+    elif args.command == "dups":
+        report_duplicates(index)
+    elif args.command == "query":
+        value = phash_file(args.image)
+        started = time.perf_counter()
+        matches = index.match(value, radius=args.radius)
+        elapsed = (time.perf_counter() - started) * 1e6
+        print(f"hash {value:016x}: {len(matches)} matches in {elapsed:.0f}us")
+        for m in matches:
+            print(f"  {m['distance']:2d} bits  {m['kind']:9}  {m.get('source') or m.get('card')}")
+    elif args.command == "serve":
+        server = make_server(index, args.host, args.port)
+        print(f"Card hash index: {len(index)} images, listening on http://{args.host}:{args.port}")
+        server.serve_forever()
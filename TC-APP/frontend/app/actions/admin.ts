@@ -29,6 +29,21 @@ export async function createLiveMoment(formData: FormData) {
     const scoreHome = formData.get('scoreHome') as string;
     const progress = formData.get('progress') as string;
 
+    // Related cards resolved by the watcher bot's catalog index
+    const relatedCardIds = ((formData.get('relatedCardIds') as string) || '')
+        .split(',')
+        .map((id) => id.trim())
+        .filter(Boolean);
+
+    // Moments the watcher bot's coalescer folded into this one
+    let mergedMoments: unknown[] = [];
+    try {
+        const parsed = JSON.parse((formData.get('mergedMoments') as string) || '[]');
+        if (Array.isArray(parsed)) mergedMoments = parsed;
+    } catch {
+        // Ignore a malformed value rather than failing the whole insert
+    }
+
     let matchResult = null;
     if (teamVisitor && teamHome) {
         matchResult = `${teamVisitor} ${scoreVisitor || '0'} - ${scoreHome || '0'} ${teamHome} (${progress || 'Pre-Game'})`;
@@ -47,7 +62,8 @@ export async function createLiveMoment(formData: FormData) {
             intensity,
             description,
             image_url: imageUrl,
-            match_result: matchResult
+            match_result: matchResult,
+            metadata: { related_card_ids: relatedCardIds, merged_moments: mergedMoments }
         });
 
     if (error) throw new Error(error.message);
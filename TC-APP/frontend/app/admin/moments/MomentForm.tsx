@@ -21,6 +21,8 @@ type MomentFormProps = {
         scoreH: string;
         progress: string;
         type: string;
+        relatedCardIds?: string;
+        mergedMoments?: string;
     };
     isAutoFilled?: boolean;
 };
@@ -160,6 +162,12 @@ export default function MomentForm({ editingMoment, defaultValues, isAutoFilled
 
     return (
         <form action={handleSubmit} className="space-y-4">
+            {!editingMoment && defaultValues.relatedCardIds && (
+                <input type="hidden" name="relatedCardIds" value={defaultValues.relatedCardIds} />
+            )}
+            {!editingMoment && defaultValues.mergedMoments && (
+                <input type="hidden" name="mergedMoments" value={defaultValues.mergedMoments} />
+            )}
             {uploadError && (
                 <div className="bg-red-500/10 border border-red-500 text-red-400 p-3 rounded text-sm">
                     {uploadError}
@@ -68,6 +68,10 @@ export default async function AdminMomentsPage({
     // User requested defaults for these:
     const extType = typeof params?.type === 'string' ? params.type : '';
     const extProgress = typeof params?.progress === 'string' ? params.progress : '';
+    // Related card ids attached by the watcher bot (comma separated card_catalogs ids)
+    const extRelatedCardIds = typeof params?.relatedCardIds === 'string' ? params.relatedCardIds : '';
+    // Moments the watcher bot merged into this one (JSON array of {moment_key, event_type, intensity})
+    const extMergedMoments = typeof params?.mergedMoments === 'string' ? params.mergedMoments : '';
 
     // Check if any *meaningful* params are present for the banner (checking keys directly avoids default vals triggering it)
     const hasExternalParams = !editId && (
@@ -139,7 +143,9 @@ export default async function AdminMomentsPage({
                             scoreV: defaultScoreV,
                             scoreH: defaultScoreH,
                             progress: defaultProgress,
-                            type: extType
+                            type: extType,
+                            relatedCardIds: extRelatedCardIds,
+                            mergedMoments: extMergedMoments
                         }}
                         isAutoFilled={isAutoFilled}
                     />
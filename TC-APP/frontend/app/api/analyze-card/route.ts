@@ -6,9 +6,46 @@ const google = createGoogleGenerativeAI({
     apiKey: process.env.GOOGLE_GENERATIVE_AI_API_KEY,
 });
 
+// Optional perceptual-hash index (TC-APP/card_hash_index.py serve). When set, uploads of a
+// card that was already analyzed are answered from the stored result without calling Gemini.
+const CARD_HASH_INDEX_URL = process.env.CARD_HASH_INDEX_URL;
+const CARD_HASH_TIMEOUT_MS = 500;
+
+async function findCachedAnalysis(image: string) {
+    if (!CARD_HASH_INDEX_URL) return null;
+    try {
+        const res = await fetch(`${CARD_HASH_INDEX_URL}/match`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ image }),
+            signal: AbortSignal.timeout(CARD_HASH_TIMEOUT_MS),
+        });
+        if (!res.ok) return null;
+        const { matches } = await res.json();
+        // Only reuse near-identical images; "same_card" hits may be a different parallel or grade
+        const hit = matches?.find((m: any) => m.kind === 'duplicate' && m.analysis);
+        return hit ? hit.analysis : null;
+    } catch (error) {
+        // The index is an optimization only; fall through to the model
+        console.warn('Card hash index unavailable:', error);
+        return null;
+    }
+}
+
+// With a card id the index replaces that card's previous image instead of keeping both
+function rememberAnalysis(image: string, analysis: unknown, card?: string, side?: string) {
+    if (!CARD_HASH_INDEX_URL) return;
+    fetch(`${CARD_HASH_INDEX_URL}/add`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ image, analysis, card, side }),
+        signal: AbortSignal.timeout(CARD_HASH_TIMEOUT_MS),
+    }).catch((error) => console.warn('Card hash index add failed:', error));
+}
+
 export async function POST(req: Request) {
     try {
-        const { image } = await req.json();
+        const { image, cardId, side } = await req.json();
 
         if (!image) {
             return new Response('No image provided', { status: 400 });
@@ -17,6 +54,11 @@ export async function POST(req: Request) {
         // Remove data URL prefix if present (e.g., "data:image/jpeg;base64,")
         const base64Image = image.replace(/^data:image\/[a-z]+;base64,/, '');
 
+        const cached = await findCachedAnalysis(base64Image);
+        if (cached) {
+            return Response.json(cached);
+        }
+
         const fieldSchema = z.object({
             value: z.string().nullable(),
             confidence: z.enum(['High', 'Medium', 'Low']),
@@ -63,6 +105,7 @@ export async function POST(req: Request) {
             ],
         });
 
+        rememberAnalysis(base64Image, object, cardId, side);
         return Response.json(object);
     } catch (error: any) {
         console.error('Gemini Analysis Error:', error);
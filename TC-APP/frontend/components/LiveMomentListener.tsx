@@ -15,7 +15,7 @@ export default function LiveMomentListener() {
     ));
 
     useEffect(() => {
-        // Subscribe to INSERT events on 'live_moments' table
+        // Subscribe to INSERT (and UPDATE) events on 'live_moments' table
         const channel = supabase
             .channel("live-moments-channel")
             .on(
@@ -37,6 +37,20 @@ export default function LiveMomentListener() {
                     }, 8000);
                 }
             )
+            .on(
+                "postgres_changes",
+                {
+                    event: "UPDATE",
+                    schema: "public",
+                    table: "live_moments",
+                },
+                (payload) => {
+                    // Two-phase publish: the watcher bot inserts a templated moment first and
+                    // rewrites the same row with the AI text. Swap it in if that toast is still up.
+                    const updated = payload.new as LiveMomentData;
+                    setMoment((current) => (current && current.id === updated.id ? updated : current));
+                }
+            )
             .subscribe();
 
         // Cleanup subscription
@@ -0,0 +1,67 @@
+-- ==============================================================================
+-- Migration: 03_add_card_catalog_natural_key
+-- Description: card_catalogs に自然キーの一意制約を追加し、seed_catalog.py の一括 upsert を可能にする
+-- Requires: PostgreSQL 15 以上 (一意インデックスの NULLS NOT DISTINCT を使うため)
+-- ==============================================================================
+
+-- 0. バージョン確認 (14 以下では途中まで流れないよう、何も変更せずに止める)
+DO $$
+BEGIN
+    IF current_setting('server_version_num')::int < 150000 THEN
+        RAISE EXCEPTION '03_add_card_catalog_natural_key は PostgreSQL 15 以上が必要です (現在: %)',
+            current_setting('server_version');
+    END IF;
+END $$;
+
+-- 1. 重複グループごとに残す行を決める (同じカードは最も古い行を残す)
+-- PARTITION BY は NULL 同士を同じグループにまとめるので、NULLS NOT DISTINCT の一意性と一致する
+CREATE TEMP TABLE card_catalog_survivors AS
+SELECT id, keep_id
+FROM (
+    SELECT id,
+           first_value(id) OVER (
+               PARTITION BY manufacturer, year, series_name, card_number, player_name
+               ORDER BY created_at, id
+           ) AS keep_id
+    FROM public.card_catalogs
+) ranked
+WHERE id <> keep_id;
+
+-- 2. 削除する行を参照している出品/コレクションを、残す行へ付け替える
+-- (catalog_id は frontend/migrations/06 で削除済みの環境もあるため、列がある場合だけ)
+DO $$
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM information_schema.columns
+        WHERE table_schema = 'public' AND table_name = 'listing_items' AND column_name = 'catalog_id'
+    ) THEN
+        UPDATE public.listing_items li
+        SET catalog_id = s.keep_id
+        FROM card_catalog_survivors s
+        WHERE li.catalog_id = s.id;
+    END IF;
+
+    IF EXISTS (
+        SELECT 1 FROM information_schema.columns
+        WHERE table_schema = 'public' AND table_name = 'user_collections' AND column_name = 'catalog_id'
+    ) THEN
+        UPDATE public.user_collections uc
+        SET catalog_id = s.keep_id
+        FROM card_catalog_survivors s
+        WHERE uc.catalog_id = s.id;
+    END IF;
+END $$;
+
+-- 3. 参照の無くなった重複行を削除
+DELETE FROM public.card_catalogs c
+USING card_catalog_survivors s
+WHERE c.id = s.id;
+
+DROP TABLE card_catalog_survivors;
+
+-- 4. 一意インデックス
+-- series_name / card_number / year は NULL を許すため NULLS NOT DISTINCT で
+-- NULL 同士も同一キーとして扱い、upsert の ON CONFLICT 対象にする
+CREATE UNIQUE INDEX IF NOT EXISTS card_catalogs_natural_key
+    ON public.card_catalogs (manufacturer, year, series_name, card_number, player_name)
+    NULLS NOT DISTINCT;
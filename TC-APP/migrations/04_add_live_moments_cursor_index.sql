@@ -0,0 +1,8 @@
+-- ==============================================================================
+-- Migration: 04_add_live_moments_cursor_index
+-- Description: live_moments を (created_at, id) 順にキーセットページングするためのインデックス
+--              (moments_archive.py の export が数百万行でも一定時間でページを取れるようにする)
+-- ==============================================================================
+
+CREATE INDEX IF NOT EXISTS live_moments_created_at_id
+    ON public.live_moments (created_at, id);
@@ -0,0 +1,496 @@
+"""
+Streaming export/import for live_moments.
+
+Pages through the table by a (created_at, id) keyset cursor and writes each page
+straight to the output file, and reads archives back one record at a time into
+chunked bulk upserts, so memory stays flat no matter how many seasons are moved.
+
+    python moments_archive.py export moments-2025.parquet --since 2025-03-01 --until 2026-01-01
+    python moments_archive.py export moments.jsonl.gz
+    python moments_archive.py import moments-2025.parquet --env-file staging.env.local
+    python moments_archive.py import moments-2025.parquet --resume      # continue after a crash
+    python moments_archive.py import downloads/live-moment-sample-test.csv --dry-run
+    python moments_archive.py convert moments.jsonl.gz moments.parquet      # offline, no database
+
+The format follows the file extension:
+  .csv / .jsonl (.ndjson), optionally .gz, and .parquet (columnar, zstd; needs pyarrow).
+CSV columns are in table order with metadata as JSON text. Files without a header row
+(like downloads/live-moment-sample-test.csv) are read positionally in that order.
+
+Export is fastest with the index from migrations/04_add_live_moments_cursor_index.sql.
+"""
+import argparse
+import csv
+import gzip
+import io
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+# --- Settings ---
+TABLE = "live_moments"
+PAGE_SIZE = 1000
+CHUNK_SIZE = 500
+WORKERS = 4
+MAX_RETRIES = 3
+RETRY_BACKOFF_SEC = 2.0
+REPORT_INTERVAL_SEC = 1.0
+ENV_FILE = "frontend/.env.local"
+PARQUET_COMPRESSION = "zstd"
+
+# Table column order (02_create_live_moments + match_result, is_finalized, image_url)
+COLUMNS = [
+    "id", "created_at", "player_name", "type", "title", "description", "intensity", "metadata",
+    "match_result", "is_finalized", "image_url",
+]
+REQUIRED = ("player_name", "title")
+
+
+# --- Values ---
+def _text(value):
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value or None
+
+
+def _timestamp(value):
+    if isinstance(value, datetime):
+        return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+    value = _text(value)
+    if value is None:
+        return None
+    # Postgres text output ("2025-12-09 06:29:35.059014+00") and PostgREST ISO strings
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def _bool(value):
+    if value is None or isinstance(value, bool):
+        return value
+    value = str(value).strip().lower()
+    if not value:
+        return None
+    return value in ("1", "true", "yes", "t")
+
+
+def normalize_row(raw):
+    """
+    Return (row, None) for a valid record, otherwise (None, reason). Unknown keys are dropped,
+    and so are columns without a value, so an upsert leaves their defaults (metadata '{}',
+    is_finalized false) alone instead of writing null over them.
+    """
+    if "_error" in raw:
+        return None, raw["_error"]
+    try:
+        row = {c: _text(raw.get(c)) for c in ("id", "player_name", "type", "title", "description",
+                                               "match_result", "image_url")}
+        created_at = _timestamp(raw.get("created_at"))
+        row["created_at"] = created_at.isoformat() if created_at else None
+        intensity = _text(raw.get("intensity"))
+        row["intensity"] = int(intensity) if intensity is not None else None
+        metadata = raw.get("metadata")
+        if isinstance(metadata, str):
+            metadata = json.loads(metadata) if metadata.strip() else None
+        row["metadata"] = metadata
+        row["is_finalized"] = _bool(raw.get("is_finalized"))
+    except (ValueError, TypeError) as e:
+        return None, f"invalid value: {e}"
+
+    for column in REQUIRED:
+        if row[column] is None:
+            return None, f"missing {column}"
+    if row["intensity"] is not None and not 1 <= row["intensity"] <= 5:
+        return None, f"intensity out of range: {row['intensity']}"
+    return {k: v for k, v in row.items() if v is not None}, None
+
+
+# --- Readers ---
+def _open_text(path, mode="r"):
+    encoding = "utf-8-sig" if mode == "r" else "utf-8"
+    if path.endswith(".gz"):
+        return io.TextIOWrapper(gzip.open(path, mode + "b", compresslevel=6), encoding=encoding, newline="")
+    return open(path, mode, encoding=encoding, newline="")
+
+
+def file_format(path):
+    name = path[:-3] if path.endswith(".gz") else path
+    if name.endswith(".csv"):
+        return "csv"
+    if name.endswith((".jsonl", ".ndjson")):
+        return "jsonl"
+    if name.endswith(".parquet") and not path.endswith(".gz"):
+        return "parquet"
+    raise ValueError(f"unsupported file type: {path} (use .csv, .jsonl, .parquet)")
+
+
+def _iter_csv(f):
+    reader = csv.reader(f)
+    header = None
+    for values in reader:
+        if not values:
+            continue
+        if header is None:
+            if values[0].strip() == "id":
+                header = [v.strip() for v in values]
+                continue
+            header = COLUMNS
+        yield dict(zip(header, values))
+
+
+def _iter_jsonl(f):
+    for line in f:
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError as e:
+            yield {"_error": f"invalid json: {e}"}
+
+
+def _iter_parquet(path):
+    import pyarrow.parquet as pq
+
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=CHUNK_SIZE):
+        yield from batch.to_pylist()
+
+
+def iter_records(path, start_offset=0):
+    """Yield (offset, raw_dict) one record at a time."""
+    fmt = file_format(path)
+    if fmt == "parquet":
+        records = _iter_parquet(path)
+        for offset, raw in enumerate(records):
+            if offset >= start_offset:
+                yield offset, raw
+        return
+    with _open_text(path) as f:
+        records = _iter_csv(f) if fmt == "csv" else _iter_jsonl(f)
+        for offset, raw in enumerate(records):
+            if offset >= start_offset:
+                yield offset, raw
+
+
+# --- Writers ---
+class CsvWriter:
+    def __init__(self, path):
+        self.f = _open_text(path, "w")
+        self.writer = csv.writer(self.f)
+        self.writer.writerow(COLUMNS)
+
+    def write(self, rows):
+        for row in rows:
+            self.writer.writerow([_csv_value(row.get(c)) for c in COLUMNS])
+
+    def close(self):
+        self.f.close()
+
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    return value
+
+
+class JsonlWriter:
+    def __init__(self, path):
+        self.f = _open_text(path, "w")
+
+    def write(self, rows):
+        for row in rows:
+            self.f.write(json.dumps({c: row.get(c) for c in COLUMNS}, ensure_ascii=False) + "\n")
+
+    def close(self):
+        self.f.close()
+
+
+class ParquetWriter:
+    """One row group per page; metadata is stored as JSON text so the schema stays fixed."""
+
+    def __init__(self, path):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self.pa = pa
+        self.schema = pa.schema([
+            ("id", pa.string()),
+            ("created_at", pa.timestamp("us", tz="UTC")),
+            ("player_name", pa.string()),
+            ("type", pa.string()),
+            ("title", pa.string()),
+            ("description", pa.string()),
+            ("intensity", pa.int16()),
+            ("metadata", pa.string()),
+            ("match_result", pa.string()),
+            ("is_finalized", pa.bool_()),
+            ("image_url", pa.string()),
+        ])
+        self.writer = pq.ParquetWriter(path, self.schema, compression=PARQUET_COMPRESSION)
+
+    def write(self, rows):
+        if not rows:
+            return
+        columns = {c: [row.get(c) for row in rows] for c in COLUMNS}
+        columns["created_at"] = [_timestamp(v) for v in columns["created_at"]]
+        columns["metadata"] = [None if v is None else json.dumps(v, ensure_ascii=False) for v in columns["metadata"]]
+        self.writer.write_table(self.pa.table(columns, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+WRITERS = {"csv": CsvWriter, "jsonl": JsonlWriter, "parquet": ParquetWriter}
+
+
+def open_writer(path):
+    return WRITERS[file_format(path)](path)
+
+
+# --- Database ---
+def connect(env_file=ENV_FILE):
+    from dotenv import load_dotenv
+    from supabase import create_client
+
+    load_dotenv(env_file)
+    url = os.environ.get("NEXT_PUBLIC_SUPABASE_URL")
+    # live_moments only allows writes with the service role key
+    key = os.environ.get("SUPABASE_SERVICE_ROLE_KEY") or os.environ.get("NEXT_PUBLIC_SUPABASE_ANON_KEY")
+    if not url or not key:
+        print(f"Error: Supabase URL or Key not found in {env_file}")
+        sys.exit(1)
+    return create_client(url, key)
+
+
+def fetch_page(supabase, after, limit=PAGE_SIZE, since=None, until=None):
+    """Rows ordered by (created_at, id) strictly after the `after` cursor."""
+    query = (supabase.table(TABLE).select("*")
+             .order("created_at").order("id").limit(limit))
+    if since:
+        query = query.gte("created_at", since)
+    if until:
+        query = query.lt("created_at", until)
+    if after is not None:
+        created_at, moment_id = after
+        query = query.or_(f'created_at.gt."{created_at}",and(created_at.eq."{created_at}",id.gt.{moment_id})')
+    return query.execute().data
+
+
+def upsert_chunk(supabase, rows):
+    # Rows with different columns cannot share one bulk insert (PostgREST would send null for
+    # the missing ones), so upsert each column set separately
+    groups = {}
+    for row in rows:
+        groups.setdefault(tuple(sorted(row)), []).append(row)
+    for group in groups.values():
+        for attempt in range(MAX_RETRIES):
+            try:
+                supabase.table(TABLE).upsert(group, on_conflict="id").execute()
+                break
+            except Exception:
+                if attempt == MAX_RETRIES - 1:
+                    raise
+                time.sleep(RETRY_BACKOFF_SEC * (2 ** attempt))
+
+
+class Progress:
+    """Counters shared by the reader and the chunk workers, plus the resume watermark."""
+
+    def __init__(self, checkpoint_path, start_offset):
+        self.lock = threading.Lock()
+        self.checkpoint_path = checkpoint_path
+        self.read = 0
+        self.upserted = 0
+        self.rejected = 0
+        self.failed_chunks = []
+        # Chunks finish out of order; only advance the checkpoint over a contiguous prefix
+        self.watermark = start_offset
+        self.done_chunks = {}
+
+    def chunk_done(self, first_offset, end_offset, upserted):
+        with self.lock:
+            self.upserted += upserted
+            self.done_chunks[first_offset] = end_offset
+            while self.watermark in self.done_chunks:
+                self.watermark = self.done_chunks.pop(self.watermark)
+            if self.checkpoint_path:
+                with open(self.checkpoint_path, "w") as f:
+                    f.write(str(self.watermark))
+
+    def chunk_failed(self, first_offset, end_offset, error):
+        with self.lock:
+            self.failed_chunks.append((first_offset, end_offset, str(error)))
+
+
+def checkpoint_path_for(path):
+    return f"{path}.checkpoint"
+
+
+def read_checkpoint(path):
+    """Offset saved by the last import of this file (0 if there is none)."""
+    checkpoint_path = checkpoint_path_for(path)
+    if not os.path.exists(checkpoint_path):
+        return 0
+    with open(checkpoint_path) as f:
+        return int(f.read().strip() or 0)
+
+
+# --- Commands ---
+def export(path, supabase=None, since=None, until=None, page_size=PAGE_SIZE, after=None):
+    supabase = supabase or connect()
+    writer = open_writer(path)
+    count, started = 0, time.monotonic()
+    reported = started
+    try:
+        while True:
+            rows = fetch_page(supabase, after, page_size, since, until)
+            if not rows:
+                break
+            writer.write(rows)
+            count += len(rows)
+            after = (rows[-1]["created_at"], rows[-1]["id"])
+            now = time.monotonic()
+            if now - reported >= REPORT_INTERVAL_SEC:
+                print(f"  exported {count:>9} rows ({count / (now - started):7.0f}/s) cursor {after[0]},{after[1]}")
+                reported = now
+            if len(rows) < page_size:
+                break
+    finally:
+        writer.close()
+    print(f"Done in {time.monotonic() - started:.1f}s: {count} rows -> {path}")
+    return count
+
+
+def import_file(path, supabase=None, chunk_size=CHUNK_SIZE, workers=WORKERS, start_offset=0,
+                rejects_path=None, dry_run=False, checkpoint_path=None):
+    """
+    Upsert an archive in chunks. With checkpoint_path, the offset below which every record
+    is done is saved after each chunk, so an interrupted import can resume from it.
+    """
+    supabase = None if dry_run else (supabase or connect())
+    progress = Progress(checkpoint_path, start_offset)
+    rejects = open(rejects_path, "a", encoding="utf-8") if rejects_path else None
+    # Bound the number of chunks held in memory: reading pauses while workers are busy
+    in_flight = threading.Semaphore(workers * 2)
+    started = time.monotonic()
+
+    def run_chunk(first_offset, end_offset, rows):
+        try:
+            if rows and not dry_run:
+                upsert_chunk(supabase, rows)
+            progress.chunk_done(first_offset, end_offset, len(rows))
+        except Exception as e:
+            print(f"  Error upserting records {first_offset}-{end_offset - 1}: {e}")
+            progress.chunk_failed(first_offset, end_offset, e)
+        finally:
+            in_flight.release()
+
+    print(f"Importing {path} from offset {start_offset} "
+          f"(chunk {chunk_size}, {workers} workers{', dry run' if dry_run else ''})...")
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        chunk, first_offset, offset = [], start_offset, start_offset - 1
+
+        def flush(end_offset):
+            in_flight.acquire()
+            pool.submit(run_chunk, first_offset, end_offset, chunk)
+
+        for offset, raw in iter_records(path, start_offset):
+            row, reason = normalize_row(raw)
+            with progress.lock:
+                progress.read += 1
+                if row is None:
+                    progress.rejected += 1
+            if row is None:
+                if rejects:
+                    rejects.write(json.dumps({"offset": offset, "reason": reason, "record": raw},
+                                             ensure_ascii=False, default=str) + "\n")
+            else:
+                chunk.append(row)
+            # Chunks cover a fixed range of record offsets (rejects included) so the
+            # checkpoint can advance past rejected records too
+            if offset + 1 - first_offset >= chunk_size:
+                flush(offset + 1)
+                chunk, first_offset = [], offset + 1
+        if offset + 1 > first_offset:
+            flush(offset + 1)
+
+    if rejects:
+        rejects.close()
+    elapsed = time.monotonic() - started
+    print(f"Done in {elapsed:.1f}s: read {progress.read}, upserted {progress.upserted}, "
+          f"rejected {progress.rejected} ({progress.read / max(elapsed, 1e-9):.0f} rows/s)")
+    for first, end, error in sorted(progress.failed_chunks):
+        print(f"  Failed records {first}-{end - 1}: {error}")
+    if progress.failed_chunks and checkpoint_path:
+        print(f"Re-run with --resume to retry from offset {progress.watermark}.")
+    return progress
+
+
+def convert(source, target):
+    writer = open_writer(target)
+    chunk, count, rejected = [], 0, 0
+    started = time.monotonic()
+    try:
+        for offset, raw in iter_records(source):
+            row, reason = normalize_row(raw)
+            if row is None:
+                rejected += 1
+                print(f"  Skipping record {offset}: {reason}")
+                continue
+            chunk.append(row)
+            if len(chunk) >= PAGE_SIZE:
+                writer.write(chunk)
+                count += len(chunk)
+                chunk = []
+        writer.write(chunk)
+        count += len(chunk)
+    finally:
+        writer.close()
+    print(f"Done in {time.monotonic() - started:.1f}s: {count} rows -> {target} ({rejected} skipped)")
+    return count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Streaming export/import for live_moments")
+    parser.add_argument("--env-file", default=ENV_FILE, help="dotenv file with the Supabase URL and key")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("export", help="write live_moments to a file")
+    p.add_argument("output", help=".csv / .jsonl (optionally .gz) or .parquet")
+    p.add_argument("--since", help="created_at >= this (ISO date or timestamp)")
+    p.add_argument("--until", help="created_at < this")
+    p.add_argument("--page-size", type=int, default=PAGE_SIZE)
+    p.add_argument("--after", help="resume after this cursor: '<created_at>,<id>' (printed during export)")
+
+    p = sub.add_parser("import", help="upsert a file into live_moments (by id)")
+    p.add_argument("input")
+    p.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    p.add_argument("--workers", type=int, default=WORKERS)
+    p.add_argument("--start-offset", type=int, default=0, help="skip this many records")
+    p.add_argument("--resume", action="store_true", help="start from the offset saved in <input>.checkpoint")
+    p.add_argument("--rejects", help="append rejected records to this JSONL file")
+    p.add_argument("--dry-run", action="store_true", help="validate only, do not write")
+
+    p = sub.add_parser("convert", help="convert between archive formats without a database")
+    p.add_argument("input")
+    p.add_argument("output")
+    args = parser.parse_args()
+
+    if args.command == "export":
+        after = tuple(args.after.rsplit(",", 1)) if args.after else None
+        export(args.output, connect(args.env_file), args.since, args.until, args.page_size, after)
+    elif args.command == "import":
+        start_offset = read_checkpoint(args.input) if args.resume else args.start_offset
+        progress = import_file(args.input, None if args.dry_run else connect(args.env_file), args.chunk_size,
+                               args.workers, start_offset, args.rejects, args.dry_run,
+                               None if args.dry_run else checkpoint_path_for(args.input))
+        sys.exit(1 if progress.failed_chunks else 0)
+    elif args.command == "convert":
+        convert(args.input, args.output)
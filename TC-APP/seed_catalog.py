@@ -1,75 +1,312 @@
+"""
+Bulk loader for card_catalogs.
 
-import os
-from supabase import create_client, Client
-from dotenv import load_dotenv
+Streams a manufacturer checklist (CSV or JSONL, optionally .gz), validates each
+row against the schema enums and upserts it in chunks from a pool of worker
+threads sharing one Supabase client (one HTTP connection pool).
+
+    python seed_catalog.py checklist.csv
+    python seed_catalog.py checklist.jsonl --chunk-size 1000 --workers 8
+    python seed_catalog.py checklist.csv --resume          # continue after a crash
+    python seed_catalog.py checklist.csv --dry-run        # validate only
 
-load_dotenv("frontend/.env.local")
+Without an input file the built-in sample cards are loaded.
+Requires the natural-key index from migrations/03_add_card_catalog_natural_key.sql
+(PostgreSQL 15+, for NULLS NOT DISTINCT).
+"""
+import argparse
+import csv
+import gzip
+import io
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
-url: str = os.environ.get("NEXT_PUBLIC_SUPABASE_URL")
-key: str = os.environ.get("NEXT_PUBLIC_SUPABASE_ANON_KEY")
+# --- Settings ---
+CHUNK_SIZE = 500
+WORKERS = 4
+MAX_RETRIES = 3
+RETRY_BACKOFF_SEC = 2.0
+REPORT_INTERVAL_SEC = 1.0
 
-if not url or not key:
-    print("Error: Supabase URL or Key not found in frontend/.env.local")
-    exit(1)
+# Must match the unique index card_catalogs_natural_key
+ON_CONFLICT = "manufacturer,year,series_name,card_number,player_name"
 
-supabase: Client = create_client(url, key)
+# Enums from supabase_schema.sql
+MANUFACTURERS = ['BBM', 'Calbee', 'Epoch', 'Topps_Japan', 'Topps']
+TEAMS = ['Giants', 'Tigers', 'Dragons', 'Swallows', 'Carp', 'BayStars', 'Hawks', 'Fighters', 'Marines', 'Buffaloes', 'Eagles', 'Lions', 'Dodgers']
+RARITIES = ['Common', 'Rare', 'Super Rare', 'Parallel', 'Autograph', 'Patch', 'Rookie', 'Legend']
 
 sample_catalogs = [
-    {
-        "manufacturer": "Topps",
-        "series_name": "Chrome",
-        "player_name": "Shohei Ohtani",
-        "team": "Dodgers",
-        "card_number": "1",
-        "rarity": "Super Rare",
-        "is_rookie": False,
-        "year": 2024
-    },
-    {
-        "manufacturer": "BBM",
-        "series_name": "Genesis",
-        "player_name": "Roki Sasaki",
-        "team": "Marines",
-        "card_number": "17",
-        "rarity": "Rare",
-        "is_rookie": False,
-        "year": 2023
-    },
-    {
-        "manufacturer": "Epoch",
-        "series_name": "Stars & Legends",
-        "player_name": "Ichiro Suzuki",
-        "team": "Marines", # Note: Ichiro played for Orix/Mariners, but using valid enum for now or need to check enum
-        "card_number": "51",
-        "rarity": "Legend",
-        "is_rookie": False,
-        "year": 2022
-    },
-    {
-        "manufacturer": "Calbee",
-        "series_name": "Pro Baseball Chips",
-        "player_name": "Munetaka Murakami",
-        "team": "Swallows",
-        "card_number": "55",
-        "rarity": "Common",
-        "is_rookie": False,
-        "year": 2024
-    }
+    {"manufacturer": "Topps", "series_name": "Chrome", "player_name": "Shohei Ohtani", "team": "Dodgers",
+     "card_number": "1", "rarity": "Super Rare", "is_rookie": False, "year": 2024},
+    {"manufacturer": "BBM", "series_name": "Genesis", "player_name": "Roki Sasaki", "team": "Marines",
+     "card_number": "17", "rarity": "Rare", "is_rookie": False, "year": 2023},
+    {"manufacturer": "Epoch", "series_name": "Stars & Legends", "player_name": "Ichiro Suzuki", "team": "Buffaloes",
+     "card_number": "51", "rarity": "Legend", "is_rookie": False, "year": 2022},
+    {"manufacturer": "Calbee", "series_name": "Pro Baseball Chips", "player_name": "Munetaka Murakami", "team": "Swallows",
+     "card_number": "55", "rarity": "Common", "is_rookie": False, "year": 2024},
 ]
 
-# Check team enum validity based on schema
-# enum: 'Giants', 'Tigers', 'Dragons', 'Swallows', 'Carp', 'BayStars', 'Hawks', 'Fighters', 'Marines', 'Buffaloes', 'Eagles', 'Lions', 'Dodgers'
-# Ichiro -> Marines is technically wrong team but valid enum. Let's change Ichiro to 'Buffaloes' (Orix)
 
-sample_catalogs[2]["team"] = "Buffaloes"
+def _enum_lookup(values):
+    # Accept case / space / underscore variations ("topps japan" -> "Topps_Japan")
+    return {v.lower().replace("_", " "): v for v in values}
+
+
+MANUFACTURER_LOOKUP = _enum_lookup(MANUFACTURERS)
+TEAM_LOOKUP = _enum_lookup(TEAMS)
+RARITY_LOOKUP = _enum_lookup(RARITIES)
+
+
+# --- Input ---
+def _open_text(path):
+    if path.endswith(".gz"):
+        return io.TextIOWrapper(gzip.open(path, "rb"), encoding="utf-8-sig", newline="")
+    return open(path, encoding="utf-8-sig", newline="")
+
+
+def iter_records(path, start_offset=0):
+    """Yield (offset, raw_dict) one record at a time; offset is the 0-based record number."""
+    if path is None:
+        for offset, item in enumerate(sample_catalogs):
+            if offset >= start_offset:
+                yield offset, dict(item)
+        return
+
+    is_jsonl = path.replace(".gz", "").endswith((".jsonl", ".ndjson"))
+    with _open_text(path) as f:
+        if is_jsonl:
+            offset = 0
+            for line in f:
+                if not line.strip():
+                    continue
+                if offset >= start_offset:
+                    try:
+                        yield offset, json.loads(line)
+                    except json.JSONDecodeError as e:
+                        yield offset, {"_error": f"invalid json: {e}"}
+                offset += 1
+        else:
+            for offset, raw in enumerate(csv.DictReader(f)):
+                if offset >= start_offset:
+                    yield offset, raw
+
+
+# --- Validation ---
+def _text(value):
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value or None
+
+
+def _enum(lookup, value):
+    value = _text(value)
+    return lookup.get(value.lower().replace("_", " ")) if value else None
+
+
+def _bool(value):
+    if isinstance(value, bool):
+        return value
+    return str(value or "").strip().lower() in ("1", "true", "yes", "y", "t")
+
+
+def normalize_row(raw):
+    """Return (row, None) if the record is valid, otherwise (None, reason)."""
+    if "_error" in raw:
+        return None, raw["_error"]
+
+    manufacturer = _enum(MANUFACTURER_LOOKUP, raw.get("manufacturer"))
+    if manufacturer is None:
+        return None, f"invalid manufacturer: {raw.get('manufacturer')!r}"
+    team = _enum(TEAM_LOOKUP, raw.get("team"))
+    if team is None:
+        return None, f"invalid team: {raw.get('team')!r}"
+    rarity = None
+    if _text(raw.get("rarity")):
+        rarity = _enum(RARITY_LOOKUP, raw.get("rarity"))
+        if rarity is None:
+            return None, f"invalid rarity: {raw.get('rarity')!r}"
+    player_name = _text(raw.get("player_name"))
+    if player_name is None:
+        return None, "missing player_name"
+    year = _text(raw.get("year"))
+    if year is not None:
+        try:
+            year = int(year)
+        except ValueError:
+            return None, f"invalid year: {year!r}"
+
+    return {
+        "manufacturer": manufacturer,
+        "series_name": _text(raw.get("series_name")),
+        "player_name": player_name,
+        "team": team,
+        "card_number": _text(raw.get("card_number")),
+        "rarity": rarity,
+        "is_rookie": _bool(raw.get("is_rookie")),
+        "year": year,
+    }, None
+
+
+def natural_key(row):
+    return tuple(row[c] for c in ON_CONFLICT.split(","))
+
+
+# --- Progress ---
+class Progress:
+    """Counters shared by the reader and the chunk workers, plus the resume watermark."""
+
+    def __init__(self, checkpoint_path, start_offset):
+        self.lock = threading.Lock()
+        self.checkpoint_path = checkpoint_path
+        self.read = 0
+        self.upserted = 0
+        self.rejected = 0
+        self.failed_chunks = []
+        # Chunks finish out of order; only advance the checkpoint over a contiguous prefix
+        self.watermark = start_offset
+        self.done_chunks = {}
+
+    def chunk_done(self, first_offset, end_offset, upserted):
+        with self.lock:
+            self.upserted += upserted
+            self.done_chunks[first_offset] = end_offset
+            while self.watermark in self.done_chunks:
+                self.watermark = self.done_chunks.pop(self.watermark)
+            if self.checkpoint_path:
+                with open(self.checkpoint_path, "w") as f:
+                    f.write(str(self.watermark))
+
+    def chunk_failed(self, first_offset, end_offset, error):
+        with self.lock:
+            self.failed_chunks.append((first_offset, end_offset, str(error)))
+
+    def report(self, last, elapsed):
+        with self.lock:
+            current = (self.read, self.upserted, self.rejected)
+        rates = [(c - p) / elapsed for c, p in zip(current, last)]
+        print(f"  read {current[0]:>8} | upserted {current[1]:>8} ({rates[1]:7.0f}/s)"
+              f" | rejected {current[2]:>6} ({rates[2]:5.0f}/s) | checkpoint {self.watermark}")
+        return current
+
+
+def _reporter(progress, stop):
+    last, last_time = (0, 0, 0), time.monotonic()
+    while not stop.wait(REPORT_INTERVAL_SEC):
+        now = time.monotonic()
+        last, last_time = progress.report(last, now - last_time), now
+
+
+# --- Loader ---
+def connect():
+    from dotenv import load_dotenv
+    from supabase import create_client
+
+    load_dotenv("frontend/.env.local")
+    url = os.environ.get("NEXT_PUBLIC_SUPABASE_URL")
+    # The service role key bypasses RLS; the anon key only works if an insert policy exists
+    key = os.environ.get("SUPABASE_SERVICE_ROLE_KEY") or os.environ.get("NEXT_PUBLIC_SUPABASE_ANON_KEY")
+    if not url or not key:
+        print("Error: Supabase URL or Key not found in frontend/.env.local")
+        sys.exit(1)
+    return create_client(url, key)
+
+
+def upsert_chunk(supabase, rows):
+    for attempt in range(MAX_RETRIES):
+        try:
+            supabase.table("card_catalogs").upsert(rows, on_conflict=ON_CONFLICT).execute()
+            return
+        except Exception:
+            if attempt == MAX_RETRIES - 1:
+                raise
+            time.sleep(RETRY_BACKOFF_SEC * (2 ** attempt))
+
+
+def load(path, chunk_size=CHUNK_SIZE, workers=WORKERS, start_offset=0, checkpoint_path=None,
+         rejects_path=None, dry_run=False):
+    supabase = None if dry_run else connect()
+    progress = Progress(checkpoint_path, start_offset)
+    rejects = open(rejects_path, "a", encoding="utf-8") if rejects_path else None
+    # Bound the number of chunks held in memory: reading pauses while workers are busy
+    in_flight = threading.Semaphore(workers * 2)
+
+    def run_chunk(first_offset, end_offset, rows):
+        try:
+            if rows and not dry_run:
+                upsert_chunk(supabase, rows)
+            progress.chunk_done(first_offset, end_offset, len(rows))
+        except Exception as e:
+            print(f"  Error upserting records {first_offset}-{end_offset - 1}: {e}")
+            progress.chunk_failed(first_offset, end_offset, e)
+        finally:
+            in_flight.release()
+
+    stop = threading.Event()
+    threading.Thread(target=_reporter, args=(progress, stop), daemon=True).start()
+    started = time.monotonic()
+    print(f"Loading {path or 'built-in samples'} from offset {start_offset} "
+          f"(chunk {chunk_size}, {workers} workers{', dry run' if dry_run else ''})...")
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        chunk, first_offset, offset = {}, start_offset, start_offset - 1
+
+        def flush(end_offset):
+            in_flight.acquire()
+            pool.submit(run_chunk, first_offset, end_offset, list(chunk.values()))
+
+        for offset, raw in iter_records(path, start_offset):
+            row, reason = normalize_row(raw)
+            with progress.lock:
+                progress.read += 1
+                if row is None:
+                    progress.rejected += 1
+            if row is None:
+                if rejects:
+                    rejects.write(json.dumps({"offset": offset, "reason": reason, "record": raw}, ensure_ascii=False) + "\n")
+            else:
+                # Duplicate keys in one upsert statement fail on Postgres; last one wins
+                chunk[natural_key(row)] = row
+            if offset + 1 - first_offset >= chunk_size:
+                flush(offset + 1)
+                chunk, first_offset = {}, offset + 1
+        if offset + 1 > first_offset:
+            flush(offset + 1)
+
+    stop.set()
+    if rejects:
+        rejects.close()
+    elapsed = time.monotonic() - started
+    print(f"Done in {elapsed:.1f}s: {progress.upserted} upserted, {progress.rejected} rejected "
+          f"({progress.upserted / max(elapsed, 1e-9):.0f} rows/s)")
+    for first, end, error in sorted(progress.failed_chunks):
+        print(f"  Failed records {first}-{end - 1}: {error}")
+    if progress.failed_chunks:
+        print(f"Re-run with --resume to retry from offset {progress.watermark}.")
+    return progress
+
 
-print("Seeding catalog data...")
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk load card_catalogs from a CSV/JSONL checklist")
+    parser.add_argument("input", nargs="?", help="CSV or JSONL file (.gz supported); omit to load the samples")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--start-offset", type=int, default=0, help="skip this many records")
+    parser.add_argument("--resume", action="store_true", help="start from the offset saved in the checkpoint file")
+    parser.add_argument("--rejects", help="append rejected records to this JSONL file")
+    parser.add_argument("--dry-run", action="store_true", help="validate only, do not write")
+    args = parser.parse_args()
 
-for item in sample_catalogs:
-    try:
-        data, count = supabase.table("card_catalogs").insert(item).execute()
-        print(f"Inserted: {item['player_name']}")
-    except Exception as e:
-        print(f"Error inserting {item['player_name']}: {e}")
+    checkpoint_path = f"{args.input}.checkpoint" if args.input else None
+    start_offset = args.start_offset
+    if args.resume and checkpoint_path and os.path.exists(checkpoint_path):
+        with open(checkpoint_path) as f:
+            start_offset = int(f.read().strip() or 0)
 
-print("Seeding complete.")
+    load(args.input, args.chunk_size, args.workers, start_offset,
+         None if args.dry_run else checkpoint_path, args.rejects, args.dry_run)
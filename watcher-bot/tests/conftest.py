@@ -0,0 +1,40 @@
+import copy
+import json
+import os
+
+import pytest
+
+from watcher_bot import ai_watcher
+from watcher_bot import mlb_api
+from watcher_bot import pipeline
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+# フィクスチャの試合に出てくる監視選手
+OHTANI = 660271
+YAMAMOTO = 808967
+
+
+def load_feed(name="feed_small.json"):
+    with open(os.path.join(FIXTURES_DIR, name), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def make_context(feed):
+    return mlb_api.build_game_context(mlb_api.game_from_feed(feed), feed)
+
+
+@pytest.fixture
+def feed():
+    return copy.deepcopy(load_feed())
+
+
+@pytest.fixture
+def watcher():
+    return ai_watcher
+
+
+@pytest.fixture(autouse=True)
+def no_milestone_tracker(monkeypatch):
+    # 節目検知は SQLite と MLB API を使うため、テストでは切っておく
+    monkeypatch.setattr(pipeline, "USE_MILESTONE_TRACKER", False)
@@ -0,0 +1,111 @@
+import json
+
+import pytest
+
+from watcher_bot import ai_watcher
+from watcher_bot import backtest
+from watcher_bot import local_judge
+from watcher_bot import pipeline
+from watcher_bot import play_archive
+
+from conftest import OHTANI, YAMAMOTO, load_feed, make_context
+
+GAME_PK = 990001
+WATCH_IDS = {OHTANI, YAMAMOTO}
+GROUNDOUT_KEY = f"{GAME_PK}:66:{YAMAMOTO}:BIG_PLAY"
+
+
+@pytest.fixture
+def archive(tmp_path):
+    feeds_dir, archive_dir = tmp_path / "feeds", tmp_path / "archive"
+    feeds_dir.mkdir()
+    (feeds_dir / f"{GAME_PK}.json").write_text(json.dumps(load_feed()), encoding="utf-8")
+    play_archive.build_archive(str(feeds_dir), str(archive_dir))
+    return play_archive.PlayArchive(str(archive_dir))
+
+
+def _backtest(archive, logged_verdicts=None):
+    return backtest.Backtest(archive, WATCH_IDS, ai_watcher.map_event_type_to_form,
+                             logged_verdicts=logged_verdicts, judge=local_judge.LocalJudge())
+
+
+def test_run_baseline(archive):
+    result = _backtest(archive).run(dict(backtest.BASELINE_RULES))
+    assert result["published"] == {
+        (GAME_PK, "0", OHTANI): "statcast",
+        (GAME_PK, "60", OHTANI): "rule",
+        (GAME_PK, "winner", YAMAMOTO): "decision",
+    }
+    # 9回の凡打は AI審判の候補。ログもモデルも無いので厳格ルールで却下
+    assert result["counts"]["judge_candidates"] == 1
+    assert result["proxy"] == {"logged": 0, "local_model": 0, "strict_rule": 1}
+    assert result["ai_calls"] == {"judge": 1, "generate": 3, "total": 4}
+    assert result["plays"] == 5
+
+
+def test_run_uses_logged_ai_verdicts(archive):
+    result = _backtest(archive, logged_verdicts={GROUNDOUT_KEY: True}).run(dict(backtest.BASELINE_RULES))
+    assert result["published"][(GAME_PK, "66", YAMAMOTO)] == "judge"
+    assert result["proxy"]["logged"] == 1
+    # 9回の凡打は同じ回の勝利投手 (VICTORY) に統合されるので、記事は増えない
+    assert len(result["published"]) == 4
+    assert (GAME_PK, "66", YAMAMOTO) not in result["generated"]
+    assert (GAME_PK, "winner", YAMAMOTO) in result["generated"]
+    assert result["ai_calls"]["generate"] == 3
+
+
+class FixedJudge(local_judge.LocalJudge):
+    """常に同じ確率を返す学習済み扱いのローカル審判"""
+
+    def __init__(self, prob):
+        super().__init__()
+        self.prob = prob
+
+    @property
+    def ready(self):
+        return True
+
+    def probability(self, features):
+        return self.prob
+
+
+def test_run_uses_candidate_thresholds_without_changing_the_judge(archive):
+    judge = FixedJudge(0.7)
+    bt = backtest.Backtest(archive, WATCH_IDS, ai_watcher.map_event_type_to_form, judge=judge)
+    strict = bt.run(dict(backtest.BASELINE_RULES, accept_prob=0.9, reject_prob=0.1))
+    loose = bt.run(dict(backtest.BASELINE_RULES, accept_prob=0.6, reject_prob=0.1))
+    assert strict["counts"]["local_yes"] == 0 and strict["proxy"]["local_model"] == 1
+    assert loose["counts"]["local_yes"] == 1
+    assert (judge.accept_prob, judge.reject_prob) == (local_judge.ACCEPT_PROB, local_judge.REJECT_PROB)
+
+
+def test_run_candidate_rules(archive):
+    bt = _backtest(archive)
+    # 3回の三振 (1-5) は 4点差なので、judge_diff を広げた時だけ候補になる
+    wider = bt.run(dict(backtest.BASELINE_RULES, judge_diff=4), name="wider")
+    assert wider["counts"]["judge_candidates"] == 2
+    no_statcast = bt.run(dict(backtest.BASELINE_RULES, statcast=False, decisions=False))
+    # Statcast を切ると1回の本塁打は AI審判に回る (厳格ルールでは本塁打は採用)
+    assert no_statcast["published"][(GAME_PK, "0", OHTANI)] == "judge"
+    assert no_statcast["counts"]["decision"] == 0
+
+
+def test_run_matches_live_detection(archive):
+    # ライブの detect_moments とバックテストは同じルール・同じ点差で判定する
+    moments = pipeline.detect_moments(ai_watcher, make_context(load_feed()))
+    live_accept = {(m["game_pk"], str(m["play"]["about"]["atBatIndex"]), m["player_id"])
+                   for m in moments if m["verdict"] == "ACCEPT" and m["play"]}
+    live_judge = [m for m in moments if m["verdict"] == "JUDGE"]
+
+    result = _backtest(archive).run(dict(backtest.BASELINE_RULES))
+    assert live_accept == {k for k, reason in result["published"].items() if reason in ("statcast", "rule")}
+    assert len(live_judge) == result["counts"]["judge_candidates"]
+
+
+def test_load_rules_rejects_unknown_keys(tmp_path):
+    path = tmp_path / "rules.json"
+    path.write_text(json.dumps({"judge_diff": 2}), encoding="utf-8")
+    assert backtest.load_rules(str(path))["judge_diff"] == 2
+    path.write_text(json.dumps({"judge_dif": 2}), encoding="utf-8")
+    with pytest.raises(ValueError):
+        backtest.load_rules(str(path))
@@ -0,0 +1,64 @@
+import threading
+
+from watcher_bot import card_index
+
+from conftest import OHTANI
+
+WATCH_LIST = [{"id": OHTANI, "name": "大谷翔平", "name_en": "Shohei Ohtani", "name_kana": "おおたに しょうへい"}]
+
+
+class FakeCatalog:
+    def __init__(self, rows=(), fail=False, gate=None):
+        self.rows = list(rows)
+        self.fail = fail
+        self.gate = gate
+        self.calls = 0
+
+    def __call__(self, after, limit):
+        self.calls += 1
+        if self.gate is not None:
+            self.gate.wait(2)
+        if self.fail:
+            raise ConnectionError("catalog down")
+        return [r for r in self.rows if after is None or (r["created_at"], r["id"]) > after][:limit]
+
+
+def test_related_card_ids_match_name_variants():
+    catalog = FakeCatalog([
+        {"id": "c1", "player_name": "Shohei Ohtani", "created_at": "2025-01-01"},
+        {"id": "c2", "player_name": "大谷 翔平", "created_at": "2025-01-02"},
+        {"id": "c3", "player_name": "Otani Shohei", "created_at": "2025-01-03"},
+        {"id": "c4", "player_name": "Yu Darvish", "created_at": "2025-01-04"},
+    ])
+    index = card_index.CardIndex(WATCH_LIST, fetch_page=catalog)
+    index.maybe_refresh(wait=True)
+    assert index.related_card_ids(OHTANI) == ["c1", "c2", "c3"]
+    assert index.related_card_ids(player_name="Yu Darvish") == ["c4"]
+
+
+def test_failed_first_build_backs_off():
+    catalog = FakeCatalog(fail=True)
+    index = card_index.CardIndex(WATCH_LIST, fetch_page=catalog)
+    index.maybe_refresh(wait=True)
+    index.maybe_refresh(wait=True)
+    # rebuilt_at が 0 のままでも、失敗直後は再構築を繰り返さない
+    assert catalog.calls == 1
+
+    catalog.fail = False
+    index.failed_at -= card_index.RETRY_AFTER_FAILURE_SEC
+    index.maybe_refresh(wait=True)
+    assert catalog.calls == 2 and index.rebuilt_at and index.failed_at is None
+
+
+def test_background_refresh_is_single_flight():
+    gate = threading.Event()
+    catalog = FakeCatalog(gate=gate)
+    index = card_index.CardIndex(WATCH_LIST, fetch_page=catalog)
+    for _ in range(4):
+        index.maybe_refresh()   # 公開スレッドからの呼び出しはすぐに戻る
+    gate.set()
+    for thread in threading.enumerate():
+        if thread.name == "card-index-refresh":
+            thread.join(2)
+    assert catalog.calls == 1
+    assert not index.refreshing
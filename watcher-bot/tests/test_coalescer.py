@@ -0,0 +1,94 @@
+from watcher_bot import coalescer
+
+from conftest import OHTANI, YAMAMOTO
+
+NO_LIMITS = {}
+
+
+def _moment(key, event_type, player_id=OHTANI, game_pk=1, inning=9, intensity=None):
+    moment = {
+        "moment_key": key, "game_pk": game_pk, "player_id": player_id, "player_name": str(player_id),
+        "event_type": event_type, "inning": inning, "progress": f"Top {inning}", "score_diff": 3,
+    }
+    if intensity is not None:
+        moment["ai_content"] = {"intensity": str(intensity)}
+    return moment
+
+
+def test_same_group_is_merged_into_the_most_intense():
+    c = coalescer.MomentCoalescer(window_sec=8, max_hold_sec=20, rate_limits=NO_LIMITS)
+    c.add(_moment("a", "TIMELY", intensity=2), now=0)
+    c.add(_moment("b", "TIMELY", intensity=4), now=1)
+    c.add(_moment("c", "TIMELY", intensity=3), now=2)
+    assert c.pop_ready(now=9) == []              # 最後の到着から窓が閉じていない
+    out = c.pop_ready(now=10)
+    assert [m["moment_key"] for m in out] == ["b"]
+    assert out[0]["merged_moments"] == [
+        {"moment_key": "c", "event_type": "TIMELY", "intensity": 3},
+        {"moment_key": "a", "event_type": "TIMELY", "intensity": 2},
+    ]
+    assert c.suppressed == 2 and c.pending() == 0
+
+
+def test_lower_moment_of_another_type_is_superseded():
+    c = coalescer.MomentCoalescer(rate_limits=NO_LIMITS)
+    # 同じ回の適時打はサヨナラ本塁打に、最終回の三振は勝利投手に吸収される
+    c.add(_moment("timely", "TIMELY"), now=0)
+    c.add(_moment("walkoff", "HOMERUN", intensity=5), now=1)
+    c.add(_moment("k", "STRIKEOUT", player_id=YAMAMOTO), now=0)
+    c.add(_moment("win", "VICTORY", player_id=YAMAMOTO), now=2)
+    out = {m["moment_key"]: m for m in c.pop_ready(flush=True, now=2)}
+    assert sorted(out) == ["walkoff", "win"]
+    assert out["walkoff"]["merged_moments"] == [{"moment_key": "timely", "event_type": "TIMELY", "intensity": 3}]
+    assert out["win"]["merged_moments"] == [{"moment_key": "k", "event_type": "STRIKEOUT", "intensity": 3}]
+
+
+def test_other_players_games_and_innings_are_not_merged():
+    c = coalescer.MomentCoalescer(rate_limits=NO_LIMITS)
+    c.add(_moment("hr", "HOMERUN"), now=0)
+    c.add(_moment("other_player", "HOMERUN", player_id=YAMAMOTO), now=0)
+    c.add(_moment("other_game", "HOMERUN", game_pk=2), now=0)
+    c.add(_moment("next_inning", "TIMELY", inning=10), now=0)
+    out = c.pop_ready(flush=True, now=0)
+    assert sorted(m["moment_key"] for m in out) == ["hr", "next_inning", "other_game", "other_player"]
+    assert all("merged_moments" not in m for m in out)
+
+
+def test_max_hold_closes_a_window_that_keeps_extending():
+    c = coalescer.MomentCoalescer(window_sec=8, max_hold_sec=20, rate_limits=NO_LIMITS)
+    for t in range(0, 20, 5):
+        c.add(_moment(f"m{t}", "TIMELY"), now=t)
+    assert c.next_wakeup(now=15) == 5            # 最初の到着 (0秒) + 20秒
+    assert c.pop_ready(now=19) == []
+    assert len(c.pop_ready(now=20)) == 1
+
+
+def test_output_is_ordered_by_intensity_then_type():
+    c = coalescer.MomentCoalescer(rate_limits=NO_LIMITS)
+    c.add(_moment("timely", "TIMELY", intensity=3, inning=1), now=0)
+    c.add(_moment("k", "STRIKEOUT", intensity=3, inning=2), now=0)
+    c.add(_moment("big", "BIG_PLAY", intensity=5, inning=3), now=0)
+    assert [m["moment_key"] for m in c.pop_ready(flush=True, now=0)] == ["big", "k", "timely"]
+
+
+def test_rate_limit_holds_moments_until_tokens_refill():
+    c = coalescer.MomentCoalescer(rate_limits={"game": (6, 2)})   # 10秒に1件, バースト2
+    for i, event_type in enumerate(["HOMERUN", "STRIKEOUT", "TIMELY"]):
+        c.add(_moment(f"m{i}", event_type, inning=i + 1), now=0)
+    assert [m["moment_key"] for m in c.pop_ready(flush=True, now=0)] == ["m0", "m1"]
+    assert c.pending() == 1
+    assert c.next_wakeup(now=0) == 10
+    assert c.pop_ready(now=5) == []
+    assert [m["moment_key"] for m in c.pop_ready(now=10)] == ["m2"]
+
+    # 別の試合は別のチャンネル
+    c.add(_moment("other_game", "HOMERUN", game_pk=2), now=10)
+    assert [m["moment_key"] for m in c.pop_ready(flush=True, now=10)] == ["other_game"]
+
+
+def test_intensity_is_estimated_before_generation():
+    # 記事生成前 (ai_content なし) はタイプと試合状況からの見積もり
+    assert coalescer.moment_intensity(_moment("a", "HOMERUN")) == 4
+    assert coalescer.moment_intensity(dict(_moment("b", "HOMERUN"), score_diff=1)) == 5   # 9回以降の1点差以内
+    assert coalescer.moment_intensity(_moment("c", "TIMELY", intensity="x")) == 3
+    assert coalescer.moment_intensity(_moment("d", "TIMELY", intensity=9)) == 5
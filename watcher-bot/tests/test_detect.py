@@ -0,0 +1,81 @@
+import pytest
+
+from watcher_bot import ai_watcher
+from watcher_bot import ai_watcher_claude
+from watcher_bot import pipeline
+
+from conftest import OHTANI, YAMAMOTO, make_context
+
+RISP_PLAY = {"runners": [{"movement": {"originBase": "2B"}}]}
+EMPTY_PLAY = {"runners": []}
+
+
+@pytest.mark.parametrize("module", [ai_watcher, ai_watcher_claude])
+@pytest.mark.parametrize("event, play, score_diff, game_type, expected", [
+    ("Game End", EMPTY_PLAY, 8, "R", "ACCEPT"),
+    ("Single", RISP_PLAY, 2, "R", "ACCEPT"),
+    ("Single", RISP_PLAY, 3, "R", "JUDGE"),
+    ("Groundout", EMPTY_PLAY, 3, "R", "JUDGE"),
+    ("Groundout", EMPTY_PLAY, 4, "R", "REJECT"),
+    ("Groundout", EMPTY_PLAY, 4, "S", "REJECT"),
+    ("Groundout", EMPTY_PLAY, 4, "W", "JUDGE"),
+])
+def test_classify_moment(module, event, play, score_diff, game_type, expected):
+    assert module.classify_moment(event, play, score_diff, game_type) == expected
+
+
+@pytest.mark.parametrize("module", [ai_watcher, ai_watcher_claude])
+def test_classify_moment_reads_shared_rules(module, monkeypatch):
+    monkeypatch.setitem(pipeline.CLASSIFY_RULES, "judge_diff", 5)
+    monkeypatch.setitem(pipeline.CLASSIFY_RULES, "judge_postseason", False)
+    assert module.classify_moment("Groundout", EMPTY_PLAY, 5, "R") == "JUDGE"
+    assert module.classify_moment("Groundout", EMPTY_PLAY, 6, "W") == "REJECT"
+
+
+def _summary(moments):
+    return [(m["player_id"], m["event_type"], m["verdict"]) for m in moments]
+
+
+def test_detect_moments(watcher, feed):
+    moments = pipeline.detect_moments(watcher, make_context(feed))
+    assert _summary(moments) == [
+        (OHTANI, "BIG_PLAY", "ACCEPT"),    # 打球速度 117.2 mph (Statcast)
+        (OHTANI, "TIMELY", "ACCEPT"),      # 9回 1点差 + 得点圏
+        (YAMAMOTO, "BIG_PLAY", "JUDGE"),   # 9回 1点差の凡打
+        (YAMAMOTO, "VICTORY", "ACCEPT"),   # 勝利投手
+    ]
+    assert moments[0]["statcast"]["rule"] == "exit_velo_115"
+    assert moments[1]["moment_key"] == f"990001:60:{OHTANI}:TIMELY"
+    assert moments[1]["progress"] == "Top 9th"
+
+
+def test_detect_moments_uses_running_score(watcher, feed):
+    # 3回の三振は 1-5 (4点差) なので対象外。試合終了時の 6-5 で判定すると拾ってしまう
+    moments = pipeline.detect_moments(watcher, make_context(feed))
+    assert all(m["inning"] != 3 for m in moments)
+    hr = moments[0]
+    assert (hr["away_score"], hr["home_score"], hr["score_diff"]) == (1, 0, 1)
+
+
+def test_detect_moments_postseason_judges_any_score(watcher, feed):
+    feed["gameData"]["game"]["type"] = "W"
+    moments = pipeline.detect_moments(watcher, make_context(feed))
+    assert (YAMAMOTO, "STRIKEOUT", "JUDGE") in _summary(moments)
+
+
+def test_detect_moments_skips_incomplete_plays(watcher, feed):
+    plays = feed["liveData"]["plays"]["allPlays"]
+    in_progress = {
+        "result": {"event": "", "description": ""},
+        "about": {"atBatIndex": 67, "inning": 10, "halfInning": "top", "isComplete": False},
+        "matchup": {"batter": {"id": OHTANI}, "pitcher": {"id": 1}},
+        "runners": [{"movement": {"originBase": "2B"}}],
+    }
+    plays.append(in_progress)
+    moments = pipeline.detect_moments(watcher, make_context(feed))
+    assert all(m["inning"] != 10 for m in moments)
+
+    in_progress["about"]["isComplete"] = True
+    in_progress["result"] = {"event": "Double", "description": "Shohei Ohtani doubles.", "awayScore": 7, "homeScore": 5}
+    moments = pipeline.detect_moments(watcher, make_context(feed))
+    assert (OHTANI, "TIMELY", "ACCEPT") in [(m["player_id"], m["event_type"], m["verdict"]) for m in moments if m["inning"] == 10]
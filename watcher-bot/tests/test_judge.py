@@ -0,0 +1,95 @@
+import pytest
+
+from watcher_bot import ai_budget
+from watcher_bot import local_judge
+from watcher_bot import pipeline
+
+
+def _moment(event_type, inning, score_diff):
+    return {"event_type": event_type, "inning": inning, "score_diff": score_diff}
+
+
+@pytest.mark.parametrize("moment, expected", [
+    (_moment("HOMERUN", 1, 8), True),
+    (_moment("TIMELY", 9, 1), True),
+    (_moment("STRIKEOUT", 10, 0), True),
+    (_moment("TIMELY", 9, 2), False),
+    (_moment("TIMELY", 8, 0), False),
+    (_moment("BIG_PLAY", 9, 0), False),
+    (_moment("STRIKEOUT", None, 0), False),
+])
+def test_strict_rule_verdict(moment, expected):
+    assert pipeline.strict_rule_verdict(moment) is expected
+
+
+class FakeWatcher:
+    def __init__(self, answer):
+        self.answer = answer
+        self.calls = 0
+
+    def judge_impact_by_ai(self, player_name, description, context_str, game_pk=None):
+        self.calls += 1
+        return self.answer
+
+
+class FakeJudge:
+    def __init__(self, verdict):
+        self.verdict = verdict
+
+    def probability(self, features):
+        return 0.5
+
+    def decide(self, prob):
+        return self.verdict
+
+
+@pytest.fixture
+def make_pipeline(monkeypatch, tmp_path):
+    for flag in ("USE_CARD_INDEX", "USE_LOCAL_JUDGE", "USE_RELAY", "USE_TWO_PHASE_PUBLISH"):
+        monkeypatch.setattr(pipeline, flag, False)
+
+    def make(ai_answer, local_verdict=None, budget_mode=ai_budget.MODE_NORMAL):
+        monkeypatch.setattr(ai_budget.LEDGER, "mode", lambda game_pk=None: budget_mode)
+        p = pipeline.HighlightPipeline(FakeWatcher(ai_answer))
+        log = local_judge.JudgeLog(str(tmp_path / "judge_log.jsonl"))
+        if local_verdict != "off":
+            p.local_judge = (FakeJudge(local_verdict), log)
+        return p, log
+    return make
+
+
+def _judge_moment(event_type="BIG_PLAY"):
+    return dict(_moment(event_type, 9, 1), verdict="JUDGE", moment_key="1:1:1:" + event_type, game_pk=1,
+                game_type="R", player_name="p", description="d", play={})
+
+
+def test_local_judge_is_consulted_before_strict_budget_rule(make_pipeline):
+    # 予算の厳格モードでも、ローカル審判が確定できればその判定を使う (厳格ルールなら TIMELY は採用)
+    p, log = make_pipeline(ai_answer=True, local_verdict=False, budget_mode=ai_budget.MODE_STRICT)
+    assert p._judge_verdict(_judge_moment("TIMELY")) is False
+    assert p.watcher.calls == 0
+    assert log.counts["local"] == 1
+
+
+def test_strict_rule_when_local_judge_abstains_in_budget_mode(make_pipeline):
+    p, log = make_pipeline(ai_answer=True, local_verdict=None, budget_mode=ai_budget.MODE_STRICT)
+    assert p._judge_verdict(_judge_moment("TIMELY")) is True
+    assert p._judge_verdict(_judge_moment("BIG_PLAY")) is False
+    assert p.watcher.calls == 0
+
+
+def test_ai_error_falls_back_to_strict_rule_and_is_not_logged(make_pipeline):
+    p, log = make_pipeline(ai_answer=None, local_verdict=None)
+    assert p._judge_verdict(_judge_moment("TIMELY")) is True
+    assert p.watcher.calls == 1
+    assert log.counts["ai"] == 0
+
+    p, _ = make_pipeline(ai_answer=None, local_verdict="off")
+    assert p._judge_verdict(_judge_moment("BIG_PLAY")) is False
+    assert p.watcher.calls == 1
+
+
+def test_running_score_features():
+    play = {"result": {"event": "Single", "awayScore": 6, "homeScore": 5}, "about": {}}
+    features = local_judge.extract_features(dict(_judge_moment("TIMELY"), away_score=9, home_score=5, play=play))
+    assert (features["away_score"], features["home_score"], features["score_diff"]) == (6, 5, 1)
@@ -0,0 +1,49 @@
+import pytest
+
+from watcher_bot import milestones
+from watcher_bot import pipeline
+
+from conftest import OHTANI, YAMAMOTO, make_context
+
+
+@pytest.fixture
+def tracker(tmp_path, monkeypatch):
+    tracker = milestones.SeasonTracker(str(tmp_path / "season.db"))
+    # フィクスチャの試合 (2025-06-01) の前日までシード済み: 大谷 29本 / 山本 14勝
+    tracker.conn.execute("INSERT INTO seasons(season, seed_through) VALUES(2025, '2025-05-31')")
+    tracker.conn.executemany(
+        "INSERT INTO player_stats(season, player_id, stat, value) VALUES(2025, ?, ?, ?)",
+        [(OHTANI, "HR", 29), (YAMAMOTO, "W", 14)],
+    )
+    monkeypatch.setattr(pipeline, "USE_MILESTONE_TRACKER", True)
+    monkeypatch.setattr(milestones, "get_tracker", lambda: tracker)
+    return tracker
+
+
+def _summary(moments):
+    return [(m["moment_key"], m["verdict"]) for m in moments]
+
+
+def test_milestone_moment_is_stable_across_rescans(watcher, feed, tracker):
+    first = pipeline.detect_moments(watcher, make_context(feed))
+    second = pipeline.detect_moments(watcher, make_context(feed))
+    # 再スキャンでも同じキーの RECORD_BREAK を返し、同じプレイの通常モーメント (Statcast の BIG_PLAY) は出さない
+    assert _summary(first) == _summary(second)
+    keys = [key for key, _ in _summary(first)]
+    assert f"990001:0:{OHTANI}:RECORD_BREAK" in keys
+    assert f"990001:0:{OHTANI}:BIG_PLAY" not in keys
+    assert f"990001:milestone:シーズン15勝:{YAMAMOTO}:RECORD_BREAK" in keys
+    # 成績は1回分だけ加算されている
+    assert tracker.get(2025, OHTANI)["HR"] == 30
+    assert tracker.get(2025, YAMAMOTO)["W"] == 15
+
+
+def test_process_play_returns_recorded_milestones_for_processed_play(feed, tracker):
+    ctx = make_context(feed)
+    hr_play = ctx["all_plays"][0]
+    assert tracker.process_play(ctx, hr_play, {OHTANI}) == [(OHTANI, "シーズン30号")]
+    assert tracker.process_play(ctx, hr_play, {OHTANI}) == [(OHTANI, "シーズン30号")]
+    # 節目に届かなかったプレイは再スキャンでも何も返さない
+    single = ctx["all_plays"][3]
+    assert tracker.process_play(ctx, single, {OHTANI}) == []
+    assert tracker.process_play(ctx, single, {OHTANI}) == []
@@ -0,0 +1,13 @@
+from watcher_bot import pipeline
+from watcher_bot import relay
+
+from conftest import OHTANI, make_context
+
+
+def test_moment_to_public_uses_team_codes(watcher, feed):
+    moments = pipeline.detect_moments(watcher, make_context(feed))
+    timely = next(m for m in moments if m["player_id"] == OHTANI and m["event_type"] == "TIMELY")
+    public = relay.moment_to_public(timely)
+    # admin/moments/page.tsx が読み戻す "LAD 6 - 5 NYY (Top 9th)" 形式 (フィクスチャの9回表は 6-5)
+    assert public["match_result"] == "LAD 6 - 5 NYY (Top 9th)"
+    assert public["metadata"]["moment_key"] == timely["moment_key"]
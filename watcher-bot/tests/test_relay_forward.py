@@ -0,0 +1,33 @@
+import time
+
+from watcher_bot import relay
+
+
+def _wait_for(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_forwarder_delivers_to_the_coordinator_relay():
+    server = relay.MomentRelay().start_in_thread("127.0.0.1", 0, ingest_port=0)
+    ingest_port = server.ingest_server.sockets[0].getsockname()[1]
+    workers = [relay.RelayForwarder(ingest_port) for _ in range(2)]
+    for i, forwarder in enumerate(workers):
+        forwarder.publish({"player_name": f"p{i}", "metadata": {"moment_key": f"k{i}"}})
+    assert _wait_for(lambda: server.stats["published"] == 2)
+    assert sorted(m.seq for m in server.history) == [1, 2]
+    assert all(f.stats == {"forwarded": 1, "failed": 0} for f in workers)
+
+
+def test_forwarder_drops_when_relay_is_down(capsys):
+    server = relay.MomentRelay().start_in_thread("127.0.0.1", 0, ingest_port=0)
+    ingest_port = server.ingest_server.sockets[0].getsockname()[1]
+    server.loop.call_soon_threadsafe(server.ingest_server.close)
+    assert _wait_for(lambda: not server.ingest_server.is_serving())
+    forwarder = relay.RelayForwarder(ingest_port, timeout=0.5)
+    forwarder.publish({"player_name": "p"})
+    assert forwarder.stats == {"forwarded": 0, "failed": 1}
@@ -0,0 +1,67 @@
+import numpy as np
+
+from watcher_bot import statcast
+
+from conftest import OHTANI, YAMAMOTO
+
+WATCH_IDS = {OHTANI, YAMAMOTO}
+
+
+def _arrays(rows):
+    """(batter_id, pitcher_id, event, exit_velo, distance, pitch_speed) の行から evaluate_rules の入力を作る"""
+    batter, pitcher, event, exit_velo, distance, pitch_speed = zip(*rows)
+    return {
+        "batter_id": np.array(batter, dtype=np.int64),
+        "pitcher_id": np.array(pitcher, dtype=np.int64),
+        "event": np.array(event, dtype=object),
+        "exit_velo": np.array(exit_velo, dtype=np.float64),
+        "distance": np.array(distance, dtype=np.float64),
+        "launch_angle": np.full(len(rows), np.nan),
+        "pitch_speed": np.array(pitch_speed, dtype=np.float64),
+    }
+
+
+def test_evaluate_rules_first_matching_rule_wins():
+    arrays = _arrays([
+        (OHTANI, 1, "Home Run", 118.0, 485.0, 95.0),     # 480ft と 115mph の両方 → 上のルール
+        (OHTANI, 1, "Double", 121.0, 300.0, 95.0),
+        (OHTANI, 1, "Home Run", 105.0, 455.0, 95.0),
+        (OHTANI, 1, "Groundout", 116.0, 90.0, 95.0),
+    ])
+    hits = statcast.evaluate_rules(arrays, WATCH_IDS)
+    assert {i: rule["name"] for i, (rule, _, _) in hits.items()} == {
+        0: "hr_480ft", 1: "exit_velo_120", 2: "hr_450ft", 3: "exit_velo_115",
+    }
+    assert hits[0][1:] == (485.0, OHTANI)
+
+
+def test_evaluate_rules_filters_role_event_and_missing_values():
+    arrays = _arrays([
+        (2, 3, "Home Run", 119.0, 470.0, 95.0),           # 監視選手ではない
+        (2, OHTANI, "Double", 119.0, 300.0, 95.0),        # 打球のルールは打者が対象
+        (OHTANI, 1, "Double", 110.0, 460.0, 95.0),        # 450ft は本塁打だけ
+        (OHTANI, 1, "Walk", np.nan, np.nan, 99.0),        # 値なし (NaN)
+        (2, YAMAMOTO, "Strikeout", np.nan, np.nan, 100.4),
+        (2, YAMAMOTO, "Groundout", 80.0, 100.0, 101.0),   # 100mph でも三振以外は対象外
+    ])
+    hits = statcast.evaluate_rules(arrays, WATCH_IDS)
+    assert list(hits) == [4]
+    rule, value, player_id = hits[4]
+    assert (rule["name"], player_id) == ("k_100mph", YAMAMOTO)
+    assert abs(value - 100.4) < 1e-9
+
+
+def test_evaluate_rules_custom_rules_and_empty_input():
+    rules = [{"name": "ev_100", "metric": "exit_velo", "min": 100.0, "role": "batter", "events": None,
+              "moment_type": "BIG_PLAY", "label": "{value}"}]
+    arrays = _arrays([(OHTANI, 1, "Single", 101.0, 200.0, 95.0), (OHTANI, 1, "Single", 99.0, 200.0, 95.0)])
+    assert list(statcast.evaluate_rules(arrays, WATCH_IDS, rules)) == [0]
+    assert statcast.evaluate_rules(statcast.extract_play_metrics([]), WATCH_IDS) == {}
+
+
+def test_detect_statcast_moments_on_feed(feed):
+    all_plays = feed["liveData"]["plays"]["allPlays"]
+    hits = statcast.detect_statcast_moments(all_plays, WATCH_IDS)
+    assert {i: (rule["name"], player_id) for i, (rule, _, player_id) in hits.items()} == {
+        0: ("exit_velo_115", OHTANI),
+    }
@@ -0,0 +1,67 @@
+import pytest
+
+from watcher_bot import ai_budget
+from watcher_bot import pipeline
+
+from conftest import OHTANI, make_context
+
+
+class FakeStore:
+    def __init__(self):
+        self.rows = {}
+        self.updates = []
+
+    def insert(self, row):
+        row_id = len(self.rows) + 1
+        self.rows[row_id] = row
+        return row_id
+
+    def update(self, row_id, fields):
+        self.updates.append((row_id, fields))
+        self.rows[row_id].update(fields)
+
+
+@pytest.fixture
+def two_phase(monkeypatch, watcher):
+    for flag in ("USE_CARD_INDEX", "USE_LOCAL_JUDGE", "USE_RELAY"):
+        monkeypatch.setattr(pipeline, flag, False)
+    monkeypatch.setattr(pipeline, "USE_TWO_PHASE_PUBLISH", True)
+    store = FakeStore()
+    monkeypatch.setattr(pipeline.moment_store, "get_store", lambda: store)
+    monkeypatch.setattr(ai_budget.LEDGER, "mode", lambda game_pk=None: ai_budget.MODE_NORMAL)
+    monkeypatch.setattr(watcher, "get_japanese_content",
+                        lambda desc, event_type, player, score, game_pk=None: {"title": "AI", "desc": "AI記事", "intensity": "4"})
+    finished = []
+    p = pipeline.HighlightPipeline(watcher, finish_moment=finished.append)
+    return p, store, finished
+
+
+def test_instant_row_is_written_at_judge_time(two_phase, watcher, feed):
+    p, store, finished = two_phase
+    moment = next(m for m in pipeline.detect_moments(watcher, make_context(feed)) if m["event_type"] == "TIMELY")
+    assert p._judge(moment) == [moment]
+    # coalesce の窓を待たずに定型文の行が入っている
+    assert store.rows[moment["row_id"]]["metadata"]["phase"] == "instant"
+    assert finished == [moment["moment_key"]]
+    assert p.coalescer.pending() == 0
+
+
+def test_coalescer_only_merges_the_ai_rewrite(two_phase, watcher, feed):
+    p, store, finished = two_phase
+    moment = next(m for m in pipeline.detect_moments(watcher, make_context(feed)) if m["event_type"] == "TIMELY")
+    again = dict(moment, moment_key=moment["moment_key"].replace(":60:", ":61:"), play={})
+    for m in (moment, again):
+        p._judge(m)
+        p.coalescer.add(m, now=0)
+    assert len(store.rows) == 2
+    winners = p.coalescer.pop_ready(flush=True, now=0)
+    assert len(winners) == 1
+    assert p._generate(winners[0]) == []
+    # AI 記事で書き換えるのは勝者の行だけ。格下は metadata.merged_moments に載る
+    (row_id, fields), = store.updates
+    assert row_id == winners[0]["row_id"]
+    assert fields["title"] == "AI" and fields["metadata"]["phase"] == "ai"
+    assert [m["moment_key"] for m in fields["metadata"]["merged_moments"]] == [
+        m["moment_key"] for m in (moment, again) if m is not winners[0]
+    ]
+    assert winners[0]["player_id"] == OHTANI
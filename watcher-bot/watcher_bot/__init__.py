@@ -0,0 +1 @@
+"""MLB の実況フィードを監視し、注目選手のハイライトを live_moments へ公開するボット"""
@@ -0,0 +1,181 @@
+import argparse
+import json
+import os
+import threading
+import time
+
+# --- 🔧 設定エリア ------------------------------------------------
+# AI呼び出しの追記専用ログ (1呼び出し = 1行のコンパクトなJSON)
+# 全ワーカープロセスがこの1ファイルに追記し、予算判定の前に他プロセスの追記分を読み込む
+USAGE_LOG_PATH = os.environ.get("AI_USAGE_LOG_PATH", "ai_usage.jsonl")
+
+# 予算 (USD)。None なら無制限
+DAILY_BUDGET_USD = 5.0
+GAME_BUDGET_USD = 0.5
+
+# 残り予算がこの割合を切ったら「厳格モード」(ローカルルールのみで審判) に切り替える
+STRICT_MODE_RATIO = 0.2
+
+# モデルごとの単価 (USD / 100万トークン): (入力, 出力)
+MODEL_PRICES = {
+    "gemini-2.0-flash": (0.10, 0.40),
+    "claude-sonnet-4-5-20250929": (3.00, 15.00),
+}
+DEFAULT_PRICE = (1.00, 5.00)
+# ------------------------------------------------------------------
+
+# 予算状態
+MODE_NORMAL = "normal"        # 通常通りAIを使う
+MODE_STRICT = "strict"        # 審判はローカルの厳格ルール、記事生成のみAI
+MODE_EXHAUSTED = "exhausted"  # AIを一切使わない (厳格ルール + 原文テンプレート)
+
+
+def estimate_cost(model, input_tokens, output_tokens):
+    price_in, price_out = MODEL_PRICES.get(model, DEFAULT_PRICE)
+    return (input_tokens * price_in + output_tokens * price_out) / 1_000_000
+
+
+class UsageLedger:
+    """
+    AI呼び出しのトークン数とコストを 日/試合/選手/ステージ 別に集計する台帳。
+    パイプラインの複数スレッドから呼ばれるのでロックで保護する。
+    集計は追記ログの読み込み位置までの内容で、他プロセス (シャードのワーカー) の追記分も
+    予算判定のたびに差分で取り込む。
+    """
+
+    def __init__(self, log_path=USAGE_LOG_PATH, daily_budget=DAILY_BUDGET_USD, game_budget=GAME_BUDGET_USD):
+        # 途中で chdir されても同じファイルを見続けるよう絶対パスにしておく
+        self.log_path = os.path.abspath(log_path) if log_path else None
+        self.daily_budget = daily_budget
+        self.game_budget = game_budget
+        self.lock = threading.Lock()
+        self.totals = {"day": {}, "game": {}, "player": {}, "stage": {}}
+        self._offset = 0
+        self._load_today()
+
+    @staticmethod
+    def _today():
+        return time.strftime("%Y-%m-%d")
+
+    def _add(self, entry):
+        for axis, key in (("day", entry["d"]), ("game", entry["g"]), ("player", entry["p"]), ("stage", entry["s"])):
+            bucket = self.totals[axis].setdefault(key, {"calls": 0, "in": 0, "out": 0, "cost": 0.0})
+            bucket["calls"] += 1
+            bucket["in"] += entry["i"]
+            bucket["out"] += entry["o"]
+            bucket["cost"] += entry["c"]
+
+    def _load_today(self):
+        # 同じ日の再起動 (cron実行など) でも日次予算が引き継がれるよう、今日の分だけ読み直す
+        with self.lock:
+            self._sync(since_day=self._today())
+
+    def _sync(self, since_day=None):
+        """前回の読み込み位置以降にログへ追記された行 (自他プロセス分) を集計に足す。ロック内で呼ぶ"""
+        if not self.log_path:
+            return
+        try:
+            if os.path.getsize(self.log_path) <= self._offset:
+                return
+            with open(self.log_path, "rb") as f:
+                f.seek(self._offset)
+                chunk = f.read()
+        except FileNotFoundError:
+            return
+        # 書き込み途中の最終行は次回に回す
+        end = chunk.rfind(b"\n") + 1
+        self._offset += end
+        for line in chunk[:end].splitlines():
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if since_day is None or entry.get("d", "") >= since_day:
+                self._add(entry)
+
+    def record(self, stage, model, input_tokens, output_tokens, game_pk=None, player=None):
+        entry = {
+            "t": round(time.time(), 3),
+            "d": self._today(),
+            "g": game_pk if game_pk is not None else "-",
+            "p": player or "-",
+            "s": stage,
+            "m": model,
+            "i": int(input_tokens or 0),
+            "o": int(output_tokens or 0),
+        }
+        entry["c"] = round(estimate_cost(model, entry["i"], entry["o"]), 6)
+        line = (json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+        with self.lock:
+            if not self.log_path:
+                self._add(entry)
+                return entry
+            # 1行を1回の追記で書く (O_APPEND なので他プロセスの行と混ざらない)。集計へは読み戻して他プロセス分と一緒に足す
+            fd = os.open(self.log_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, line)
+            finally:
+                os.close(fd)
+            self._sync()
+        return entry
+
+    def spent(self, axis, key):
+        with self.lock:
+            self._sync()
+            return self.totals[axis].get(key, {}).get("cost", 0.0)
+
+    def mode(self, game_pk=None):
+        """残り予算から現在のモードを決める (日次と試合別のうち厳しい方)"""
+        remaining_ratios = []
+        if self.daily_budget:
+            remaining_ratios.append(1 - self.spent("day", self._today()) / self.daily_budget)
+        if self.game_budget and game_pk is not None:
+            remaining_ratios.append(1 - self.spent("game", game_pk) / self.game_budget)
+        if not remaining_ratios:
+            return MODE_NORMAL
+        remaining = min(remaining_ratios)
+        if remaining <= 0:
+            return MODE_EXHAUSTED
+        if remaining < STRICT_MODE_RATIO:
+            return MODE_STRICT
+        return MODE_NORMAL
+
+    def summary(self):
+        with self.lock:
+            self._sync()
+            return json.loads(json.dumps(self.totals))
+
+
+# 監視プロセス全体で共有する台帳
+LEDGER = UsageLedger()
+
+
+def record_usage(stage, model, input_tokens, output_tokens, game_pk=None, player=None):
+    return LEDGER.record(stage, model, input_tokens, output_tokens, game_pk=game_pk, player=player)
+
+
+def summarize_log(log_path=USAGE_LOG_PATH, day=None):
+    """追記ログを読み、日/試合/選手/ステージ別の集計を返す"""
+    ledger = UsageLedger(log_path=None, daily_budget=None, game_budget=None)
+    with open(log_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if day is None or entry.get("d") == day:
+                ledger._add(entry)
+    return ledger.summary()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="AI利用量ログの集計")
+    parser.add_argument("--log", default=USAGE_LOG_PATH)
+    parser.add_argument("--day", help="YYYY-MM-DD (省略時は全期間)")
+    args = parser.parse_args()
+
+    totals = summarize_log(args.log, args.day)
+    for axis, label in (("day", "日別"), ("game", "試合別"), ("player", "選手別"), ("stage", "ステージ別")):
+        print(f"\n=== 💰 {label} ===")
+        for key, b in sorted(totals[axis].items(), key=lambda kv: -kv[1]["cost"]):
+            print(f"  {key}: {b['calls']}回 / in {b['in']} / out {b['out']} tok / ${b['cost']:.4f}")
@@ -1,13 +1,17 @@
-import requests
 import urllib.parse
 import webbrowser
-import anthropic
 import json
+import os
 import re
+import sys
+import threading
 import time
 from datetime import datetime, timedelta
-import pytz
-from players import WATCH_LIST
+from .players import WATCH_LIST
+from . import pipeline
+from . import ai_budget
+from . import mlb_api
+from .mlb_api import TEAM_MAP_PARTIAL, resolve_team_code
 
 # --- 🔧 設定エリア ------------------------------------------------
 #ローカル環境のURL
@@ -23,34 +27,35 @@ ANTHROPIC_API_KEY = "sk-ant-REDACTED
 # テスト設定 (Trueの場合、TEST_TARGET_DATEの試合を強制的に見に行きます)
 IS_TEST_MODE = True
 TEST_TARGET_DATE = "2025-11-01" 
+
+# パイプラインモード (Trueなら fetch→detect→judge→generate→publish を並列ステージで実行)
+USE_PIPELINE = True
+
+# ローカルLLMスタブ (llm_stub.py) に向ける場合は環境変数 LLM_STUB_URL を設定 (例: http://127.0.0.1:8765)
+LLM_STUB_URL = os.environ.get("LLM_STUB_URL")
 # ------------------------------------------------------------------
 
-TEAM_MAP_PARTIAL = {
-    "Dodgers": "LAD", "Marlins": "MIA", "Padres": "SD", "Yankees": "NYY",
-    "Cubs": "CHC", "Angels": "LAA", "Red Sox": "BOS", "Mets": "NYM",
-    "Braves": "ATL", "Phillies": "PHI", "Giants": "SF", "Rockies": "COL",
-    "Diamondbacks": "AZ", "Rays": "TB", "Blue Jays": "TOR", "Orioles": "BAL",
-    "White Sox": "CWS", "Royals": "KC", "Tigers": "DET", "Twins": "MIN",
-    "Guardians": "CLE", "Mariners": "SEA", "Astros": "HOU", "Rangers": "TEX",
-    "Athletics": "OAK", "Nationals": "WSH", "Pirates": "PIT", "Cardinals": "STL",
-    "Brewers": "MIL", "Reds": "CIN"
-}
-
-# 🔥 Claudeクライアントの初期化
-client = anthropic.Anthropic(api_key=ANTHROPIC_API_KEY)
+# 🔥 Claudeクライアントは初回のAI呼び出し時に作る (SDKのimportもそこまで遅らせ、AIを使わない実行を速くする)
+_client = None
+_client_lock = threading.Lock()
+
+def get_client():
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                import anthropic
+                _client = anthropic.Anthropic(api_key=ANTHROPIC_API_KEY, base_url=LLM_STUB_URL)
+    return _client
+
 WATCH_IDS = {p['id']: p for p in WATCH_LIST}
 
 def get_current_mlb_date():
+    import pytz
     tz = pytz.timezone('US/Eastern')
     now = datetime.now(tz)
     return now.strftime('%Y-%m-%d')
 
-def resolve_team_code(team_name):
-    for key, code in TEAM_MAP_PARTIAL.items():
-        if key in team_name:
-            return code
-    return "UNKNOWN"
-
 def to_ordinal(n):
     try: n = int(n)
     except: return str(n)
@@ -81,8 +86,13 @@ def is_risp(play_data):
             return True
     return False
 
+def _record_usage(stage, message, game_pk, player_name):
+    # 💰 トークン数を台帳へ記録 (日/試合/選手/ステージ別に集計される)
+    ai_budget.record_usage(stage, message.model, message.usage.input_tokens, message.usage.output_tokens,
+                           game_pk=game_pk, player=player_name)
+
 # 🔥 ClaudeによるAI審判機能
-def judge_impact_by_ai(player_name, description, context_str):
+def judge_impact_by_ai(player_name, description, context_str, game_pk=None):
     print(f"  ⚖️ Claude審判が判定中: {description} ({context_str})")
     
     prompt = f"""
@@ -112,13 +122,14 @@ def judge_impact_by_ai(player_name, description, context_str):
     
     try:
         # Claude API Call
-        message = client.messages.create(
+        message = get_client().messages.create(
             # 🔥 修正: Claude Sonnet 4.5 を指定
             model="claude-sonnet-4-5-20250929", 
             max_tokens=100,
             temperature=0,
             messages=[{"role": "user", "content": prompt}]
         )
+        _record_usage("judge", message, game_pk, player_name)
         answer = message.content[0].text.strip().upper()
         
         if "YES" in answer:
@@ -128,27 +139,37 @@ def judge_impact_by_ai(player_name, description, context_str):
             print("  🗑️ Claude判定: 却下 (NO)")
             return False
     except Exception as e:
+        # エラーは「却下」ではなく判定なし (呼び出し側で厳格ルールに切り替える)
         print(f"  ⚠️ Claude判定エラー: {e}")
-        return False
-
-def is_critical_moment(event, play_data, inning, score_diff, game_type, player_name, description):
-    if 'Game End' in event: return True
-    is_postseason = game_type not in ['R', 'S', 'E']
-    is_close_game = (score_diff <= 2)
+        return None
+
+def classify_moment(event, play_data, score_diff, game_type):
+    """ルールによる一次判定: 'ACCEPT' (確定) / 'JUDGE' (AI審判へ) / 'REJECT' (対象外)"""
+    if 'Game End' in event: return 'ACCEPT'
+    rules = pipeline.CLASSIFY_RULES
+    is_postseason = game_type not in pipeline.REGULAR_GAME_TYPES
+    is_close_game = (score_diff <= rules["close_game_diff"])
     is_scoring_position = is_risp(play_data)
 
     if is_close_game and is_scoring_position:
         print(f"  ⚡️ ルール判定: 接戦ピンチのため採用")
-        return True
+        return 'ACCEPT'
+
+    if (is_postseason and rules["judge_postseason"]) or score_diff <= rules["judge_diff"]:
+        return 'JUDGE'
+    return 'REJECT'
 
-    if is_postseason or score_diff <= 3:
+def is_critical_moment(event, play_data, inning, score_diff, game_type, player_name, description):
+    verdict = classify_moment(event, play_data, score_diff, game_type)
+    if verdict == 'ACCEPT': return True
+    if verdict == 'JUDGE':
         context_str = f"GameType: {game_type}, Inning: {inning}, ScoreDiff: {score_diff}"
         if judge_impact_by_ai(player_name, description, context_str):
             return True
     return False
 
 # 🔥 Claudeによる記事生成機能
-def get_japanese_content(english_desc, event_type, player_name, score_str):
+def get_japanese_content(english_desc, event_type, player_name, score_str, game_pk=None):
     print(f"🖋️ Claudeが {player_name} ({event_type}) の記事を執筆中...")
     
     system_prompt = "あなたはプロ野球トレーディングカードの敏腕編集者です。ファンが熱狂するようなテキストを作成してください。出力はJSON形式のみとしてください。"
@@ -170,7 +191,7 @@ def get_japanese_content(english_desc, event_type, player_name, score_str):
     for attempt in range(max_retries):
         try:
             # Claude API Call
-            message = client.messages.create(
+            message = get_client().messages.create(
                 # 🔥 修正: Claude Sonnet 4.5 を指定
                 model="claude-sonnet-4-5-20250929",
                 max_tokens=1000,
@@ -178,6 +199,7 @@ def get_japanese_content(english_desc, event_type, player_name, score_str):
                 system=system_prompt,
                 messages=[{"role": "user", "content": user_prompt}]
             )
+            _record_usage("generate", message, game_pk, player_name)
             text = message.content[0].text
             
             # JSON抽出ロジック
@@ -205,7 +227,9 @@ def get_japanese_content(english_desc, event_type, player_name, score_str):
 
 def send_to_admin(player_name, event_type, desc, away_team, home_team, away_score, home_score, progress):
     ai_content = get_japanese_content(desc, event_type, player_name, f"{away_score}-{home_score}")
-    
+    publish_to_admin(player_name, event_type, desc, ai_content, away_team, home_team, away_score, home_score, progress)
+
+def publish_to_admin(player_name, event_type, desc, ai_content, away_team, home_team, away_score, home_score, progress, related_card_ids=None, merged_moments=None):
     payload = {
         "player": player_name,
         "title": ai_content.get('title', event_type),
@@ -218,6 +242,12 @@ def send_to_admin(player_name, event_type, desc, away_team, home_team, away_scor
         "homeScore": home_score,
         "progress": progress
     }
+    if related_card_ids:
+        # 関連カード (card_index.py) は live_moments.metadata.related_card_ids に保存される
+        payload["relatedCardIds"] = ",".join(related_card_ids)
+    if merged_moments:
+        # 統合されたモーメント (coalescer.py) は live_moments.metadata.merged_moments に保存される
+        payload["mergedMoments"] = json.dumps(merged_moments, ensure_ascii=False, separators=(",", ":"))
     
     full_url = f"{NEXTJS_ADMIN_URL}?{urllib.parse.urlencode(payload)}"
     print(f"🚀 管理画面を起動中...")
@@ -229,24 +259,23 @@ def check_games_for_highlights():
     print(f"📅 {target_date} の試合をスキャン中...")
     
     try:
-        sched = requests.get(f"https://statsapi.mlb.com/api/v1/schedule?sportId=1&date={target_date}").json()
+        games = mlb_api.fetch_schedule_games(target_date)
     except Exception as e:
         print(f"❌ 日程取得エラー: {e}")
         return
 
-    dates = sched.get('dates', [])
-    if not dates:
+    if not games:
         print("💤 指定日に試合データがありません")
         return
 
-    for game in dates[0]['games']:
+    for game in games:
         game_pk = game['gamePk']
         game_type = game.get('gameType', 'R')
         away_team = game['teams']['away']['team']['name']
         home_team = game['teams']['home']['team']['name']
         
         try:
-            feed = requests.get(f"https://statsapi.mlb.com/api/v1.1/game/{game_pk}/feed/live").json()
+            feed = mlb_api.fetch_feed(game_pk)
         except: continue
 
         live_data = feed.get('liveData', {})
@@ -256,13 +285,15 @@ def check_games_for_highlights():
         
         home_runs_total = linescore.get('teams', {}).get('home', {}).get('runs', 0)
         away_runs_total = linescore.get('teams', {}).get('away', {}).get('runs', 0)
-        score_diff = abs(home_runs_total - away_runs_total)
 
         for play in all_plays:
             matchup = play.get('matchup', {})
             result = play.get('result', {})
             event = result.get('event', '')
             about = play.get('about', {})
+            # 点差はプレイ直後の途中経過で判定する (パイプライン / バックテストと同じ定義)
+            play_away, play_home = pipeline.play_score(play, away_runs_total, home_runs_total)
+            score_diff = abs(play_away - play_home)
             
             current_inning_num = about.get('inning', 0)
             play_progress = to_form_progress(current_inning_num, about.get('halfInning', 'top'))
@@ -301,4 +332,8 @@ def check_games_for_highlights():
                     send_to_admin(p_name, "VICTORY", f"{p_name} records the save!", away_team, home_team, away_runs_total, home_runs_total, "Final")
 
 if __name__ == "__main__":
-    check_games_for_highlights()
\ No newline at end of file
+    if USE_PIPELINE:
+        target_date = TEST_TARGET_DATE if IS_TEST_MODE else get_current_mlb_date()
+        pipeline.run_highlight_pipeline(sys.modules[__name__], target_date)
+    else:
+        check_games_for_highlights()
\ No newline at end of file
@@ -0,0 +1,308 @@
+import csv
+import json
+import time
+import unicodedata
+
+import numpy as np
+
+from . import coalescer
+from . import local_judge
+from . import pipeline
+from . import statcast
+
+# --- 🔧 設定エリア ------------------------------------------------
+# 現行ルール (一次判定の値は pipeline.CLASSIFY_RULES をそのまま使う)。
+# 候補ルールは JSON ファイルでこの一部を上書きする (例: {"judge_diff": 2, "accept_prob": 0.8})
+BASELINE_RULES = {
+    **pipeline.CLASSIFY_RULES,   # close_game_diff / judge_diff / judge_postseason
+    "statcast": True,            # Statcast 閾値で確定 (pipeline.USE_STATCAST_DETECTORS)
+    "statcast_rules": None,      # None なら statcast.STATCAST_RULES
+    "decisions": True,           # 勝利/セーブ投手を VICTORY として確定
+    "local_judge": True,         # 学習済みローカル審判で自信のあるプレイは AI を呼ばない
+    "accept_prob": local_judge.ACCEPT_PROB,
+    "reject_prob": local_judge.REJECT_PROB,
+}
+
+# 必須モーメントのうち見逃したものを表示する件数
+MAX_MISSED_SHOWN = 20
+# ------------------------------------------------------------------
+
+NON_POSTSEASON = pipeline.REGULAR_GAME_TYPES
+LABEL_WIDTH = 20
+
+
+def load_rules(path):
+    with open(path, encoding="utf-8") as f:
+        overrides = json.load(f)
+    unknown = set(overrides) - set(BASELINE_RULES)
+    if unknown:
+        raise ValueError(f"未知のルール項目: {', '.join(sorted(unknown))}")
+    return dict(BASELINE_RULES, **overrides)
+
+
+def load_logged_verdicts(path=local_judge.JUDGE_LOG_PATH):
+    """判定ログの AI審判の結果 (moment_key → YES/NO)。同じキーは新しい方を使う"""
+    return {e["k"]: e["ai"] for e in local_judge.read_log(path) if e.get("k")}
+
+
+def load_must_have(path):
+    """
+    必須モーメント一覧 (CSV: game_pk,at_bat_index[,player_id][,note])。
+    at_bat_index は勝利/セーブ投手なら winner / save と書く
+    """
+    items = []
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        for row in csv.DictReader(f):
+            items.append({
+                "game_pk": int(row["game_pk"]),
+                "at_bat": str(row["at_bat_index"]).strip(),
+                "player_id": int(row["player_id"]) if (row.get("player_id") or "").strip() else None,
+                "note": row.get("note") or "",
+            })
+    return items
+
+
+class Backtest:
+    """
+    アーカイブの全プレイに候補ルールを配列演算で当て、公開されるモーメントを再現する。
+    AI審判が必要なプレイの結果は「判定ログの実際の AI の答え → ローカル審判の予測 → 厳格ルール」の順で代用する。
+    """
+
+    def __init__(self, archive, watch_ids, map_event_type, logged_verdicts=None, judge=None,
+                 season=None, game_types=None):
+        self.archive = archive
+        self.watch_ids = watch_ids
+        self.logged = logged_verdicts or {}
+        self.judge = judge if judge is not None else local_judge.LocalJudge()
+        P, G = archive.plays, archive.games
+
+        # ルールに依存しない列はここで一度だけ作る
+        self.in_scope = archive.game_mask(season, game_types)
+        watch = np.fromiter(watch_ids, dtype=np.int64)
+        self.batter_watched = np.isin(P["batter_id"], watch) & self.in_scope
+        self.pitcher_watched = np.isin(P["pitcher_id"], watch) & self.in_scope
+        self.player = np.where(self.batter_watched, P["batter_id"], np.where(self.pitcher_watched, P["pitcher_id"], 0))
+        self.event_names = np.array(archive.events, dtype=object)[P["event"]]
+        self.event_types = np.array([map_event_type(e) for e in archive.events], dtype=object)[P["event"]]
+        self.game_end = np.array(['Game End' in e for e in archive.events], dtype=bool)[P["event"]]
+        game_type = np.array(archive.game_types, dtype=object)[G["game_type"]]
+        self.game_type = game_type[P["game"]]
+        self.postseason = ~np.isin(self.game_type, NON_POSTSEASON)
+        self.score_diff = np.abs(P["away_score"].astype(np.int32) - P["home_score"])
+        self.game_pk = G["game_pk"][P["game"]]
+        self.statcast_arrays = {
+            "batter_id": P["batter_id"].astype(np.int64),
+            "pitcher_id": P["pitcher_id"].astype(np.int64),
+            "event": self.event_names,
+            **{m: P[m].astype(np.float64) for m in statcast.METRICS},
+        }
+        # 勝利/セーブは最終回の出来事として coalesce する (pipeline.detect_moments と同じ扱い)
+        last_play = np.append(G["play_start"][1:], len(archive)).astype(np.int64) - 1
+        has_plays = last_play >= G["play_start"]
+        self.final_inning = np.zeros(len(G["game_pk"]), dtype=np.int32)
+        self.final_inning[has_plays] = P["inning"][last_play[has_plays]]
+        self.final_diff = np.abs(G["away_final"].astype(np.int32) - G["home_final"])
+        self.game_in_scope = np.zeros(len(G["game_pk"]), dtype=bool)
+        self.game_in_scope[np.unique(P["game"][self.in_scope])] = True
+
+    def _moment_key(self, i, player_id, event_type):
+        return f"{self.game_pk[i]}:{self.archive.plays['at_bat'][i]}:{player_id}:{event_type}"
+
+    def _features(self, i):
+        P = self.archive.plays
+        return {
+            "event_type": self.event_types[i],
+            "event": self.event_names[i],
+            "rbi": int(P["rbi"][i]),
+            "scoring_play": bool(P["scoring"][i]),
+            "risp": bool(P["risp"][i]),
+            "outs": int(P["outs"][i]),
+            "inning": int(P["inning"][i]),
+            "half": "bottom" if P["bottom"][i] else "top",
+            "away_score": int(P["away_score"][i]),
+            "home_score": int(P["home_score"][i]),
+            "score_diff": int(self.score_diff[i]),
+            "game_type": self.game_type[i],
+            **{m: None if np.isnan(P[m][i]) else round(float(P[m][i]), 1) for m in statcast.METRICS},
+        }
+
+    def run(self, rules, name="baseline"):
+        started = time.perf_counter()
+        P = self.archive.plays
+        published = {}   # (game_pk, at_bat, player_id) -> 採用理由
+        shapes = {}      # 同じキー -> (タイプ, イニング, 点差)。coalesce の再現に使う
+        counts = {"statcast": 0, "rule": 0, "decision": 0, "local_yes": 0, "local_no": 0,
+                  "ai_yes": 0, "ai_no": 0, "judge_candidates": 0}
+        proxy = {"logged": 0, "local_model": 0, "strict_rule": 0}
+
+        statcast_mask = np.zeros(len(self.archive), dtype=bool)
+        if rules["statcast"]:
+            hits = statcast.evaluate_rules(self.statcast_arrays, self.watch_ids, rules["statcast_rules"])
+            for i, (rule, _, player_id) in hits.items():
+                if self.in_scope[i]:
+                    statcast_mask[i] = True
+                    key = (int(self.game_pk[i]), str(P["at_bat"][i]), player_id)
+                    published[key] = "statcast"
+                    shapes[key] = (rule["moment_type"], int(P["inning"][i]), int(self.score_diff[i]))
+            counts["statcast"] = int(statcast_mask.sum())
+
+        candidate = (self.batter_watched | self.pitcher_watched) & ~statcast_mask
+        accept = candidate & (self.game_end | ((self.score_diff <= rules["close_game_diff"]) & P["risp"]))
+        judge = candidate & ~accept & (
+            (self.postseason & rules["judge_postseason"]) | (self.score_diff <= rules["judge_diff"])
+        )
+        for i in np.flatnonzero(accept):
+            key = (int(self.game_pk[i]), str(P["at_bat"][i]), int(self.player[i]))
+            published[key] = "rule"
+            shapes[key] = self._shape(i)
+        counts["rule"] = int(accept.sum())
+
+        use_local = rules["local_judge"] and self.judge.ready
+        judge_idx = np.flatnonzero(judge)
+        counts["judge_candidates"] = len(judge_idx)
+        for i in judge_idx:
+            player_id = int(self.player[i])
+            features = self._features(i)
+            prob = self.judge.probability(features) if self.judge.ready else None
+            # 閾値は候補ルールの値を使う (渡された LocalJudge の設定は書き換えない)
+            verdict = self.judge.decide(prob, rules["accept_prob"], rules["reject_prob"]) if use_local else None
+            if verdict is not None:
+                counts["local_yes" if verdict else "local_no"] += 1
+            else:
+                verdict = self._ai_proxy(self._moment_key(i, player_id, self.event_types[i]), prob, features, proxy)
+                counts["ai_yes" if verdict else "ai_no"] += 1
+            if verdict:
+                key = (int(self.game_pk[i]), str(P["at_bat"][i]), player_id)
+                published[key] = "judge"
+                shapes[key] = self._shape(i)
+
+        if rules["decisions"]:
+            G = self.archive.games
+            for g in np.flatnonzero(self.game_in_scope):
+                for key in ("winner", "save"):
+                    pid = int(G[f"{key}_id"][g])
+                    if pid in self.watch_ids:
+                        published[(int(G["game_pk"][g]), key, pid)] = "decision"
+                        shapes[(int(G["game_pk"][g]), key, pid)] = ("VICTORY", int(self.final_inning[g]), int(self.final_diff[g]))
+                        counts["decision"] += 1
+
+        ai_judge_calls = counts["ai_yes"] + counts["ai_no"]
+        generated = self._coalesce(shapes)
+        return {
+            "name": name,
+            "rules": rules,
+            "published": published,
+            "generated": generated,
+            "counts": counts,
+            "proxy": proxy,
+            "ai_calls": {"judge": ai_judge_calls, "generate": len(generated), "total": ai_judge_calls + len(generated)},
+            "plays": int(self.in_scope.sum()),
+            "elapsed_ms": (time.perf_counter() - started) * 1000,
+        }
+
+    def _shape(self, i):
+        return (self.event_types[i], int(self.archive.plays["inning"][i]), int(self.score_diff[i]))
+
+    def _coalesce(self, shapes):
+        """
+        採用されたモーメントをライブと同じまとめ役に通し、記事を書く (= 単独で公開される) キーを返す。
+        窓は全部閉じてから数えるので時刻は使わない。レート上限は公開を遅らせるだけなので数には影響しない
+        """
+        c = coalescer.MomentCoalescer(rate_limits={}, verbose=False)
+        for (game_pk, at_bat, player_id), (event_type, inning, score_diff) in shapes.items():
+            c.add({
+                "moment_key": (game_pk, at_bat, player_id), "game_pk": game_pk, "player_id": player_id,
+                "player_name": self.archive.players.get(player_id, ""), "event_type": event_type,
+                "inning": inning, "progress": "", "score_diff": score_diff,
+            }, now=0.0)
+        return {m["moment_key"] for m in c.pop_ready(now=0.0, flush=True)}
+
+    def _ai_proxy(self, moment_key, prob, features, proxy):
+        if moment_key in self.logged:
+            proxy["logged"] += 1
+            return bool(self.logged[moment_key])
+        if prob is not None:
+            proxy["local_model"] += 1
+            return prob >= 0.5
+        proxy["strict_rule"] += 1
+        return pipeline.strict_rule_verdict({
+            "event_type": features["event_type"], "inning": features["inning"], "score_diff": features["score_diff"],
+        })
+
+
+def must_have_agreement(result, must_have):
+    """必須モーメントのうち公開されたもの / 見逃したもの"""
+    hit, missed = [], []
+    for item in must_have:
+        found = any(
+            game_pk == item["game_pk"] and at_bat == item["at_bat"]
+            and (item["player_id"] is None or player_id == item["player_id"])
+            for game_pk, at_bat, player_id in result["published"]
+        )
+        (hit if found else missed).append(item)
+    return hit, missed
+
+
+def _published_index(result):
+    return {(g, a) for g, a, _ in result["published"]}
+
+
+def print_report(results, archive, must_have=None):
+    base = results[0]
+    print(f"\n=== 🧪 バックテスト ({base['plays']}打席) ===")
+    print("※ シーズン節目 (RECORD_BREAK) は累積成績が要るため再現しない。記事数は coalesce の統合後で数える")
+    print(_pad("", LABEL_WIDTH) + "".join(f"{r['name'][:12]:>14}" for r in results))
+    rows = [
+        ("採用 (統合前)", lambda r: len(r["published"])),
+        ("  Statcast確定", lambda r: r["counts"]["statcast"]),
+        ("  ルール確定", lambda r: r["counts"]["rule"]),
+        ("  勝利/セーブ", lambda r: r["counts"]["decision"]),
+        ("  審判で採用", lambda r: r["counts"]["local_yes"] + r["counts"]["ai_yes"]),
+        ("公開 (統合後)", lambda r: len(r["generated"])),
+        ("審判候補", lambda r: r["counts"]["judge_candidates"]),
+        ("  ローカル確定", lambda r: r["counts"]["local_yes"] + r["counts"]["local_no"]),
+        ("AI呼び出し (審判)", lambda r: r["ai_calls"]["judge"]),
+        ("AI呼び出し (記事)", lambda r: r["ai_calls"]["generate"]),
+        ("AI呼び出し 合計", lambda r: r["ai_calls"]["total"]),
+    ]
+    for label, value in rows:
+        print(_pad(label, LABEL_WIDTH) + "".join(f"{value(r):>14}" for r in results))
+    if must_have:
+        print(_pad("必須モーメント一致", LABEL_WIDTH) + "".join(
+            f"{len(must_have_agreement(r, must_have)[0]):>10}/{len(must_have):<3}" for r in results))
+    print(_pad("評価時間 (ms)", LABEL_WIDTH) + "".join(f"{r['elapsed_ms']:>14.0f}" for r in results))
+
+    for r in results:
+        p = r["proxy"]
+        if sum(p.values()):
+            print(f"  [{r['name']}] AI審判の代用: 実ログ {p['logged']} / ローカルモデル {p['local_model']} / 厳格ルール {p['strict_rule']}")
+    for r in results[1:]:
+        gained = _published_index(r) - _published_index(base)
+        lost = _published_index(base) - _published_index(r)
+        print(f"  [{r['name']}] 現行比: +{len(gained)}件 / -{len(lost)}件")
+
+    if must_have:
+        pk_to_game = {int(pk): g for g, pk in enumerate(archive.games["game_pk"])}
+        for r in results:
+            _, missed = must_have_agreement(r, must_have)
+            if not missed:
+                continue
+            print(f"\n  [{r['name']}] 見逃した必須モーメント ({len(missed)}件):")
+            for item in missed[:MAX_MISSED_SHOWN]:
+                print(f"    {item['game_pk']} / {item['at_bat']}: {_describe(archive, pk_to_game, item) or item['note']}")
+
+
+def _pad(text, width):
+    # 全角文字は2桁として数えて揃える
+    used = sum(2 if unicodedata.east_asian_width(c) in "WF" else 1 for c in text)
+    return text + " " * max(width - used, 0)
+
+
+def _describe(archive, pk_to_game, item):
+    g = pk_to_game.get(item["game_pk"])
+    if g is None or not item["at_bat"].isdigit():
+        return None
+    start = archive.games["play_start"][g]
+    end = archive.games["play_start"][g + 1] if g + 1 < len(archive.games["play_start"]) else len(archive)
+    offsets = np.flatnonzero(archive.plays["at_bat"][start:end] == int(item["at_bat"]))
+    return archive.description(int(start + offsets[0])) if len(offsets) else None
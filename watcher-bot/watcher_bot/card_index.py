@@ -0,0 +1,210 @@
+import os
+import re
+import threading
+import time
+import unicodedata
+from functools import lru_cache
+
+import requests
+
+# --- 🔧 設定エリア ------------------------------------------------
+# card_catalogs を読む Supabase (未設定なら索引は空のまま。公開は止めない)
+SUPABASE_URL = os.environ.get("SUPABASE_URL") or os.environ.get("NEXT_PUBLIC_SUPABASE_URL")
+SUPABASE_KEY = os.environ.get("SUPABASE_SERVICE_ROLE_KEY") or os.environ.get("NEXT_PUBLIC_SUPABASE_ANON_KEY")
+
+# 差分更新の間隔 (秒): created_at が前回より新しいカードだけを取り込む
+REFRESH_INTERVAL_SEC = 300
+
+# 全件再構築の間隔 (秒): 削除・名前修正は差分では拾えないので定期的に作り直す
+FULL_REBUILD_INTERVAL_SEC = 6 * 3600
+
+# 取得に失敗した後、次に試すまでの間隔 (秒)。初回構築の失敗も含む
+RETRY_AFTER_FAILURE_SEC = 60
+
+# 1リクエストで取得する行数
+PAGE_SIZE = 1000
+# ------------------------------------------------------------------
+
+CATALOG_URL = "{base}/rest/v1/card_catalogs"
+
+# 名前の区切りとして捨てる文字 (空白・中黒・ハイフンなど)
+_SEPARATORS = re.compile(r"[\s・·.\-_'’,]+")
+
+
+def _katakana_to_hiragana(text):
+    return "".join(chr(ord(c) - 0x60) if "ァ" <= c <= "ヶ" else c for c in text)
+
+
+def _fold_romaji(token):
+    # 長音の揺れを吸収する: Ohtani / Otani / Ootani → otani, Yuusei → yusei
+    token = re.sub(r"o[ouh](?![aeiou])", "o", token)
+    return token.replace("uu", "u")
+
+
+@lru_cache(maxsize=65536)
+def name_keys(name):
+    """
+    名前を索引キーの集合に正規化する。
+    - NFKC で全角/半角を揃え、カタカナはひらがなに寄せる
+    - 空白の有無 ("大谷 翔平" / "大谷翔平") と姓名の順 ("Shohei Ohtani" / "Ohtani Shohei") を区別しない
+    - ローマ字は小文字化して長音表記を畳む
+    """
+    if not name:
+        return frozenset()
+    text = _katakana_to_hiragana(unicodedata.normalize("NFKC", name).lower().strip())
+    tokens = [_fold_romaji(t) if t.isascii() else t for t in _SEPARATORS.split(text) if t]
+    if not tokens:
+        return frozenset()
+    return frozenset({"".join(tokens), "".join(sorted(tokens))})
+
+
+class CardIndex:
+    """
+    card_catalogs の転置索引 (正規化した名前キー / MLB選手ID → カードID)。
+    起動時に一度だけ全件を読み、以降は created_at の差分だけを取り込む。
+    引きは辞書参照だけなので1モーメントあたり数マイクロ秒。
+    """
+
+    def __init__(self, watch_list=None, fetch_page=None):
+        self.lock = threading.Lock()
+        self.by_key = {}      # 名前キー -> {card_id}
+        self.by_player = {}   # MLB選手ID -> {card_id}
+        self.cards = {}       # card_id -> player_name
+        self.watermark = None  # 取り込み済みの最新 (created_at, id)
+        self.refreshed_at = 0.0
+        self.rebuilt_at = 0.0
+        self.failed_at = None
+        self.refreshing = False
+        self.fetch_page = fetch_page or _fetch_catalog_page
+        # 監視リストの漢字・ローマ字・かな表記を選手IDへの橋渡しに使う
+        self.player_by_key = {}
+        for p in (watch_list or []):
+            for alias in (p.get('name'), p.get('name_en'), p.get('name_kana'), *p.get('aliases', [])):
+                for key in name_keys(alias):
+                    self.player_by_key[key] = p['id']
+
+    def _add(self, card_id, player_name):
+        keys = name_keys(player_name)
+        self.cards[card_id] = player_name
+        for key in keys:
+            self.by_key.setdefault(key, set()).add(card_id)
+        for player_id in {self.player_by_key[k] for k in keys if k in self.player_by_key}:
+            self.by_player.setdefault(player_id, set()).add(card_id)
+
+    def _load(self, after):
+        count = 0
+        while True:
+            rows = self.fetch_page(after, PAGE_SIZE)
+            if not rows:
+                return count
+            with self.lock:
+                for row in rows:
+                    self._add(row['id'], row.get('player_name'))
+                after = (rows[-1]['created_at'], rows[-1]['id'])
+                self.watermark = after
+            count += len(rows)
+            if len(rows) < PAGE_SIZE:
+                return count
+
+    def rebuild(self):
+        """全件を読み直して索引を作り直す (読み込み中も古い索引で引ける)"""
+        fresh = CardIndex(fetch_page=self.fetch_page)
+        fresh.player_by_key = self.player_by_key
+        count = fresh._load(None)
+        with self.lock:
+            self.by_key, self.by_player, self.cards = fresh.by_key, fresh.by_player, fresh.cards
+            self.watermark = fresh.watermark
+            self.refreshed_at = self.rebuilt_at = time.monotonic()
+        print(f"🗂️ カード索引を構築: {count}枚 / 名前キー {len(self.by_key)}")
+        return count
+
+    def refresh(self):
+        """前回以降に追加されたカードだけを取り込む"""
+        count = self._load(self.watermark)
+        self.refreshed_at = time.monotonic()
+        if count:
+            print(f"🗂️ カード索引を差分更新: +{count}枚")
+        return count
+
+    def _due_job(self, now):
+        if self.failed_at is not None and now - self.failed_at < RETRY_AFTER_FAILURE_SEC:
+            return None
+        if not self.rebuilt_at or now - self.rebuilt_at >= FULL_REBUILD_INTERVAL_SEC:
+            return self.rebuild
+        if now - self.refreshed_at >= REFRESH_INTERVAL_SEC:
+            return self.refresh
+        return None
+
+    def maybe_refresh(self, wait=False):
+        """
+        間隔を過ぎていれば差分更新 (または全件再構築) する。同時に走るのは1つだけ。
+        公開の経路から呼ばれるので、通常は別スレッドで走らせてすぐに戻る (wait=True なら終わるまで待つ)
+        """
+        with self.lock:
+            job = None if self.refreshing else self._due_job(time.monotonic())
+            if job is None:
+                return
+            self.refreshing = True
+        if wait:
+            self._run(job)
+        else:
+            threading.Thread(target=self._run, args=(job,), name="card-index-refresh", daemon=True).start()
+
+    def _run(self, job):
+        try:
+            job()
+            self.failed_at = None
+        except Exception as e:
+            # 索引の更新失敗で公開は止めない (RETRY_AFTER_FAILURE_SEC 後に再試行)
+            print(f"⚠️ カード索引の更新エラー: {e}")
+            self.failed_at = time.monotonic()
+        finally:
+            self.refreshing = False
+
+    def related_card_ids(self, player_id=None, player_name=None):
+        """選手ID・名前のどちらかに一致するカードID (ソート済みリスト)"""
+        with self.lock:
+            found = set(self.by_player.get(player_id, ()))
+            for key in name_keys(player_name):
+                found |= self.by_key.get(key, set())
+        return sorted(found)
+
+
+def _fetch_catalog_page(after, limit):
+    """created_at, id 順に after より後ろのカードを1ページ取得する (PostgREST のキーセットページング)"""
+    if not SUPABASE_URL or not SUPABASE_KEY:
+        return []
+    params = {
+        "select": "id,player_name,created_at",
+        "order": "created_at.asc,id.asc",
+        "limit": str(limit),
+    }
+    if after is not None:
+        created_at, card_id = after
+        params["or"] = f"(created_at.gt.{created_at},and(created_at.eq.{created_at},id.gt.{card_id}))"
+    resp = requests.get(
+        CATALOG_URL.format(base=SUPABASE_URL.rstrip('/')),
+        params=params,
+        headers={"apikey": SUPABASE_KEY, "Authorization": f"Bearer {SUPABASE_KEY}"},
+        timeout=30,
+    )
+    resp.raise_for_status()
+    return resp.json()
+
+
+_INDEX = None
+_INDEX_LOCK = threading.Lock()
+
+
+def get_index():
+    """プロセス内で共有する索引 (初回使用時に構築)"""
+    global _INDEX
+    with _INDEX_LOCK:
+        if _INDEX is None:
+            from .players import WATCH_LIST
+            if not SUPABASE_URL or not SUPABASE_KEY:
+                print("⚠️ SUPABASE_URL / SUPABASE_SERVICE_ROLE_KEY が未設定のため、カード紐付けは行いません")
+            _INDEX = CardIndex(WATCH_LIST)
+    # 起動時の構築だけは待つ (最初の公開から紐付けが効くように)。以降の更新は公開時に裏で走る
+    _INDEX.maybe_refresh(wait=True)
+    return _INDEX
@@ -0,0 +1,312 @@
+import argparse
+import sys
+from datetime import date, timedelta
+
+# --- 🔧 設定エリア ------------------------------------------------
+# サブコマンドごとに必要なモジュールだけを関数内で import する。
+# (inspect / find は AI SDK も NumPy も読まないので一瞬で起動する)
+WATCHERS = {
+    "gemini": "ai_watcher",
+    "claude": "ai_watcher_claude",
+}
+DEFAULT_WATCHER = "gemini"
+
+NEXTJS_ADMIN_URL = "http://localhost:3000/admin/moments"
+# ------------------------------------------------------------------
+
+
+def _load_watcher(name):
+    import importlib
+    return importlib.import_module(f".{WATCHERS[name]}", __package__)
+
+
+def _target_date(watcher, date_arg=None):
+    """--date があればその日、無ければ監視モジュールの設定 (テスト日 or 今日)"""
+    if date_arg:
+        return date_arg
+    return watcher.TEST_TARGET_DATE if watcher.IS_TEST_MODE else watcher.get_current_mlb_date()
+
+
+def _print_play(p):
+    print(f"[{p['index']}] {p['half'][:3]} {p['inning']} | "
+          f"{p['batter_name']}({p['batter_id']}) vs {p['pitcher_name']}({p['pitcher_id']}) -> {p['event']}")
+    print(f"      {p['description']}")
+
+
+def cmd_watch(args):
+    watcher = _load_watcher(args.watcher)
+    if args.workers:
+        from . import shard
+        # 日付はワーカーへ引数で渡す (spawn で起動したワーカーには親のモジュール状態が引き継がれない)
+        shard.run_coordinator(WATCHERS[args.watcher], args.workers, args.db, args.include_final, target_date=args.date)
+    elif args.legacy:
+        if args.date:
+            # 逐次処理はモジュールの設定を読むので、このプロセス内でだけ差し替える
+            watcher.IS_TEST_MODE = True
+            watcher.TEST_TARGET_DATE = args.date
+        watcher.check_games_for_highlights()
+    else:
+        from . import pipeline
+        pipeline.run_highlight_pipeline(watcher, _target_date(watcher, args.date))
+
+
+def cmd_inspect(args):
+    import json
+    from . import mlb_api
+
+    print(f"⚾ データを取得中... (Game ID: {args.game_pk})")
+    feed = mlb_api.fetch_feed(args.game_pk)
+    game_data = feed.get('gameData', {})
+    teams = game_data.get('teams', {})
+
+    print("\n=== 🏟️ 試合情報 ===")
+    print(f"Date: {game_data.get('datetime', {}).get('dateTime')} (Official Date: {game_data.get('datetime', {}).get('officialDate')})")
+    print(f"Venue: {game_data.get('venue', {}).get('name')}")
+    print(f"Away Team: {teams.get('away', {}).get('name')}")
+    print(f"Home Team: {teams.get('home', {}).get('name')}")
+    print(f"Status: {game_data.get('status', {}).get('detailedState')}")
+
+    all_plays = feed.get('liveData', {}).get('plays', {}).get('allPlays', [])
+    plays = mlb_api.find_plays(all_plays, player=args.player, event=args.event)
+    print(f"\n総プレイ数: {len(all_plays)} / 条件一致: {len(plays)}")
+    print("--------------------------------------------------")
+    for p in plays[:args.limit]:
+        _print_play(p)
+    if len(plays) > args.limit:
+        print(f"... 他 {len(plays) - args.limit} 件 (--limit で増やせます)")
+
+    if args.scan_id:
+        # パスの想定違いを調べるため、データ全体を文字列検索する
+        print("\n--- 🔍 データ全体のスキャン ---")
+        if str(args.scan_id) in json.dumps(feed):
+            print(f"✅ ID '{args.scan_id}' はデータ内に存在します")
+        else:
+            print(f"❌ ID '{args.scan_id}' はデータ内に存在しません (試合IDが違うか、出場していません)")
+
+
+def cmd_find(args):
+    from . import mlb_api
+
+    print(f"📅 {args.date} の試合日程を検索中...")
+    games = mlb_api.fetch_schedule_games(args.date)
+    if args.team:
+        games = [
+            g for g in games
+            if args.team in g['teams']['away']['team']['name'] or args.team in g['teams']['home']['team']['name']
+        ]
+    if not games:
+        print("❌ 条件に合う試合がありません。")
+        return
+
+    last_match = None
+    for game in games:
+        away, home = game['teams']['away']['team']['name'], game['teams']['home']['team']['name']
+        print(f"  - {away} vs {home} (ID: {game['gamePk']}, {game.get('status', {}).get('detailedState')})")
+        if args.player is None and args.event is None:
+            continue
+        ctx = mlb_api.fetch_game_context(game)
+        for p in mlb_api.find_plays(ctx["all_plays"], player=args.player, event=args.event):
+            _print_play(p)
+            last_match = (ctx, p)
+
+    if args.open:
+        if last_match is None:
+            print("❌ 開くプレイが見つかりませんでした。")
+            return
+        import urllib.parse
+        import webbrowser
+
+        ctx, p = last_match
+        payload = {
+            "player": p["batter_name"],
+            "title": f"Event: {p['event']}",
+            "desc": p["description"],
+            "intensity": "5",
+            "visitor": mlb_api.resolve_team_code(ctx["away_team"]),
+            "home": mlb_api.resolve_team_code(ctx["home_team"]),
+        }
+        full_url = f"{NEXTJS_ADMIN_URL}?{urllib.parse.urlencode(payload)}"
+        print(f"\n🎉 最後に見つかったプレイを管理画面で開きます:\n{full_url}")
+        webbrowser.open(full_url)
+
+
+def _date_range(start, end):
+    day, last = date.fromisoformat(start), date.fromisoformat(end)
+    while day <= last:
+        yield day.isoformat()
+        day += timedelta(days=1)
+
+
+def cmd_backfill(args):
+    from . import milestones
+    from .players import WATCH_LIST
+
+    end = args.end or args.start
+    tracker = milestones.get_tracker()
+    watch_ids = [p['id'] for p in WATCH_LIST]
+    if args.seed_only:
+        # 期間末までの成績をまとめて取り込む (以降の監視はその翌日から数える)
+        if tracker.seed_through(int(end[:4])) is None:
+            tracker.seed(watch_ids, int(end[:4]), end)
+        return
+
+    # 期間の開始前日までをシードしておき、期間内の試合は再生しながら数える
+    tracker.ensure_seeded(watch_ids, args.start)
+
+    from . import pipeline
+    watcher = _load_watcher(args.watcher)
+    total = 0
+    for target_date in _date_range(args.start, end):
+        total += len(pipeline.run_highlight_pipeline(watcher, target_date) or [])
+    print(f"\n📦 バックフィル完了: {args.start} 〜 {end} / 公開 {total}件")
+
+
+def cmd_replay(args):
+    from . import mlb_api
+    from . import pipeline
+
+    watcher = _load_watcher(args.watcher)
+    # 再生では既定でシーズン成績を更新しない (本番の節目判定を汚さない)
+    pipeline.USE_MILESTONE_TRACKER = args.milestones
+
+    feed = mlb_api.fetch_feed(args.game_pk)
+    game = mlb_api.game_from_feed(feed)
+    if args.publish:
+        pipeline.HighlightPipeline(watcher).run([game])
+        return
+
+    if args.milestones:
+        pipeline.seed_milestones(watcher, [game])
+    ctx = mlb_api.build_game_context(game, feed)
+    print(f"⚾ 再生: {ctx['away_team']} {ctx['away_score']} - {ctx['home_score']} {ctx['home_team']} (Game ID: {args.game_pk})")
+    moments = pipeline.detect_moments(watcher, ctx)
+    for m in moments:
+        verdict = m["verdict"]
+        if verdict == 'JUDGE' and args.judge:
+            context_str = f"GameType: {m['game_type']}, Inning: {m['inning']}, ScoreDiff: {m['score_diff']}"
+            ai = watcher.judge_impact_by_ai(m["player_name"], m["description"], context_str, game_pk=m["game_pk"])
+            verdict = {True: 'YES', False: 'NO'}.get(ai, 'ERROR')
+        print(f"  [{verdict:6}] {m['progress']:8} {m['player_name']} / {m['event_type']}: {m['description'][:60]}")
+    print(f"\n候補 {len(moments)}件 (確定 {sum(m['verdict'] == 'ACCEPT' for m in moments)}件)")
+
+
+def cmd_judge(args):
+    from . import local_judge
+
+    if args.action == "train":
+        local_judge.train(args.log, args.model)
+    else:
+        local_judge.report(args.log, args.model)
+
+
+def cmd_archive(args):
+    from . import play_archive
+
+    if args.action == "fetch":
+        if not args.start:
+            print("❌ fetch には START (と END) の日付が必要です")
+            sys.exit(2)
+        play_archive.fetch_feeds(args.start, args.end or args.start, args.feeds)
+    else:
+        play_archive.build_archive(args.feeds, args.archive)
+
+
+def cmd_backtest(args):
+    from . import backtest
+    from . import local_judge
+    from . import play_archive
+    from .players import WATCH_LIST
+
+    watcher = _load_watcher(args.watcher)
+    archive = play_archive.PlayArchive(args.archive)
+    engine = backtest.Backtest(
+        archive, {p['id'] for p in WATCH_LIST}, watcher.map_event_type_to_form,
+        logged_verdicts=backtest.load_logged_verdicts(args.judge_log),
+        judge=local_judge.LocalJudge.load(args.model),
+        season=args.season, game_types=args.game_types,
+    )
+    results = [engine.run(dict(backtest.BASELINE_RULES), "baseline")]
+    for path in args.rules:
+        results.append(engine.run(backtest.load_rules(path), path.rsplit("/", 1)[-1].removesuffix(".json")))
+    must_have = backtest.load_must_have(args.must_have) if args.must_have else None
+    backtest.print_report(results, archive, must_have)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="watcher", description="MLB ハイライト監視ボット")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("watch", help="ハイライトを監視して管理画面へ公開する")
+    p.add_argument("--watcher", choices=WATCHERS, default=DEFAULT_WATCHER)
+    p.add_argument("--date", metavar="YYYY-MM-DD", help="対象日 (省略時は監視モジュールの設定)")
+    p.add_argument("--workers", type=int, default=0, help="1以上なら試合単位でシャーディングしたマルチプロセス監視")
+    p.add_argument("--db", default="shard_state.db", help="シャード状態DB (--workers 指定時)")
+    p.add_argument("--include-final", action="store_true", help="終了済みの試合も処理対象にする (--workers 指定時)")
+    p.add_argument("--legacy", action="store_true", help="パイプラインを使わず逐次処理する")
+    p.set_defaults(func=cmd_watch)
+
+    p = sub.add_parser("inspect", help="試合フィードの中身を表示する")
+    p.add_argument("game_pk", type=int)
+    p.add_argument("--player", help="選手ID または 名前の一部")
+    p.add_argument("--event", help="イベント名 (部分一致)")
+    p.add_argument("--limit", type=int, default=20)
+    p.add_argument("--scan-id", help="フィード全体からこのIDを文字列検索する")
+    p.set_defaults(func=cmd_inspect)
+
+    p = sub.add_parser("find", help="日付から試合とプレイを探す")
+    p.add_argument("date", metavar="YYYY-MM-DD")
+    p.add_argument("--team", help="チーム名 (部分一致。例: Dodgers)")
+    p.add_argument("--player", help="選手ID または 名前の一部")
+    p.add_argument("--event", help="イベント名 (部分一致。例: 'Home Run')")
+    p.add_argument("--open", action="store_true", help="最後に見つかったプレイで管理画面を開く")
+    p.set_defaults(func=cmd_find)
+
+    p = sub.add_parser("backfill", help="過去の期間をまとめて処理する")
+    p.add_argument("start", metavar="START")
+    p.add_argument("end", metavar="END", nargs="?")
+    p.add_argument("--watcher", choices=WATCHERS, default=DEFAULT_WATCHER)
+    p.add_argument("--seed-only", action="store_true", help="シーズン成績のシードだけ行い、公開はしない")
+    p.set_defaults(func=cmd_backfill)
+
+    p = sub.add_parser("replay", help="1試合を再生して検知結果を確認する (既定では公開しない)")
+    p.add_argument("game_pk", type=int)
+    p.add_argument("--watcher", choices=WATCHERS, default=DEFAULT_WATCHER)
+    p.add_argument("--judge", action="store_true", help="AI審判が必要な候補を実際に判定する")
+    p.add_argument("--milestones", action="store_true", help="シーズン成績を更新して節目も検知する")
+    p.add_argument("--publish", action="store_true", help="パイプライン全体を通して公開まで行う")
+    p.set_defaults(func=cmd_replay)
+
+    p = sub.add_parser("judge", help="ローカル審判の学習と一致率レポート")
+    p.add_argument("action", choices=["train", "report"])
+    p.add_argument("--log", default="judge_log.jsonl", help="判定ログ (パイプラインが追記する)")
+    p.add_argument("--model", default="local_judge.json")
+    p.set_defaults(func=cmd_judge)
+
+    p = sub.add_parser("archive", help="過去の試合フィードを保存し、列指向のプレイアーカイブを作る")
+    p.add_argument("action", choices=["fetch", "build"])
+    p.add_argument("start", metavar="START", nargs="?", help="fetch の開始日 (YYYY-MM-DD)")
+    p.add_argument("end", metavar="END", nargs="?")
+    p.add_argument("--feeds", default="feeds", help="フィードの保存先")
+    p.add_argument("--archive", default="play_archive", help="アーカイブの出力先 (build)")
+    p.set_defaults(func=cmd_archive)
+
+    p = sub.add_parser("backtest", help="候補ルールをプレイアーカイブで評価し、現行ルールと比べる")
+    p.add_argument("rules", nargs="*", help="候補ルールの JSON (backtest.BASELINE_RULES の一部を上書き)")
+    p.add_argument("--archive", default="play_archive")
+    p.add_argument("--must-have", help="必須モーメントの CSV (game_pk,at_bat_index[,player_id][,note])")
+    p.add_argument("--season", type=int, help="対象シーズン (年)")
+    p.add_argument("--game-types", nargs="+", help="対象の試合種別 (例: R F D L W)")
+    p.add_argument("--watcher", choices=WATCHERS, default=DEFAULT_WATCHER)
+    p.add_argument("--judge-log", default="judge_log.jsonl", help="AI審判の実際の結果 (あれば優先して使う)")
+    p.add_argument("--model", default="local_judge.json")
+    p.set_defaults(func=cmd_backtest)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
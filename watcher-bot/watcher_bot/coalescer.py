@@ -0,0 +1,163 @@
+import time
+
+from . import instant_content
+
+# --- 🔧 設定エリア ------------------------------------------------
+# 同じ選手・同じ試合・同じイニングのモーメントをまとめる窓 (秒)。
+# 新しいモーメントが来るたびに延長されるが、最初の到着から COALESCE_MAX_HOLD_SEC を超えては待たない
+COALESCE_WINDOW_SEC = 8.0
+COALESCE_MAX_HOLD_SEC = 20.0
+
+# 公開レート上限 (チャンネルごとのトークンバケット): (1分あたりの件数, バースト)
+# "game" は試合ごと、"all" は全体
+PUBLISH_RATE_LIMITS = {
+    "game": (4, 2),
+    "all": (12, 4),
+}
+
+# 同じ熱狂度の時に優先するタイプ (大きいほど優先)
+TYPE_PRIORITY = {
+    "RECORD_BREAK": 6,
+    "VICTORY": 5,
+    "HOMERUN": 4,
+    "STRIKEOUT": 3,
+    "TIMELY": 2,
+    "BIG_PLAY": 1,
+}
+# ------------------------------------------------------------------
+
+
+def moment_intensity(moment):
+    """
+    生成済みテキストの intensity を 1〜5 の整数にする (読めなければ3)。
+    記事生成前 (coalesce の時点) はタイプと試合状況からの見積もりを使う。
+    """
+    if "ai_content" not in moment:
+        return instant_content.estimate_intensity(moment)
+    try:
+        value = int(str(moment["ai_content"].get("intensity", 3)).strip())
+    except ValueError:
+        value = 3
+    return min(5, max(1, value))
+
+
+def moment_priority(moment):
+    return (moment_intensity(moment), TYPE_PRIORITY.get(moment["event_type"], 0))
+
+
+class TokenBucket:
+    def __init__(self, per_min, burst, now):
+        self.rate = per_min / 60.0
+        self.capacity = float(burst)
+        self.tokens = float(burst)
+        self.updated = now
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def available(self, now):
+        self._refill(now)
+        return self.tokens >= 1.0
+
+    def take(self):
+        self.tokens -= 1.0
+
+    def wait_time(self, now):
+        self._refill(now)
+        return 0.0 if self.tokens >= 1.0 else (1.0 - self.tokens) / self.rate
+
+
+class MomentCoalescer:
+    """
+    記事生成の前に置くまとめ役 (統合で消えるモーメントには AI の記事を書かせない)。
+    選手×試合×イニングごとに短い窓でモーメントを溜め、最も熱いもの1件に統合して出す。
+    タイプが違っても格下は勝者に吸収される (サヨナラ本塁打の前の適時打、勝利投手になった回の三振など)。
+    吸収されたモーメントは勝者の merged_moments に残る。
+    出力は熱狂度の高い順に並べ、チャンネルごとの公開レート上限を守る。
+    """
+
+    def __init__(self, window_sec=COALESCE_WINDOW_SEC, max_hold_sec=COALESCE_MAX_HOLD_SEC, rate_limits=None,
+                 verbose=True):
+        self.window_sec = window_sec
+        self.verbose = verbose
+        self.max_hold_sec = max_hold_sec
+        self.rate_limits = PUBLISH_RATE_LIMITS if rate_limits is None else rate_limits
+        self.groups = {}   # key -> {"moments": [...], "first": t, "last": t}
+        self.ready = []    # 窓が閉じて公開待ちのモーメント
+        self.buckets = {}
+        self.suppressed = 0
+
+    @staticmethod
+    def group_key(moment):
+        return (moment["game_pk"], moment["player_id"], moment.get("inning") or moment.get("progress"))
+
+    def add(self, moment, now=None):
+        now = time.monotonic() if now is None else now
+        group = self.groups.setdefault(self.group_key(moment), {"moments": [], "first": now, "last": now})
+        group["moments"].append(moment)
+        group["last"] = now
+
+    def pending(self):
+        return len(self.ready) + sum(len(g["moments"]) for g in self.groups.values())
+
+    def _close_window(self, group):
+        moments = sorted(group["moments"], key=moment_priority, reverse=True)
+        winner = moments[0]
+        if len(moments) > 1:
+            # 格下のモーメントは捨てずに勝者のメタデータとして残す
+            winner["merged_moments"] = [
+                {"moment_key": m["moment_key"], "event_type": m["event_type"], "intensity": moment_intensity(m)}
+                for m in moments[1:]
+            ]
+            self.suppressed += len(moments) - 1
+            if self.verbose:
+                print(f"  🧲 統合: {winner['player_name']} の {len(moments)}件 → {winner['event_type']} (強度{moment_intensity(winner)})")
+        return winner
+
+    def _channels(self, moment):
+        return {"game": f"game:{moment['game_pk']}", "all": "all"}
+
+    def _bucket(self, kind, channel, now):
+        if channel not in self.buckets:
+            per_min, burst = self.rate_limits[kind]
+            self.buckets[channel] = TokenBucket(per_min, burst, now)
+        return self.buckets[channel]
+
+    def pop_ready(self, now=None, flush=False):
+        """公開してよいモーメントを熱狂度順に返す。flush=True なら窓を待たずに全グループを閉じる"""
+        now = time.monotonic() if now is None else now
+        for key, group in list(self.groups.items()):
+            window_closed = now - group["last"] >= self.window_sec or now - group["first"] >= self.max_hold_sec
+            if flush or window_closed:
+                self.ready.append(self._close_window(group))
+                del self.groups[key]
+
+        self.ready.sort(key=moment_priority, reverse=True)
+        out, held = [], []
+        for moment in self.ready:
+            buckets = [
+                self._bucket(kind, channel, now)
+                for kind, channel in self._channels(moment).items() if kind in self.rate_limits
+            ]
+            if all(b.available(now) for b in buckets):
+                for b in buckets:
+                    b.take()
+                out.append(moment)
+            else:
+                held.append(moment)
+        self.ready = held
+        return out
+
+    def next_wakeup(self, now=None):
+        """次に pop_ready を呼ぶべきまでの秒数 (何も無ければ None)"""
+        now = time.monotonic() if now is None else now
+        waits = []
+        for group in self.groups.values():
+            waits.append(min(group["last"] + self.window_sec, group["first"] + self.max_hold_sec) - now)
+        for moment in self.ready:
+            waits.append(max(
+                self._bucket(kind, channel, now).wait_time(now)
+                for kind, channel in self._channels(moment).items() if kind in self.rate_limits
+            ) if self.rate_limits else 0.0)
+        return max(0.0, min(waits)) if waits else None
@@ -0,0 +1,81 @@
+import re
+import zlib
+
+# --- 🔧 設定エリア ------------------------------------------------
+# 二段階公開の第1段で使う定型文 (map_event_type_to_form のタイプごと)。
+# AI の記事が届くまでの数秒だけ表示されるので、事実だけを短く書く。
+# 使える差し込み: {player} {inning} {score}
+INSTANT_TEMPLATES = {
+    "HOMERUN": [
+        ("{player}、{inning}に一発！", "{inning}、{player}の打球がスタンドへ飛び込んだ！ スコアは{score}。"),
+        ("{player}、{inning}に豪快アーチ", "{player}が{inning}に放った打球は文句なしのホームラン！ スコアは{score}。"),
+    ],
+    "STRIKEOUT": [
+        ("{player}、{inning}に三振斬り", "{inning}、{player}が空振り三振を奪った！ スコアは{score}。"),
+        ("{player}、{inning}に奪三振", "{player}が{inning}のピンチで三振を奪う！ スコアは{score}。"),
+    ],
+    "TIMELY": [
+        ("{player}、{inning}に快音", "{inning}、{player}の打球が外野へ抜けた！ スコアは{score}。"),
+        ("{player}、{inning}に一打", "{player}が{inning}にヒットを放つ！ スコアは{score}。"),
+    ],
+    "VICTORY": [
+        ("{player}、勝利を呼ぶ", "試合終了！ {player}の活躍でチームが勝利。最終スコアは{score}。"),
+    ],
+    "RECORD_BREAK": [
+        ("{player}、記録達成！", "{inning}、{player}が大記録に到達！ スコアは{score}。"),
+    ],
+    "BIG_PLAY": [
+        ("{player}のビッグプレー", "{inning}、{player}が球場を沸かせた！ スコアは{score}。"),
+    ],
+}
+
+# タイプごとの初期の熱狂度 (9回以降の1点差以内なら +1)
+INSTANT_INTENSITY = {
+    "RECORD_BREAK": 5,
+    "HOMERUN": 4,
+    "VICTORY": 4,
+    "STRIKEOUT": 3,
+    "TIMELY": 3,
+    "BIG_PLAY": 3,
+}
+# ------------------------------------------------------------------
+
+_PROGRESS_PATTERN = re.compile(r"^(Top|Bot)\s+(\d+)")
+
+
+def progress_to_japanese(progress):
+    """to_form_progress の表記 ("Bot 9th" / "Final") を "9回裏" / "試合終了" にする"""
+    if progress == "Final":
+        return "試合終了"
+    match = _PROGRESS_PATTERN.match(progress or "")
+    if not match:
+        # イニング不明 (試合後の節目など) でも文章が崩れないようにする
+        return progress or "この試合"
+    return f"{match.group(2)}回{'表' if match.group(1) == 'Top' else '裏'}"
+
+
+def estimate_intensity(moment):
+    """AI の記事が無い段階での熱狂度 (タイプごとの初期値。9回以降の1点差以内なら +1)"""
+    intensity = INSTANT_INTENSITY.get(moment["event_type"], 3)
+    if (moment.get("inning") or 0) >= 9 and moment["score_diff"] <= 1:
+        intensity += 1
+    return min(intensity, 5)
+
+
+def build_instant_content(moment):
+    """
+    AI を使わずにモーメントの title / desc / intensity を作る (get_japanese_content と同じ形)。
+    同じモーメントには毎回同じ文面を選ぶ (再公開で文面が揺れないように)。
+    """
+    templates = INSTANT_TEMPLATES.get(moment["event_type"], INSTANT_TEMPLATES["BIG_PLAY"])
+    title, desc = templates[zlib.crc32(moment["moment_key"].encode()) % len(templates)]
+    values = {
+        "player": moment["player_name"],
+        "inning": progress_to_japanese(moment["progress"]),
+        "score": f"{moment['away_score']}-{moment['home_score']}",
+    }
+    return {
+        "title": title.format(**values),
+        "desc": desc.format(**values),
+        "intensity": str(estimate_intensity(moment)),
+    }
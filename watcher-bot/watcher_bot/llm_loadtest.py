@@ -0,0 +1,84 @@
+import argparse
+import importlib
+import json
+import os
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from . import ai_budget
+
+# --- 🔧 設定エリア ------------------------------------------------
+# llm_stub.py を起動した状態で、監視モジュールのAI層 (審判/記事生成) に負荷をかける
+DEFAULT_STUB_URL = "http://127.0.0.1:8765"
+
+# 負荷試験中の利用量はこちらに記録する (本番の ai_usage.jsonl と予算を汚さない)
+LOADTEST_USAGE_LOG_PATH = "ai_usage.loadtest.jsonl"
+
+SAMPLE_PLAYS = [
+    ("大谷翔平", "HOMERUN", "Shohei Ohtani homers (54) on a fly ball to right center field."),
+    ("山本由伸", "STRIKEOUT", "Aaron Judge strikes out swinging."),
+    ("鈴木誠也", "TIMELY", "Seiya Suzuki doubles (30) on a line drive to left fielder."),
+    ("佐々木朗希", "BIG_PLAY", "Roki Sasaki induces a ground ball double play."),
+]
+# ------------------------------------------------------------------
+
+
+def _fetch_stub_stats(stub_url):
+    try:
+        with urllib.request.urlopen(f"{stub_url}/stats", timeout=5) as resp:
+            return json.loads(resp.read())
+    except Exception as e:
+        return {"error": str(e)}
+
+
+def run_loadtest(watcher_name, stub_url, calls, concurrency, mode, usage_log=LOADTEST_USAGE_LOG_PATH):
+    # 監視モジュールは import 時にスタブURLを読むので、先に設定する
+    os.environ["LLM_STUB_URL"] = stub_url
+    # 監視モジュールは ai_budget.record_usage 経由で記録するので、台帳ごと差し替える (予算も無制限)
+    ai_budget.LEDGER = ai_budget.UsageLedger(log_path=usage_log, daily_budget=None, game_budget=None)
+    watcher = importlib.import_module(f".{watcher_name}", __package__)
+
+    def one_call(i):
+        player, event_type, desc = SAMPLE_PLAYS[i % len(SAMPLE_PLAYS)]
+        desc = f"{desc} (#{i})"
+        started = time.perf_counter()
+        if mode == "judge":
+            # 失敗時は None が返ってきて、本番では厳格ルールにフォールバックする
+            fallback = watcher.judge_impact_by_ai(player, desc, "GameType: W, Inning: 9, ScoreDiff: 1") is None
+        else:
+            content = watcher.get_japanese_content(desc, event_type, player, "3-2")
+            # 失敗時は英語原文がそのまま返ってくる
+            fallback = content.get("desc") == desc
+        return time.perf_counter() - started, fallback
+
+    print(f"🏋️ 負荷試験: {watcher_name} / {mode} × {calls}回 (並列 {concurrency}) → {stub_url}")
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one_call, range(calls)))
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(r[0] for r in results)
+    fallbacks = sum(1 for r in results if r[1])
+    pct = lambda p: latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+
+    print("\n=== 📈 結果 ===")
+    print(f"所要時間: {elapsed:.1f}秒 / スループット: {calls / elapsed * 60:.0f} calls/min")
+    print(f"レイテンシ p50={pct(0.5):.0f}ms p95={pct(0.95):.0f}ms p99={pct(0.99):.0f}ms")
+    if mode == "content":
+        print(f"フォールバック (生成失敗): {fallbacks}/{calls}")
+    else:
+        print(f"フォールバック (判定失敗): {fallbacks}/{calls}")
+    print(f"スタブ側統計: {_fetch_stub_stats(stub_url)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="LLMスタブに対するAI層の負荷試験")
+    parser.add_argument("--watcher", default="ai_watcher", help="ai_watcher / ai_watcher_claude")
+    parser.add_argument("--stub-url", default=DEFAULT_STUB_URL)
+    parser.add_argument("--calls", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--mode", choices=["judge", "content"], default="judge")
+    parser.add_argument("--usage-log", default=LOADTEST_USAGE_LOG_PATH, help="負荷試験用の利用量ログ")
+    args = parser.parse_args()
+    run_loadtest(args.watcher, args.stub_url, args.calls, args.concurrency, args.mode, args.usage_log)
@@ -0,0 +1,282 @@
+import argparse
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# --- 🔧 設定エリア ------------------------------------------------
+# Gemini (REST) / Anthropic Messages API の一部だけを真似するローカルスタブサーバー。
+# 監視側は環境変数 LLM_STUB_URL=http://127.0.0.1:8765 を設定すると、こちらに向く。
+STUB_HOST = "127.0.0.1"
+STUB_PORT = 8765
+
+# 審判プロンプトに YES を返す割合 (プロンプトのハッシュで決まるので同じ入力には同じ答え)
+YES_RATE = 0.5
+
+# レイテンシ分布: fixed / uniform / normal / lognormal (単位: ミリ秒)
+LATENCY_DIST = "lognormal"
+LATENCY_MEAN_MS = 400.0
+LATENCY_STDDEV_MS = 200.0
+
+# 障害注入の割合 (0.0〜1.0)
+RATE_LIMIT_RATE = 0.0   # 429 を返す
+SERVER_ERROR_RATE = 0.0 # 500 を返す
+MALFORMED_RATE = 0.0    # 壊れたJSON本文を返す
+TIMEOUT_RATE = 0.0      # TIMEOUT_HANG_SECONDS だけ応答しない
+TIMEOUT_HANG_SECONDS = 120.0
+# ------------------------------------------------------------------
+
+GEMINI_PATH = re.compile(r"^/v1(?:beta)?/models/([^/:]+):generateContent")
+ANTHROPIC_PATH = "/v1/messages"
+
+
+class StubConfig:
+    def __init__(self, **overrides):
+        self.yes_rate = YES_RATE
+        self.latency_dist = LATENCY_DIST
+        self.latency_mean_ms = LATENCY_MEAN_MS
+        self.latency_stddev_ms = LATENCY_STDDEV_MS
+        self.rate_limit_rate = RATE_LIMIT_RATE
+        self.server_error_rate = SERVER_ERROR_RATE
+        self.malformed_rate = MALFORMED_RATE
+        self.timeout_rate = TIMEOUT_RATE
+        self.timeout_hang_seconds = TIMEOUT_HANG_SECONDS
+        self.seed = None
+        for key, value in overrides.items():
+            if value is not None:
+                setattr(self, key, value)
+
+
+class StubStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts = {}
+        self.started = time.time()
+
+    def incr(self, key):
+        with self.lock:
+            self.counts[key] = self.counts.get(key, 0) + 1
+
+    def snapshot(self):
+        with self.lock:
+            counts = dict(self.counts)
+        elapsed = max(time.time() - self.started, 1e-9)
+        counts["uptime_sec"] = round(elapsed, 1)
+        counts["requests_per_min"] = round(counts.get("requests", 0) / elapsed * 60, 1)
+        return counts
+
+
+def _stable_fraction(text):
+    """文字列から 0.0〜1.0 の決定的な値を作る"""
+    digest = hashlib.sha256(text.encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") / 2**64
+
+
+def _estimate_tokens(text):
+    # 日本語混じりなのでざっくり 1トークン≒2文字 とする
+    return max(1, len(text) // 2)
+
+
+def build_answer(prompt, config):
+    """プロンプトの種類を見分けて、決定的な回答テキストを作る"""
+    if '"title"' in prompt:
+        target = re.search(r"Target:\s*([^/\n]+?)\s*/\s*Event:\s*([^/\n]+?)\s*/", prompt)
+        player = target.group(1) if target else "選手"
+        event = target.group(2) if target else "BIG_PLAY"
+        intensity = 1 + int(_stable_fraction(prompt) * 5)
+        return json.dumps({
+            "title": f"{player}、{event}！",
+            "desc": f"{player}が魅せた。スタブサーバーが生成した{event}の速報テキスト。",
+            "intensity": str(intensity),
+        }, ensure_ascii=False)
+    return "YES" if _stable_fraction(prompt) < config.yes_rate else "NO"
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    server_version = "LLMStub/1.0"
+    protocol_version = "HTTP/1.1"
+
+    # ThreadingHTTPServer から参照される共有状態
+    config = None
+    stats = None
+    rng = None
+    rng_lock = threading.Lock()
+
+    def log_message(self, format, *args):
+        pass
+
+    def _roll(self):
+        with self.rng_lock:
+            return self.rng.random()
+
+    def _latency_sec(self):
+        c = self.config
+        with self.rng_lock:
+            if c.latency_dist == "fixed":
+                ms = c.latency_mean_ms
+            elif c.latency_dist == "uniform":
+                ms = self.rng.uniform(max(0.0, c.latency_mean_ms - c.latency_stddev_ms), c.latency_mean_ms + c.latency_stddev_ms)
+            elif c.latency_dist == "normal":
+                ms = self.rng.gauss(c.latency_mean_ms, c.latency_stddev_ms)
+            else:
+                # 平均・標準偏差から対数正規分布のパラメータを求める
+                mean = max(c.latency_mean_ms, 1e-3)
+                var = c.latency_stddev_ms ** 2
+                sigma2 = math.log(1 + var / mean ** 2)
+                mu = math.log(mean) - sigma2 / 2
+                ms = self.rng.lognormvariate(mu, sigma2 ** 0.5)
+        return max(0.0, ms) / 1000.0
+
+    def _send_json(self, status, body, headers=None):
+        raw = body if isinstance(body, bytes) else json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(raw)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(raw)
+
+    def do_GET(self):
+        if self.path.startswith("/stats"):
+            self._send_json(200, self.stats.snapshot())
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self._send_json(400, {"error": "invalid json"})
+            return
+
+        path = self.path.split("?")[0]
+        gemini = GEMINI_PATH.match(path)
+        if gemini:
+            provider, model = "gemini", gemini.group(1)
+            prompt = "\n".join(
+                part.get("text", "")
+                for content in body.get("contents", [])
+                for part in content.get("parts", [])
+            )
+        elif path == ANTHROPIC_PATH:
+            provider, model = "anthropic", body.get("model", "stub")
+            system = body.get("system") or ""
+            if isinstance(system, list):
+                system = "\n".join(block.get("text", "") for block in system)
+            prompt = system + "\n" + "\n".join(
+                m["content"] if isinstance(m.get("content"), str)
+                else "\n".join(block.get("text", "") for block in m.get("content", []))
+                for m in body.get("messages", [])
+            )
+        else:
+            self._send_json(404, {"error": f"unsupported path: {path}"})
+            return
+
+        self.stats.incr("requests")
+        self.stats.incr(f"requests_{provider}")
+        time.sleep(self._latency_sec())
+
+        # --- 障害注入 ---
+        c = self.config
+        roll = self._roll()
+        if roll < c.timeout_rate:
+            self.stats.incr("injected_timeout")
+            time.sleep(c.timeout_hang_seconds)
+            self.close_connection = True
+            return
+        roll -= c.timeout_rate
+        if roll < c.rate_limit_rate:
+            self.stats.incr("injected_rate_limit")
+            self._send_json(429, self._error_body(provider, 429), headers={"retry-after": "1"})
+            return
+        roll -= c.rate_limit_rate
+        if roll < c.server_error_rate:
+            self.stats.incr("injected_server_error")
+            self._send_json(500, self._error_body(provider, 500))
+            return
+        roll -= c.server_error_rate
+
+        answer = build_answer(prompt, c)
+        if roll < c.malformed_rate:
+            self.stats.incr("injected_malformed")
+            answer = answer[: max(1, len(answer) // 2)] if answer.startswith("{") else "???"
+
+        self.stats.incr("ok")
+        in_tokens, out_tokens = _estimate_tokens(prompt), _estimate_tokens(answer)
+        if provider == "gemini":
+            self._send_json(200, {
+                "candidates": [{
+                    "content": {"parts": [{"text": answer}], "role": "model"},
+                    "finishReason": "STOP",
+                    "index": 0,
+                }],
+                "usageMetadata": {
+                    "promptTokenCount": in_tokens,
+                    "candidatesTokenCount": out_tokens,
+                    "totalTokenCount": in_tokens + out_tokens,
+                },
+                "modelVersion": model,
+            })
+        else:
+            self._send_json(200, {
+                "id": f"msg_stub_{int(time.time() * 1000)}",
+                "type": "message",
+                "role": "assistant",
+                "model": model,
+                "content": [{"type": "text", "text": answer}],
+                "stop_reason": "end_turn",
+                "stop_sequence": None,
+                "usage": {"input_tokens": in_tokens, "output_tokens": out_tokens},
+            })
+
+    @staticmethod
+    def _error_body(provider, status):
+        if provider == "gemini":
+            status_name = "RESOURCE_EXHAUSTED" if status == 429 else "INTERNAL"
+            return {"error": {"code": status, "message": f"stub injected {status}", "status": status_name}}
+        error_type = "rate_limit_error" if status == 429 else "api_error"
+        return {"type": "error", "error": {"type": error_type, "message": f"stub injected {status}"}}
+
+
+def make_server(host=STUB_HOST, port=STUB_PORT, config=None):
+    config = config or StubConfig()
+    handler = type("BoundStubHandler", (StubHandler,), {
+        "config": config,
+        "stats": StubStats(),
+        "rng": random.Random(config.seed),
+    })
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gemini/Anthropic 互換のローカルLLMスタブサーバー")
+    parser.add_argument("--host", default=STUB_HOST)
+    parser.add_argument("--port", type=int, default=STUB_PORT)
+    parser.add_argument("--yes-rate", type=float)
+    parser.add_argument("--latency-dist", choices=["fixed", "uniform", "normal", "lognormal"])
+    parser.add_argument("--latency-mean-ms", type=float)
+    parser.add_argument("--latency-stddev-ms", type=float)
+    parser.add_argument("--rate-limit-rate", type=float)
+    parser.add_argument("--server-error-rate", type=float)
+    parser.add_argument("--malformed-rate", type=float)
+    parser.add_argument("--timeout-rate", type=float)
+    parser.add_argument("--timeout-hang-seconds", type=float)
+    parser.add_argument("--seed", type=int)
+    args = vars(parser.parse_args())
+    host, port = args.pop("host"), args.pop("port")
+
+    server = make_server(host, port, StubConfig(**args))
+    print(f"🧪 LLMスタブ起動: http://{host}:{port}  (統計: GET /stats)")
+    print(f"   export LLM_STUB_URL=http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("🛑 停止します")
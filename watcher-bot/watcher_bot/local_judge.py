@@ -0,0 +1,382 @@
+import json
+import os
+import random
+import threading
+import time
+
+import numpy as np
+
+from . import statcast
+
+# --- 🔧 設定エリア ------------------------------------------------
+# 特徴量 + AI審判の結果を残す追記専用ログ (1判定 = 1行)
+JUDGE_LOG_PATH = "judge_log.jsonl"
+
+# 学習済みモデル (JSON。watcher judge train で作り直す)
+MODEL_PATH = "local_judge.json"
+
+# 採用確率がこの範囲の外ならローカルで確定し、範囲内 (自信なし) のプレイだけ AI審判へ回す
+ACCEPT_PROB = 0.9
+REJECT_PROB = 0.1
+
+# ローカルで確定したプレイのうち、この割合は AI審判にも投げて一致率を測り続ける (学習データも増える)
+SHADOW_RATE = 0.05
+
+# 学習に必要な最小件数 (これ未満ならモデルを作らず全件 AI審判)
+MIN_TRAINING_SAMPLES = 200
+
+# ロジスティック回帰の L2 正則化と、一致率を測るための検証データの割合 (ログの新しい側)
+L2_PENALTY = 1.0
+HOLDOUT_RATIO = 0.2
+# ------------------------------------------------------------------
+
+EVENT_TYPES = ("HOMERUN", "STRIKEOUT", "TIMELY", "VICTORY", "BIG_PLAY", "RECORD_BREAK")
+HIT_EVENTS = ("Single", "Double", "Triple", "Home Run")
+WALK_EVENTS = ("Walk", "Intent Walk", "Hit By Pitch")
+
+# Statcast 指標の正規化 (中心, 幅)。値が無いプレイは 0 と「欠損フラグ」で表す
+METRIC_SCALES = {
+    "exit_velo": (90.0, 15.0),
+    "distance": (300.0, 120.0),
+    "launch_angle": (15.0, 25.0),
+    "pitch_speed": (93.0, 5.0),
+}
+
+FEATURE_NAMES = (
+    [f"type_{t}" for t in EVENT_TYPES]
+    + ["hit", "out", "walk", "rbi", "scoring_play", "risp", "outs",
+       "inning", "late_inning", "extra_inning", "bottom_half",
+       "score_diff", "one_run_game", "tie_game", "postseason", "world_series"]
+    + [f"{m}_z" for m in METRIC_SCALES] + [f"has_{m}" for m in METRIC_SCALES]
+)
+
+
+def extract_features(moment):
+    """
+    モーメントから判定に使う生の特徴量を取り出す (ログにはこの形で残す)。
+    モデルを変えても古いログから学習し直せるよう、ベクトル化前の値を保存する。
+    """
+    play = moment.get("play") or {}
+    result = play.get("result", {})
+    about = play.get("about", {})
+    metrics = statcast.extract_play_metrics([play]) if play else {}
+    # スコアはそのプレイ時点の途中経過 (試合の最新スコアではない) を使う。
+    # バックテストがアーカイブから作る特徴量と同じ定義にするため
+    away_score = result.get("awayScore", moment.get("away_score", 0))
+    home_score = result.get("homeScore", moment.get("home_score", 0))
+    return {
+        "event_type": moment.get("event_type"),
+        "event": moment.get("event") or result.get("event", ""),
+        "rbi": result.get("rbi", 0) or 0,
+        "scoring_play": bool(about.get("isScoringPlay")),
+        "risp": any(r.get("movement", {}).get("originBase") in ("2B", "3B") for r in play.get("runners", [])),
+        "outs": play.get("count", {}).get("outs", 0) or 0,
+        "inning": moment.get("inning") or 0,
+        "half": about.get("halfInning", ""),
+        "away_score": away_score,
+        "home_score": home_score,
+        "score_diff": abs(away_score - home_score) if "awayScore" in result else moment.get("score_diff", 0),
+        "game_type": moment.get("game_type", "R"),
+        **{m: _finite_or_none(metrics[m][0]) if metrics else None for m in METRIC_SCALES},
+    }
+
+
+def _finite_or_none(value):
+    value = float(value)
+    return None if np.isnan(value) else round(value, 1)
+
+
+def vectorize(features):
+    """生の特徴量 → 数値ベクトル (FEATURE_NAMES の順)"""
+    event = features.get("event") or ""
+    inning = features.get("inning") or 0
+    score_diff = features.get("score_diff") or 0
+    game_type = features.get("game_type") or "R"
+    values = [1.0 if features.get("event_type") == t else 0.0 for t in EVENT_TYPES]
+    values += [
+        float(event in HIT_EVENTS),
+        float(("out" in event.lower() or "Double Play" in event) and "Strikeout" not in event),
+        float(event in WALK_EVENTS),
+        min(float(features.get("rbi") or 0), 4.0) / 4.0,
+        float(bool(features.get("scoring_play"))),
+        float(bool(features.get("risp"))),
+        float(features.get("outs") or 0) / 3.0,
+        min(float(inning), 12.0) / 9.0,
+        float(inning >= 9),
+        float(inning > 9),
+        float(str(features.get("half")).lower() == "bottom"),
+        min(float(score_diff), 6.0) / 6.0,
+        float(score_diff <= 1),
+        float(score_diff == 0),
+        float(game_type not in ("R", "S", "E")),
+        float(game_type == "W"),
+    ]
+    missing = []
+    for metric, (center, scale) in METRIC_SCALES.items():
+        value = features.get(metric)
+        values.append(0.0 if value is None else (value - center) / scale)
+        missing.append(0.0 if value is None else 1.0)
+    return np.array(values + missing)
+
+
+def _sigmoid(z):
+    return 1.0 / (1.0 + np.exp(-np.clip(z, -30, 30)))
+
+
+def fit_logistic(X, y, l2=L2_PENALTY, iterations=25):
+    """
+    L2 正則化付きロジスティック回帰を IRLS (ニュートン法) で解く。
+    特徴量は30個程度なので 1万件でも数十ミリ秒で収束する。
+    """
+    Xb = np.hstack([X, np.ones((len(X), 1))])
+    w = np.zeros(Xb.shape[1])
+    reg = l2 * np.eye(Xb.shape[1])
+    reg[-1, -1] = 0.0  # 切片は正則化しない
+    for _ in range(iterations):
+        p = _sigmoid(Xb @ w)
+        grad = Xb.T @ (p - y) + reg @ w
+        hessian = (Xb * (p * (1 - p))[:, None]).T @ Xb + reg
+        step = np.linalg.solve(hessian, grad)
+        w -= step
+        if np.max(np.abs(step)) < 1e-6:
+            break
+    return w[:-1], float(w[-1])
+
+
+class LocalJudge:
+    """学習済みの重みで採用確率を出し、自信のある時だけ AI審判の代わりに答える"""
+
+    def __init__(self, model=None, accept_prob=ACCEPT_PROB, reject_prob=REJECT_PROB):
+        self.accept_prob = accept_prob
+        self.reject_prob = reject_prob
+        self.weights = None
+        self.bias = 0.0
+        self.info = {}
+        if model and model.get("feature_names") == FEATURE_NAMES:
+            self.weights = np.array(model["weights"])
+            self.bias = model["bias"]
+            self.info = {k: v for k, v in model.items() if k not in ("weights", "bias")}
+
+    @classmethod
+    def load(cls, path=MODEL_PATH):
+        if not path or not os.path.exists(path):
+            return cls()
+        with open(path, encoding="utf-8") as f:
+            model = json.load(f)
+        judge = cls(model)
+        if judge.weights is None:
+            print("⚠️ ローカル審判モデルの特徴量が現在の定義と違うため使いません (watcher judge train で再学習)")
+        return judge
+
+    @property
+    def ready(self):
+        return self.weights is not None
+
+    def probability(self, features):
+        """採用 (YES) の確率。モデル未学習なら None"""
+        if self.weights is None:
+            return None
+        return float(_sigmoid(vectorize(features) @ self.weights + self.bias))
+
+    def decide(self, prob, accept_prob=None, reject_prob=None):
+        """True/False = ローカルで確定、None = AI審判へ (閾値を渡せばモデル既定の閾値の代わりに使う)"""
+        if prob is None:
+            return None
+        if prob >= (self.accept_prob if accept_prob is None else accept_prob):
+            return True
+        if prob <= (self.reject_prob if reject_prob is None else reject_prob):
+            return False
+        return None
+
+
+class JudgeLog:
+    """特徴量と判定結果の追記ログ + 実行中の一致率カウンタ"""
+
+    def __init__(self, path=JUDGE_LOG_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        self.counts = {"local": 0, "ai": 0, "shadow": 0, "shadow_agree": 0, "uncertain_agree": 0, "uncertain": 0}
+
+    def record(self, moment, features, prob, local, ai, source):
+        entry = {
+            "t": round(time.time(), 3),
+            "k": moment.get("moment_key"),
+            "g": moment.get("game_pk"),
+            "p": moment.get("player_name"),
+            "f": features,
+            "prob": None if prob is None else round(prob, 4),
+            "local": local,
+            "ai": ai,
+            "src": source,
+        }
+        with self.lock:
+            self.counts[source] += 1
+            if source == "shadow":
+                self.counts["shadow_agree"] += int(local == ai)
+            elif source == "ai" and prob is not None:
+                # 自信なしで回したプレイでも、確率 0.5 を境にした予測と AI の一致を数えておく
+                self.counts["uncertain"] += 1
+                self.counts["uncertain_agree"] += int((prob >= 0.5) == ai)
+            if self.path:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n")
+        return entry
+
+    def summary(self):
+        with self.lock:
+            c = dict(self.counts)
+        total = c["local"] + c["ai"] + c["shadow"]
+        parts = [f"ローカル確定 {c['local']}件 / AI審判 {c['ai'] + c['shadow']}件"]
+        if total:
+            parts.append(f"AI削減率 {c['local'] / total:.0%}")
+        if c["shadow"]:
+            parts.append(f"確定分の一致率 {c['shadow_agree'] / c['shadow']:.0%} ({c['shadow']}件で抜き取り)")
+        if c["uncertain"]:
+            parts.append(f"自信なし分の一致率 {c['uncertain_agree'] / c['uncertain']:.0%}")
+        return " / ".join(parts)
+
+
+def read_log(path=JUDGE_LOG_PATH):
+    """AI審判の結果が付いている行だけを古い順に返す"""
+    entries = []
+    if not os.path.exists(path):
+        return entries
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if entry.get("ai") is not None and entry.get("f"):
+                entries.append(entry)
+    entries.sort(key=lambda e: e.get("t", 0))
+    return entries
+
+
+def evaluate(judge, X, y):
+    """一致率・確定率を集計する (全体 / ローカル確定分 / 自信なし分)"""
+    probs = _sigmoid(X @ judge.weights + judge.bias)
+    agree = (probs >= 0.5) == (y == 1)
+    confident = (probs >= judge.accept_prob) | (probs <= judge.reject_prob)
+    return {
+        "samples": int(len(y)),
+        "agreement": float(agree.mean()) if len(y) else None,
+        "coverage": float(confident.mean()) if len(y) else None,
+        "confident_agreement": float(agree[confident].mean()) if confident.any() else None,
+        "uncertain_agreement": float(agree[~confident].mean()) if (~confident).any() else None,
+    }
+
+
+def train(log_path=JUDGE_LOG_PATH, model_path=MODEL_PATH, l2=L2_PENALTY):
+    """ログから学習し、新しい側 HOLDOUT_RATIO を検証に使って一致率を出してから全件で学習し直す"""
+    entries = read_log(log_path)
+    if len(entries) < MIN_TRAINING_SAMPLES:
+        print(f"❌ 学習データ不足: {len(entries)}件 (最低 {MIN_TRAINING_SAMPLES}件)")
+        return None
+    X = np.vstack([vectorize(e["f"]) for e in entries])
+    y = np.array([1.0 if e["ai"] else 0.0 for e in entries])
+
+    started = time.perf_counter()
+    split = int(len(entries) * (1 - HOLDOUT_RATIO))
+    weights, bias = fit_logistic(X[:split], y[:split], l2)
+    holdout = evaluate(LocalJudge({"feature_names": FEATURE_NAMES, "weights": weights.tolist(), "bias": bias}),
+                       X[split:], y[split:])
+    weights, bias = fit_logistic(X, y, l2)
+    model = {
+        "feature_names": FEATURE_NAMES,
+        "weights": weights.tolist(),
+        "bias": bias,
+        "trained_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "samples": len(entries),
+        "positive_rate": float(y.mean()),
+        "holdout": holdout,
+    }
+    with open(model_path, "w", encoding="utf-8") as f:
+        json.dump(model, f, ensure_ascii=False, indent=1)
+
+    print(f"🧠 ローカル審判を学習: {len(entries)}件 (採用率 {y.mean():.0%}) / {(time.perf_counter() - started) * 1000:.0f}ms")
+    _print_metrics("検証", holdout)
+    return model
+
+
+def _print_metrics(label, m):
+    fmt = lambda v: "-" if v is None else f"{v:.1%}"
+    print(f"  [{label}] {m['samples']}件: AI審判との一致率 {fmt(m['agreement'])} / "
+          f"ローカル確定率 {fmt(m['coverage'])} (確定分の一致率 {fmt(m['confident_agreement'])}, "
+          f"自信なし分 {fmt(m['uncertain_agreement'])})")
+
+
+def report(log_path=JUDGE_LOG_PATH, model_path=MODEL_PATH):
+    """現在のモデルをログ全体に当てた一致率と、運用中の抜き取り検査の結果を表示する"""
+    judge = LocalJudge.load(model_path)
+    entries = read_log(log_path)
+    if not judge.ready:
+        print("❌ 学習済みモデルがありません (watcher judge train)")
+        return
+    print(f"🧠 モデル: {judge.info.get('trained_at')} 学習 / {judge.info.get('samples')}件 "
+          f"/ 確定しきい値 {judge.reject_prob} 〜 {judge.accept_prob}")
+    if judge.info.get("holdout"):
+        _print_metrics("学習時の検証", judge.info["holdout"])
+    if entries:
+        X = np.vstack([vectorize(e["f"]) for e in entries])
+        y = np.array([1.0 if e["ai"] else 0.0 for e in entries])
+        _print_metrics("ログ全体", evaluate(judge, X, y))
+        shadow = [e for e in entries if e.get("src") == "shadow"]
+        if shadow:
+            agree = sum(e["local"] == e["ai"] for e in shadow)
+            print(f"  [運用中の抜き取り] {len(shadow)}件: 一致率 {agree / len(shadow):.1%}")
+
+    started = time.perf_counter()
+    sample = entries[0]["f"] if entries else extract_features({})
+    for _ in range(1000):
+        judge.probability(sample)
+    print(f"  判定速度: {(time.perf_counter() - started) * 1000:.1f}µs / 件")
+
+
+_JUDGE = None
+_LOG = None
+_JUDGE_LOCK = threading.Lock()
+
+
+def get_judge():
+    """プロセス内で共有するローカル審判とログ (初回使用時にモデルを読む)"""
+    global _JUDGE, _LOG
+    with _JUDGE_LOCK:
+        if _JUDGE is None:
+            _JUDGE = LocalJudge.load(MODEL_PATH)
+            _LOG = JudgeLog(JUDGE_LOG_PATH)
+            if _JUDGE.ready:
+                print(f"🧠 ローカル審判を使用: {_JUDGE.info.get('samples')}件で学習 ({_JUDGE.info.get('trained_at')})")
+            else:
+                print("🧠 ローカル審判モデルが無いため全件 AI審判 (判定はログに蓄積されます)")
+    return _JUDGE, _LOG
+
+
+def judge_moment(watcher, moment, judge=None, log=None, shadow_rate=SHADOW_RATE, use_ai=True):
+    """
+    ローカル審判で判定し、自信のないプレイだけ AI審判に回す。
+    どちらの場合も特徴量と結果をログに残す (AI の結果は次回の学習データになる)。
+    判定できなかった時 (use_ai=False で自信なし / AI がエラー) は None を返す。
+    """
+    if judge is None or log is None:
+        judge, log = get_judge()
+    features = extract_features(moment)
+    prob = judge.probability(features)
+    local = judge.decide(prob)
+    if local is not None and (not use_ai or random.random() >= shadow_rate):
+        print(f"  🧠 ローカル審判: {'採用' if local else '却下'} (p={prob:.2f})")
+        log.record(moment, features, prob, local, None, "local")
+        return local
+    if not use_ai:
+        return None
+
+    context_str = f"GameType: {moment['game_type']}, Inning: {moment['inning']}, ScoreDiff: {moment['score_diff']}"
+    ai = watcher.judge_impact_by_ai(moment["player_name"], moment["description"], context_str,
+                                    game_pk=moment["game_pk"])
+    if ai is None:
+        # AI のエラーは学習データにしない。抜き取り検査中ならローカルの判定を使う
+        return local
+    ai = bool(ai)
+    log.record(moment, features, prob, local, ai, "ai" if local is None else "shadow")
+    # 抜き取り検査の時も AI の判定を採用する (ローカルの誤りをそのまま公開しない)
+    return ai
@@ -0,0 +1,308 @@
+import argparse
+import sqlite3
+import threading
+import time
+from datetime import date, timedelta
+
+import requests
+
+# --- 🔧 設定エリア ------------------------------------------------
+# シーズン成績の累積ストア (シャードの全ワーカーで共有できるようSQLite)
+SEASON_DB_PATH = "season_stats.db"
+
+# シードに失敗した時に再試行するまでの間隔 (秒)
+SEED_RETRY_INTERVAL = 600
+
+# シード時の成績取得1件あたりのタイムアウト (秒)
+SEED_REQUEST_TIMEOUT_SEC = 10
+
+# 節目の定義
+#   every: その倍数に到達したら (min 以上のみ)   例: 10本ごとのホームラン
+#   at:    その値ちょうどに到達したら              例: 62号
+#   combo: 複数の成績が全て閾値を超えた瞬間        例: 50-50
+MILESTONES = [
+    {"id": "HR_EVERY", "stat": "HR", "every": 10, "min": 30, "label": "シーズン{value}号"},
+    {"id": "HR_AT", "stat": "HR", "at": [50, 55, 60, 62], "label": "シーズン{value}号"},
+    {"id": "SB_EVERY", "stat": "SB", "every": 10, "min": 30, "label": "シーズン{value}盗塁"},
+    {"id": "H_EVERY", "stat": "H", "every": 50, "min": 150, "label": "シーズン{value}安打"},
+    {"id": "H_AT", "stat": "H", "at": [200, 262], "label": "シーズン{value}安打"},
+    {"id": "K_EVERY", "stat": "K", "every": 50, "min": 150, "label": "シーズン{value}奪三振"},
+    {"id": "K_AT", "stat": "K", "at": [300], "label": "シーズン{value}奪三振"},
+    {"id": "SV_EVERY", "stat": "SV", "every": 10, "min": 20, "label": "シーズン{value}セーブ"},
+    {"id": "W_AT", "stat": "W", "at": [15, 20], "label": "シーズン{value}勝"},
+    {"id": "COMBO_40_40", "combo": {"HR": 40, "SB": 40}, "label": "40-40達成"},
+    {"id": "COMBO_50_50", "combo": {"HR": 50, "SB": 50}, "label": "前人未到の50-50達成"},
+]
+
+# MLB API の成績キー → 内部キー
+SEED_STAT_KEYS = {
+    "hitting": {"homeRuns": "HR", "stolenBases": "SB", "hits": "H"},
+    "pitching": {"strikeOuts": "K", "saves": "SV", "wins": "W"},
+}
+# ------------------------------------------------------------------
+
+HIT_EVENTS = ('Single', 'Double', 'Triple', 'Home Run')
+PEOPLE_STATS_URL = (
+    "https://statsapi.mlb.com/api/v1/people/{player_id}/stats"
+    "?stats=byDateRange&group={group}&season={season}&startDate={season}-01-01&endDate={end_date}"
+)
+
+
+class SeasonTracker:
+    """
+    監視選手のシーズン累積成績をプレイごとに O(1) で更新し、節目到達を検知する。
+    同じプレイを何度スキャンしても二重に数えないよう、処理済みプレイを記録する。
+    """
+
+    def __init__(self, db_path=SEASON_DB_PATH, milestones=None):
+        self.milestones = MILESTONES if milestones is None else milestones
+        self.conn = sqlite3.connect(db_path, timeout=10, isolation_level=None, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.seed_failed_at = {}
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS seasons (
+                season INTEGER PRIMARY KEY,
+                seed_through TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS player_stats (
+                season INTEGER NOT NULL,
+                player_id INTEGER NOT NULL,
+                stat TEXT NOT NULL,
+                value INTEGER NOT NULL,
+                PRIMARY KEY (season, player_id, stat)
+            );
+            CREATE TABLE IF NOT EXISTS processed_events (
+                event_key TEXT PRIMARY KEY
+            );
+            CREATE TABLE IF NOT EXISTS event_milestones (
+                event_key TEXT NOT NULL,
+                label TEXT NOT NULL,
+                PRIMARY KEY (event_key, label)
+            );
+            CREATE TABLE IF NOT EXISTS achieved (
+                season INTEGER NOT NULL,
+                player_id INTEGER NOT NULL,
+                milestone TEXT NOT NULL,
+                PRIMARY KEY (season, player_id, milestone)
+            );
+        """)
+
+    # --- シード (シーズン成績の初期値) ---
+    def seed_through(self, season):
+        row = self.conn.execute("SELECT seed_through FROM seasons WHERE season=?", (season,)).fetchone()
+        return row[0] if row else None
+
+    def seed(self, watch_ids, season, through_date):
+        """through_date までのシーズン成績をMLB APIから取り込む (シーズンにつき一度だけ)"""
+        print(f"🌱 シーズン成績をシード中... ({season}年 〜{through_date})")
+        rows = []
+        errors = 0
+        for player_id in watch_ids:
+            for group, keys in SEED_STAT_KEYS.items():
+                url = PEOPLE_STATS_URL.format(player_id=player_id, group=group, season=season, end_date=through_date)
+                try:
+                    data = requests.get(url, timeout=SEED_REQUEST_TIMEOUT_SEC).json()
+                except Exception as e:
+                    print(f"  ⚠️ 成績取得エラー ({player_id}/{group}): {e}")
+                    errors += 1
+                    continue
+                for block in data.get('stats', []):
+                    for split in block.get('splits', []):
+                        stat = split.get('stat', {})
+                        for api_key, key in keys.items():
+                            if api_key in stat:
+                                rows.append((season, player_id, key, int(stat[api_key])))
+        if errors and not rows:
+            # 全滅した場合は 0 から数えると誤検知するので、シード済みにしない
+            print(f"  ❌ シード失敗。{SEED_RETRY_INTERVAL}秒後に再試行します")
+            self.seed_failed_at[season] = time.time()
+            return
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                if self.seed_through(season) is None:
+                    self.conn.executemany(
+                        "INSERT INTO player_stats(season, player_id, stat, value) VALUES(?, ?, ?, ?) "
+                        "ON CONFLICT(season, player_id, stat) DO UPDATE SET value=excluded.value",
+                        rows,
+                    )
+                    self.conn.execute("INSERT INTO seasons(season, seed_through) VALUES(?, ?)", (season, through_date))
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    def ensure_seeded(self, watch_ids, official_date):
+        """
+        その試合日のシーズンが未シードなら前日までの成績でシードする。
+        MLB API を叩くので検知処理からは呼ばず、パイプライン起動時などに一度だけ呼ぶ。
+        """
+        season = int(official_date[:4])
+        if self.seed_through(season) is None:
+            if time.time() - self.seed_failed_at.get(season, 0) < SEED_RETRY_INTERVAL:
+                return season
+            through = (date.fromisoformat(official_date) - timedelta(days=1)).isoformat()
+            self.seed(watch_ids, season, through)
+        return season
+
+    def _is_countable(self, season, official_date):
+        # シード済み期間の試合は既に成績に含まれているので数えない
+        seed_through = self.seed_through(season)
+        return seed_through is not None and official_date > seed_through
+
+    # --- 累積更新 ---
+    def get(self, season, player_id):
+        rows = self.conn.execute(
+            "SELECT stat, value FROM player_stats WHERE season=? AND player_id=?", (season, player_id)
+        ).fetchall()
+        return dict(rows)
+
+    def _increment(self, season, player_id, stat, event_key):
+        """
+        1件の成績を加算し、到達した節目のラベル一覧を返す。
+        処理済みのプレイは加算せず、前回そのプレイで到達した節目をもう一度返す
+        (再スキャンでも同じ RECORD_BREAK モーメントになり、公開前に落ちても節目が失われない)
+        """
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                cur = self.conn.execute("INSERT OR IGNORE INTO processed_events(event_key) VALUES(?)", (event_key,))
+                if cur.rowcount == 0:
+                    rows = self.conn.execute(
+                        "SELECT label FROM event_milestones WHERE event_key=? ORDER BY rowid", (event_key,)
+                    ).fetchall()
+                    self.conn.execute("COMMIT")
+                    return [label for label, in rows]
+                self.conn.execute(
+                    "INSERT INTO player_stats(season, player_id, stat, value) VALUES(?, ?, ?, 1) "
+                    "ON CONFLICT(season, player_id, stat) DO UPDATE SET value=value+1",
+                    (season, player_id, stat),
+                )
+                stats = self.get(season, player_id)
+                reached = self._check_milestones(season, player_id, stat, stats)
+                self.conn.executemany(
+                    "INSERT OR IGNORE INTO event_milestones(event_key, label) VALUES(?, ?)",
+                    [(event_key, label) for label in reached],
+                )
+                self.conn.execute("COMMIT")
+                return reached
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    def _check_milestones(self, season, player_id, stat, stats):
+        new_value = stats.get(stat, 0)
+        reached = []
+        for m in self.milestones:
+            if "combo" in m:
+                # 今回加算した成績がちょうど閾値に届いた時だけ (シード時点で達成済みなら出さない)
+                if m["combo"].get(stat) != new_value or not all(stats.get(k, 0) >= v for k, v in m["combo"].items()):
+                    continue
+                milestone_id, label = m["id"], m["label"]
+            elif m["stat"] != stat:
+                continue
+            elif "every" in m:
+                if new_value < m.get("min", 0) or new_value % m["every"] != 0:
+                    continue
+                milestone_id, label = f"{m['id']}:{new_value}", m["label"].format(value=new_value)
+            else:
+                if new_value not in m["at"]:
+                    continue
+                milestone_id, label = f"{m['id']}:{new_value}", m["label"].format(value=new_value)
+
+            cur = self.conn.execute(
+                "INSERT OR IGNORE INTO achieved(season, player_id, milestone) VALUES(?, ?, ?)",
+                (season, player_id, milestone_id),
+            )
+            if cur.rowcount == 1 and label not in reached:
+                reached.append(label)
+        return reached
+
+    def process_play(self, ctx, play, watch_ids):
+        """
+        1プレイ分の成績を反映する。戻り値: [(選手ID, 節目ラベル), ...]
+        レギュラーシーズン以外・シード済みの日付・未完了のプレイは数えない。
+        未シードのシーズンも数えない (シードは ensure_seeded で事前に済ませておく)。
+        """
+        official_date = ctx["game"].get('officialDate')
+        if ctx["game_type"] != 'R' or not official_date or not play.get('about', {}).get('isComplete', True):
+            return []
+        season = int(official_date[:4])
+        if not self._is_countable(season, official_date):
+            return []
+
+        base_key = f"{ctx['game_pk']}:{play.get('about', {}).get('atBatIndex', '')}"
+        matchup = play.get('matchup', {})
+        event = play.get('result', {}).get('event', '')
+        reached = []
+
+        batter_id = matchup.get('batter', {}).get('id')
+        if batter_id in watch_ids:
+            if event in HIT_EVENTS:
+                reached += [(batter_id, label) for label in self._increment(season, batter_id, "H", f"{base_key}:H")]
+            if event == 'Home Run':
+                reached += [(batter_id, label) for label in self._increment(season, batter_id, "HR", f"{base_key}:HR")]
+
+        pitcher_id = matchup.get('pitcher', {}).get('id')
+        if pitcher_id in watch_ids and event.startswith('Strikeout'):
+            reached += [(pitcher_id, label) for label in self._increment(season, pitcher_id, "K", f"{base_key}:K")]
+
+        for i, runner in enumerate(play.get('runners', [])):
+            details = runner.get('details', {})
+            runner_id = details.get('runner', {}).get('id')
+            if runner_id in watch_ids and str(details.get('eventType', '')).startswith('stolen_base'):
+                reached += [(runner_id, label) for label in self._increment(season, runner_id, "SB", f"{base_key}:SB:{i}")]
+        return reached
+
+    def process_decisions(self, ctx, watch_ids):
+        """試合終了時の勝利/セーブを反映する"""
+        official_date = ctx["game"].get('officialDate')
+        if ctx["game_type"] != 'R' or not official_date:
+            return []
+        season = int(official_date[:4])
+        if not self._is_countable(season, official_date):
+            return []
+        reached = []
+        for key, stat in (('winner', 'W'), ('save', 'SV')):
+            pid = ctx["decisions"].get(key, {}).get('id')
+            if pid in watch_ids:
+                reached += [(pid, label) for label in self._increment(season, pid, stat, f"{ctx['game_pk']}:{key}")]
+        return reached
+
+
+_TRACKER = None
+_TRACKER_LOCK = threading.Lock()
+
+
+def get_tracker():
+    """プロセス内で共有するトラッカー (初回使用時に生成)"""
+    global _TRACKER
+    with _TRACKER_LOCK:
+        if _TRACKER is None:
+            _TRACKER = SeasonTracker()
+        return _TRACKER
+
+
+if __name__ == "__main__":
+    from .players import WATCH_LIST
+
+    parser = argparse.ArgumentParser(description="監視選手のシーズン成績トラッカー")
+    parser.add_argument("--seed-through", metavar="YYYY-MM-DD", help="その日までのシーズン成績でシード")
+    parser.add_argument("--db", default=SEASON_DB_PATH)
+    args = parser.parse_args()
+
+    tracker = SeasonTracker(args.db)
+    watch_ids = [p['id'] for p in WATCH_LIST]
+    if args.seed_through:
+        season = int(args.seed_through[:4])
+        if tracker.seed_through(season) is None:
+            tracker.seed(watch_ids, season, args.seed_through)
+        else:
+            print(f"ℹ️ {season}年は {tracker.seed_through(season)} までシード済みです")
+
+    for p in WATCH_LIST:
+        for season, in tracker.conn.execute("SELECT season FROM seasons ORDER BY season").fetchall():
+            stats = tracker.get(season, p['id'])
+            if stats:
+                print(f"{season} {p['name']}: " + " / ".join(f"{k} {v}" for k, v in sorted(stats.items())))
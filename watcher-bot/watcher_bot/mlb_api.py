@@ -0,0 +1,127 @@
+import requests
+
+# --- 🔧 設定エリア ------------------------------------------------
+# MLB Stats API の取得・解析を1か所にまとめた共通レイヤー。
+# 監視 (watch) も調査系コマンド (inspect / find / replay) もここを通す
+REQUEST_TIMEOUT_SEC = 15
+# ------------------------------------------------------------------
+
+SCHEDULE_URL = "https://statsapi.mlb.com/api/v1/schedule?sportId=1&date={date}"
+FEED_URL = "https://statsapi.mlb.com/api/v1.1/game/{game_pk}/feed/live"
+
+# チーム名 (部分一致) → 3文字コード。管理画面への送信と配信用の match_result で共通に使う
+TEAM_MAP_PARTIAL = {
+    "Dodgers": "LAD", "Marlins": "MIA", "Padres": "SD", "Yankees": "NYY",
+    "Cubs": "CHC", "Angels": "LAA", "Red Sox": "BOS", "Mets": "NYM",
+    "Braves": "ATL", "Phillies": "PHI", "Giants": "SF", "Rockies": "COL",
+    "Diamondbacks": "AZ", "Rays": "TB", "Blue Jays": "TOR", "Orioles": "BAL",
+    "White Sox": "CWS", "Royals": "KC", "Tigers": "DET", "Twins": "MIN",
+    "Guardians": "CLE", "Mariners": "SEA", "Astros": "HOU", "Rangers": "TEX",
+    "Athletics": "OAK", "Nationals": "WSH", "Pirates": "PIT", "Cardinals": "STL",
+    "Brewers": "MIL", "Reds": "CIN"
+}
+
+
+def resolve_team_code(team_name):
+    """正式名 (例: Los Angeles Dodgers) からチームコード (例: LAD) を引く"""
+    for key, code in TEAM_MAP_PARTIAL.items():
+        if key in team_name:
+            return code
+    return "UNKNOWN"
+
+
+def fetch_schedule_games(target_date):
+    """指定日の試合一覧を取得する (試合が無ければ空リスト)"""
+    sched = requests.get(SCHEDULE_URL.format(date=target_date), timeout=REQUEST_TIMEOUT_SEC).json()
+    dates = sched.get('dates', [])
+    if not dates:
+        return []
+    return dates[0]['games']
+
+
+def fetch_feed(game_pk):
+    """試合のライブフィード (生JSON) を取得する"""
+    return requests.get(FEED_URL.format(game_pk=game_pk), timeout=REQUEST_TIMEOUT_SEC).json()
+
+
+def build_game_context(game, feed):
+    """スケジュールの試合情報とライブフィードから、判定に必要な情報だけをまとめる"""
+    live_data = feed.get('liveData', {})
+    linescore = live_data.get('linescore', {})
+    home_runs_total = linescore.get('teams', {}).get('home', {}).get('runs', 0)
+    away_runs_total = linescore.get('teams', {}).get('away', {}).get('runs', 0)
+
+    return {
+        "game": game,
+        "game_pk": game['gamePk'],
+        "game_type": game.get('gameType', 'R'),
+        "away_team": game['teams']['away']['team']['name'],
+        "home_team": game['teams']['home']['team']['name'],
+        "all_plays": live_data.get('plays', {}).get('allPlays', []),
+        "linescore": linescore,
+        "decisions": live_data.get('decisions', {}),
+        "away_score": away_runs_total,
+        "home_score": home_runs_total,
+        "score_diff": abs(home_runs_total - away_runs_total),
+    }
+
+
+def fetch_game_context(game):
+    return build_game_context(game, fetch_feed(game['gamePk']))
+
+
+def game_from_feed(feed):
+    """
+    フィードの gameData からスケジュール形式の試合情報を組み立てる。
+    日程を引かずに試合IDだけで build_game_context を使うため (inspect / replay 用)
+    """
+    game_data = feed.get('gameData', {})
+    teams = game_data.get('teams', {})
+    return {
+        "gamePk": game_data.get('game', {}).get('pk'),
+        "gameType": game_data.get('game', {}).get('type', 'R'),
+        "officialDate": game_data.get('datetime', {}).get('officialDate'),
+        "status": {"abstractGameState": game_data.get('status', {}).get('abstractGameState')},
+        "teams": {
+            side: {"team": {"name": teams.get(side, {}).get('name', 'Unknown')}}
+            for side in ('away', 'home')
+        },
+    }
+
+
+def play_summary(index, play):
+    """1打席分のプレイを一覧表示用の平たい dict にする"""
+    matchup = play.get('matchup', {})
+    result = play.get('result', {})
+    about = play.get('about', {})
+    return {
+        "index": index,
+        "inning": about.get('inning', 0),
+        "half": about.get('halfInning', ''),
+        "batter_id": matchup.get('batter', {}).get('id'),
+        "batter_name": matchup.get('batter', {}).get('fullName', 'Unknown'),
+        "pitcher_id": matchup.get('pitcher', {}).get('id'),
+        "pitcher_name": matchup.get('pitcher', {}).get('fullName', 'Unknown'),
+        "event": result.get('event', ''),
+        "description": result.get('description', ''),
+    }
+
+
+def find_plays(all_plays, player=None, event=None):
+    """
+    選手 (IDまたは名前の一部) とイベント名 (部分一致) でプレイを絞り込む。
+    打者・投手のどちらで出場したプレイも対象
+    """
+    found = []
+    for index, play in enumerate(all_plays):
+        summary = play_summary(index, play)
+        if player is not None:
+            if str(player).isdigit():
+                if int(player) not in (summary["batter_id"], summary["pitcher_id"]):
+                    continue
+            elif player.lower() not in f"{summary['batter_name']} {summary['pitcher_name']}".lower():
+                continue
+        if event and event.lower() not in summary["event"].lower():
+            continue
+        found.append(summary)
+    return found
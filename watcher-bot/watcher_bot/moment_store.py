@@ -0,0 +1,72 @@
+import os
+import threading
+
+import requests
+
+from . import coalescer
+from . import relay
+
+# --- 🔧 設定エリア ------------------------------------------------
+# live_moments に直接書き込む Supabase (二段階公開で使用)。
+# 行の更新が必要なので、管理画面のフォームではなく Service Role キーで PostgREST を叩く
+SUPABASE_URL = os.environ.get("SUPABASE_URL") or os.environ.get("NEXT_PUBLIC_SUPABASE_URL")
+SUPABASE_KEY = os.environ.get("SUPABASE_SERVICE_ROLE_KEY")
+
+# 1リクエストのタイムアウト (秒)。第1段は速さが命なので短め
+INSERT_TIMEOUT_SEC = 5
+UPDATE_TIMEOUT_SEC = 10
+# ------------------------------------------------------------------
+
+MOMENTS_URL = "{base}/rest/v1/live_moments"
+
+
+def moment_row(moment, phase):
+    """パイプラインのモーメント → live_moments の行 (phase は metadata に残す: instant / ai)"""
+    row = relay.moment_to_public(moment)
+    row["intensity"] = coalescer.moment_intensity(moment)
+    row["metadata"]["phase"] = phase
+    return row
+
+
+class MomentStore:
+    """live_moments への INSERT (行IDを返す) と、同じ行への UPDATE"""
+
+    def __init__(self, url=SUPABASE_URL, key=SUPABASE_KEY):
+        self.url = MOMENTS_URL.format(base=(url or "").rstrip('/'))
+        self.enabled = bool(url and key)
+        self.session = requests.Session()
+        self.session.headers.update({
+            "apikey": key or "",
+            "Authorization": f"Bearer {key}",
+            "Content-Type": "application/json",
+        })
+
+    def insert(self, row):
+        resp = self.session.post(
+            self.url, json=row, params={"select": "id"},
+            headers={"Prefer": "return=representation"}, timeout=INSERT_TIMEOUT_SEC,
+        )
+        resp.raise_for_status()
+        return resp.json()[0]["id"]
+
+    def update(self, moment_id, fields):
+        resp = self.session.patch(
+            self.url, json=fields, params={"id": f"eq.{moment_id}"},
+            headers={"Prefer": "return=minimal"}, timeout=UPDATE_TIMEOUT_SEC,
+        )
+        resp.raise_for_status()
+
+
+_STORE = None
+_STORE_LOCK = threading.Lock()
+
+
+def get_store():
+    """プロセス内で共有するストア (キー未設定なら None = 二段階公開は使わない)"""
+    global _STORE
+    with _STORE_LOCK:
+        if _STORE is None:
+            _STORE = MomentStore()
+            if not _STORE.enabled:
+                print("⚠️ SUPABASE_URL / SUPABASE_SERVICE_ROLE_KEY が未設定のため、二段階公開は行いません")
+        return _STORE if _STORE.enabled else None
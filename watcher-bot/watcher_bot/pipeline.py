@@ -0,0 +1,519 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from . import ai_budget
+from . import card_index
+from . import coalescer
+from . import instant_content
+from . import local_judge
+from . import milestones
+from . import mlb_api
+from . import moment_store
+from . import relay
+from . import statcast
+
+# --- 🔧 設定エリア ------------------------------------------------
+# ステージ間キューの最大長 (満杯になると上流ステージが待たされる = バックプレッシャー)
+QUEUE_MAXSIZE = 32
+
+# ステージごとの並列数
+# publish は管理画面をブラウザで開くため 1 のまま (タブが一気に開くのを防ぐ)
+STAGE_CONCURRENCY = {
+    "fetch": 4,
+    "detect": 2,
+    "judge": 4,
+    "coalesce": 1,
+    "generate": 4,
+    "publish": 1,
+}
+
+# Statcast 閾値検知 (Trueなら打球速度/飛距離/球速の閾値超えを AI を通さず即採用)
+USE_STATCAST_DETECTORS = True
+
+# シーズン節目検知 (Trueなら累積成績を更新し、50号や50-50などを RECORD_BREAK として即採用)
+USE_MILESTONE_TRACKER = True
+
+# 記事生成前のまとめ役 (Trueなら同じ選手・同じ回の連続モーメントを最も熱いものに統合し、公開レートを制限する)
+USE_COALESCER = True
+
+# カード紐付け (Trueなら公開時に card_catalogs の索引から関連カードIDを引き、metadata.related_card_ids に載せる)
+USE_CARD_INDEX = True
+
+# ローカル審判 (Trueなら学習済みモデルで自信のあるプレイは AI審判を通さずに判定する。local_judge.py 参照)
+USE_LOCAL_JUDGE = True
+
+# 二段階公開 (Trueなら判定直後に定型文で live_moments へ即公開し、AI の記事が届いたら同じ行を更新する)
+# 管理画面を経由せず Service Role キーで直接書き込む。
+# 即時公開は judge ステージで行い coalesce の窓を待たない (統合とレート制限がかかるのは第2段の AI 記事だけ)
+USE_TWO_PHASE_PUBLISH = False
+
+# 配信リレー (Trueなら公開したモーメントを SSE/WebSocket で直接ファンへ配る。relay.py 参照)
+# シャード構成ではコーディネーターだけがリレーを起動し、各ワーカーは RELAY_INGEST_PORT 経由で転送する
+USE_RELAY = False
+
+# キュー深さをログ出力する間隔 (秒)
+QUEUE_REPORT_INTERVAL = 5.0
+
+# 一次判定ルール (ai_watcher / ai_watcher_claude の classify_moment と backtest.BASELINE_RULES が共通で読む)
+# 点差はどこでも「そのプレイ直後の途中経過」で数える (play_score 参照)
+CLASSIFY_RULES = {
+    "close_game_diff": 2,        # 点差がこれ以内 + 得点圏 → ルールで確定
+    "judge_diff": 3,             # 点差がこれ以内なら AI審判へ (それ以外は対象外)
+    "judge_postseason": True,    # ポストシーズンは点差に関係なく AI審判へ
+}
+# ポストシーズン以外の試合種別 (レギュラーシーズン / スプリングトレーニング / エキシビション)
+REGULAR_GAME_TYPES = ("R", "S", "E")
+
+STAGE_NAMES = ["fetch", "detect", "judge", "coalesce", "generate", "publish"]
+# ------------------------------------------------------------------
+
+
+def play_score(play, away_score, home_score):
+    """
+    プレイ直後の途中経過スコア (away, home)。プレイに無ければ渡されたスコアを使う。
+    試合の最新スコアではなくこちらで判定することで、ライブとバックテスト (play_archive) の点差が一致する
+    """
+    result = (play or {}).get('result', {})
+    return result.get('awayScore', away_score), result.get('homeScore', home_score)
+
+
+def _make_moment(ctx, player_id, player_name, event_type, description, progress, verdict, event="", inning=0, play=None, key_suffix=None):
+    if key_suffix is None:
+        key_suffix = (play or {}).get('about', {}).get('atBatIndex', '')
+    away_score, home_score = play_score(play, ctx["away_score"], ctx["home_score"])
+    return {
+        # 同じプレイを二重に公開しないための一意キー (シャード間の重複排除に使用)
+        "moment_key": f"{ctx['game_pk']}:{key_suffix}:{player_id}:{event_type}",
+        "game_pk": ctx["game_pk"],
+        "game_type": ctx["game_type"],
+        "player_id": player_id,
+        "player_name": player_name,
+        "event": event,
+        "event_type": event_type,
+        "description": description,
+        "inning": inning,
+        "progress": progress,
+        "away_team": ctx["away_team"],
+        "home_team": ctx["home_team"],
+        "away_score": away_score,
+        "home_score": home_score,
+        "score_diff": abs(away_score - home_score),
+        "verdict": verdict,
+        "play": play or {},
+    }
+
+
+def detect_moments(watcher, ctx):
+    """
+    1試合分のプレイから監視選手の候補モーメントを抽出する。
+    ルールで確定したものは verdict='ACCEPT'、AI審判が必要なものは verdict='JUDGE'。
+    """
+    moments = []
+    statcast_hits = statcast.detect_statcast_moments(ctx["all_plays"], watcher.WATCH_IDS) if USE_STATCAST_DETECTORS else {}
+    tracker = milestones.get_tracker() if USE_MILESTONE_TRACKER else None
+
+    for index, play in enumerate(ctx["all_plays"]):
+        matchup = play.get('matchup', {})
+        result = play.get('result', {})
+        event = result.get('event', '')
+        about = play.get('about', {})
+        if not about.get('isComplete', True):
+            # 進行中の打席は結果が空のまま。完了してから (同じキーで) 拾う
+            continue
+        current_inning_num = about.get('inning', 0)
+        progress = watcher.to_form_progress(current_inning_num, about.get('halfInning', 'top'))
+
+        # 同じプレイで複数の節目 (50号 + 50-50 など) に届いたら1つのモーメントにまとめる
+        milestone_labels = {}
+        for player_id, label in (tracker.process_play(ctx, play, watcher.WATCH_IDS) if tracker else []):
+            milestone_labels.setdefault(player_id, []).append(label)
+        for player_id, labels in milestone_labels.items():
+            # 🏅 シーズン節目到達: 記録達成として確定
+            label = " / ".join(labels)
+            print(f"  🏅 節目達成: {watcher.WATCH_IDS[player_id]['name']} / {label}")
+            moments.append(_make_moment(
+                ctx, player_id, watcher.WATCH_IDS[player_id]['name'], "RECORD_BREAK",
+                f"{result.get('description', '')} ({label})", progress, 'ACCEPT',
+                event=event, inning=current_inning_num, play=play,
+            ))
+        # 節目を達成した選手は、同じプレイの通常モーメントを出さない
+        milestone_players = set(milestone_labels)
+
+        if index in statcast_hits and statcast_hits[index][2] not in milestone_players:
+            # 📡 Statcast 閾値超え: AI審判を通さず確定
+            rule, value, player_id = statcast_hits[index]
+            label = rule["label"].format(value=value)
+            print(f"  📡 Statcast検知: {watcher.WATCH_IDS[player_id]['name']} / {label}")
+            moment = _make_moment(
+                ctx, player_id, watcher.WATCH_IDS[player_id]['name'], rule["moment_type"],
+                f"{result.get('description', '')} ({label})", progress, 'ACCEPT',
+                event=event, inning=current_inning_num, play=play,
+            )
+            moment["statcast"] = {"rule": rule["name"], "metric": rule["metric"], "value": value}
+            moments.append(moment)
+            continue
+
+        batter_id = matchup.get('batter', {}).get('id')
+        pitcher_id = matchup.get('pitcher', {}).get('id')
+        if batter_id in watcher.WATCH_IDS:
+            player_id = batter_id
+        elif pitcher_id in watcher.WATCH_IDS:
+            player_id = pitcher_id
+        else:
+            continue
+        if player_id in milestone_players:
+            continue
+
+        away_score, home_score = play_score(play, ctx["away_score"], ctx["home_score"])
+        verdict = watcher.classify_moment(event, play, abs(away_score - home_score), ctx["game_type"])
+        if verdict == 'REJECT':
+            continue
+
+        moments.append(_make_moment(
+            ctx, player_id, watcher.WATCH_IDS[player_id]['name'],
+            watcher.map_event_type_to_form(event), result.get('description', ''), progress,
+            verdict, event=event, inning=current_inning_num, play=play,
+        ))
+
+    game = ctx["game"]
+    if 'Final' in ctx["linescore"].get('inningState', '') or game.get('status', {}).get('abstractGameState') == 'Final':
+        decisions = ctx["decisions"]
+        # 勝利/セーブは最終回の出来事として扱う (coalesce で同じ回の三振などをまとめられるように)
+        final_inning = next((p.get('about', {}).get('inning', 0) for p in reversed(ctx["all_plays"])
+                             if p.get('about', {}).get('isComplete', True)), 0)
+        for player_id, label in (tracker.process_decisions(ctx, watcher.WATCH_IDS) if tracker else []):
+            p_name = watcher.WATCH_IDS[player_id]['name']
+            print(f"  🏅 節目達成: {p_name} / {label}")
+            moments.append(_make_moment(
+                ctx, player_id, p_name, "RECORD_BREAK", f"{p_name} reaches a milestone: {label}", "Final", 'ACCEPT',
+                inning=final_inning, key_suffix=f"milestone:{label}",
+            ))
+        for key, desc_fmt in (('winner', "{name} earns the win!"), ('save', "{name} records the save!")):
+            if key not in decisions:
+                continue
+            pid = decisions[key]['id']
+            if pid in watcher.WATCH_IDS:
+                p_name = watcher.WATCH_IDS[pid]['name']
+                moments.append(_make_moment(
+                    ctx, pid, p_name, "VICTORY", desc_fmt.format(name=p_name), "Final", 'ACCEPT',
+                    inning=final_inning, key_suffix=key,
+                ))
+    return moments
+
+
+def seed_milestones(watcher, games):
+    """
+    処理する試合のシーズン成績を先にシードしておく (検知中に MLB API を待たないように)。
+    シード済みなら SQLite を1回見るだけ。
+    """
+    if not USE_MILESTONE_TRACKER:
+        return
+    tracker = milestones.get_tracker()
+    for official_date in sorted({g.get('officialDate') for g in games if g.get('gameType', 'R') == 'R'} - {None}):
+        tracker.ensure_seeded(watcher.WATCH_IDS, official_date)
+
+
+def strict_rule_verdict(moment):
+    """
+    予算が残り少ない時に AI審判の代わりに使う厳格なローカルルール。
+    本塁打と、9回以降1点差以内の安打/三振だけを採用する。
+    """
+    if moment["event_type"] == 'HOMERUN':
+        return True
+    is_climax = (moment["inning"] or 0) >= 9 and moment["score_diff"] <= 1
+    return is_climax and moment["event_type"] in ('TIMELY', 'STRIKEOUT')
+
+
+class HighlightPipeline:
+    """
+    fetch → detect → judge → coalesce → generate → publish を有界キューで繋いだパイプライン。
+    各ステージは独立した並列数で動き、遅いAI呼び出しが他の試合のスキャンを止めない。
+    """
+
+    def __init__(self, watcher, concurrency=None, queue_maxsize=QUEUE_MAXSIZE, claim_moment=None, finish_moment=None,
+                 moment_coalescer=None):
+        self.watcher = watcher
+        # claim_moment(moment) -> bool: Falseなら処理済み/処理中として捨てる (シャード間の重複排除)
+        self.claim_moment = claim_moment
+        # finish_moment(moment_key): 公開 or 却下まで届いたモーメントを処理済みにする
+        # (途中で落ちたモーメントは処理権が失効した後に再処理される)
+        self.finish_moment = finish_moment
+        self.concurrency = dict(STAGE_CONCURRENCY, **(concurrency or {}))
+        self.queue_maxsize = queue_maxsize
+        self.queues = {}
+        self.processed = {name: 0 for name in STAGE_NAMES}
+        self.published = []
+        # 周回ごとにパイプラインを作り直す場合 (シャードのワーカー) は、公開レートを周回をまたいで
+        # 守れるよう呼び出し側で1つ作って渡す
+        if USE_COALESCER:
+            self.coalescer = moment_coalescer if moment_coalescer is not None else coalescer.MomentCoalescer()
+        else:
+            self.coalescer = None
+        self.relay = relay.get_relay() if USE_RELAY else None
+        # 索引は起動時に一度だけ構築し、以降は公開のたびに間隔を見て裏のスレッドで差分更新する
+        self.card_index = card_index.get_index() if USE_CARD_INDEX else None
+        self.local_judge = local_judge.get_judge() if USE_LOCAL_JUDGE else None
+        self.store = moment_store.get_store() if USE_TWO_PHASE_PUBLISH else None
+        self._flushing = False
+        self._coalesce_busy = False
+
+    # --- ステージ処理 (いずれも同期関数。スレッドプールで実行される) ---
+    def _fetch(self, game):
+        try:
+            return [mlb_api.fetch_game_context(game)]
+        except Exception as e:
+            print(f"❌ フィード取得エラー ({game.get('gamePk')}): {e}")
+            return []
+
+    def _detect(self, ctx):
+        return detect_moments(self.watcher, ctx)
+
+    def _finish(self, *moment_keys):
+        if self.finish_moment is not None:
+            for key in moment_keys:
+                self.finish_moment(key)
+
+    def _finish_published(self, moment):
+        # 統合されて公開されなかったモーメントも、勝者と一緒に処理済みにする
+        self._finish(moment["moment_key"], *(m["moment_key"] for m in moment.get("merged_moments", [])))
+
+    def _judge(self, moment):
+        if self.claim_moment is not None and not self.claim_moment(moment):
+            return []
+        if self._judge_verdict(moment):
+            if self.store is not None:
+                # ⚡ 判定が出たらすぐ定型文で公開する (coalesce の窓やレート上限を待たせない)
+                self._publish_instant(moment)
+            return [moment]
+        self._finish(moment["moment_key"])
+        return []
+
+    def _judge_verdict(self, moment):
+        if moment["verdict"] == 'ACCEPT':
+            return True
+        # 💰 予算残りわずかなら AI審判は止める
+        use_ai = ai_budget.LEDGER.mode(moment["game_pk"]) == ai_budget.MODE_NORMAL
+        if self.local_judge is not None:
+            # 🧠 ローカル審判で確定できなければ AI審判へ (判定と特徴量はログに残る)
+            judge, log = self.local_judge
+            verdict = local_judge.judge_moment(self.watcher, moment, judge, log, use_ai=use_ai)
+        elif use_ai:
+            context_str = f"GameType: {moment['game_type']}, Inning: {moment['inning']}, ScoreDiff: {moment['score_diff']}"
+            verdict = self.watcher.judge_impact_by_ai(moment["player_name"], moment["description"], context_str, game_pk=moment["game_pk"])
+        else:
+            verdict = None
+        if verdict is None:
+            # ローカル審判が保留 / AI を使えない / AI がエラー → 厳格ルールで判定
+            return strict_rule_verdict(moment)
+        return bool(verdict)
+
+    def _generate(self, moment):
+        print(f"\n🔥 ハイライト発見: {moment['player_name']} / {moment['event_type']}")
+        if "row_id" in moment:
+            return self._rewrite_with_ai(moment)
+        return self._generate_with_ai(moment)
+
+    def _publish_instant(self, moment):
+        """第1段: AI を待たずに定型文で公開し、行IDを覚えておく (失敗したら通常公開に回す)"""
+        started = time.monotonic()
+        moment["ai_content"] = instant_content.build_instant_content(moment)
+        self._attach_related_cards(moment)
+        try:
+            moment["row_id"] = self.store.insert(moment_store.moment_row(moment, "instant"))
+        except Exception as e:
+            # 直接書き込めなければ従来どおり AI の記事を待って管理画面から公開する
+            print(f"  ⚠️ 即時公開に失敗したため通常公開に切り替えます: {e}")
+            moment.pop("ai_content")
+            return
+        if self.relay is not None:
+            self.relay.publish(dict(relay.moment_to_public(moment), id=moment["row_id"], phase="instant"))
+        self.published.append(moment)
+        # 行はもう公開されているので、AI記事の更新前に落ちても再公開しない
+        self._finish(moment["moment_key"])
+        print(f"  ⚡ 即時公開: {moment['ai_content']['title']} ({(time.monotonic() - started) * 1000:.0f}ms)")
+
+    def _rewrite_with_ai(self, moment):
+        """
+        第2段: coalesce を通った勝者の行だけ AI の記事で書き換える (予算切れなら定型文のまま)。
+        統合された格下のモーメントは定型文の行のまま残り、勝者の metadata.merged_moments に載る
+        """
+        started = time.monotonic()
+        # 即時公開に失敗して統合されたモーメントも、勝者と一緒に処理済みにする
+        self._finish_published(moment)
+        if ai_budget.LEDGER.mode(moment["game_pk"]) == ai_budget.MODE_EXHAUSTED:
+            if moment.get("merged_moments"):
+                self._update_row(moment, "instant")
+            return []
+        moment["ai_content"] = self.watcher.get_japanese_content(
+            moment["description"], moment["event_type"], moment["player_name"],
+            f"{moment['away_score']}-{moment['home_score']}", game_pk=moment["game_pk"],
+        )
+        if not self._update_row(moment, "ai"):
+            return []
+        if self.relay is not None:
+            self.relay.publish(dict(relay.moment_to_public(moment), id=moment["row_id"], phase="ai"))
+        print(f"  ✍️ AI記事に更新: {moment['ai_content'].get('title')} (+{time.monotonic() - started:.1f}秒)")
+        # 公開済みなので publish には流さない
+        return []
+
+    def _update_row(self, moment, phase):
+        row = moment_store.moment_row(moment, phase)
+        try:
+            self.store.update(moment["row_id"], {k: row[k] for k in ("title", "description", "intensity", "metadata")})
+            return True
+        except Exception as e:
+            print(f"  ⚠️ 行の更新に失敗 ({phase}): {e}")
+            return False
+
+    def _generate_with_ai(self, moment):
+        if ai_budget.LEDGER.mode(moment["game_pk"]) == ai_budget.MODE_EXHAUSTED:
+            # 💰 予算切れ: 記事生成もAIを使わず原文で公開する
+            moment["ai_content"] = {"title": moment["event_type"], "desc": moment["description"], "intensity": "3"}
+            return [moment]
+        moment["ai_content"] = self.watcher.get_japanese_content(
+            moment["description"], moment["event_type"], moment["player_name"],
+            f"{moment['away_score']}-{moment['home_score']}", game_pk=moment["game_pk"],
+        )
+        return [moment]
+
+    def _attach_related_cards(self, moment):
+        if self.card_index is not None:
+            self.card_index.maybe_refresh()
+            moment["related_card_ids"] = self.card_index.related_card_ids(moment["player_id"], moment["player_name"])
+
+    def _publish(self, moment):
+        self._attach_related_cards(moment)
+        if self.relay is not None:
+            # 📡 管理画面より先にリレーへ (ファンへの到達をDB経由より早くする)
+            self.relay.publish(relay.moment_to_public(moment))
+        self.watcher.publish_to_admin(
+            moment["player_name"], moment["event_type"], moment["description"], moment["ai_content"],
+            moment["away_team"], moment["home_team"], moment["away_score"], moment["home_score"], moment["progress"],
+            related_card_ids=moment.get("related_card_ids"), merged_moments=moment.get("merged_moments"),
+        )
+        self.published.append(moment)
+        self._finish_published(moment)
+        return []
+
+    def stage_handlers(self):
+        return {
+            "fetch": self._fetch,
+            "detect": self._detect,
+            "judge": self._judge,
+            "coalesce": lambda moment: [moment],  # USE_COALESCER=False の時は素通し
+            "generate": self._generate,
+            "publish": self._publish,
+        }
+
+    # --- 実行基盤 ---
+    def queue_depths(self):
+        """各ステージ入力キューの現在の深さ"""
+        return {name: q.qsize() for name, q in self.queues.items()}
+
+    def _format_depths(self):
+        return " | ".join(f"{name}={q.qsize()}/{self.queue_maxsize}" for name, q in self.queues.items())
+
+    async def _worker(self, name, handler, out_queue):
+        in_queue = self.queues[name]
+        while True:
+            item = await in_queue.get()
+            try:
+                outputs = await asyncio.get_running_loop().run_in_executor(None, handler, item)
+                self.processed[name] += 1
+                if out_queue is not None:
+                    for out in outputs:
+                        # 下流キューが満杯ならここで待つ (バックプレッシャー)
+                        await out_queue.put(out)
+            except Exception as e:
+                print(f"  ⚠️ [{name}] ステージエラー: {e}")
+            finally:
+                in_queue.task_done()
+
+    async def _coalesce_loop(self, out_queue):
+        """窓が閉じたモーメントを熱狂度順・レート上限内で generate に流す"""
+        in_queue = self.queues["coalesce"]
+        while True:
+            wait = self.coalescer.next_wakeup()
+            if self._flushing:
+                wait = 0.05 if wait is None else min(wait, 0.05)
+            try:
+                moment = await asyncio.wait_for(in_queue.get(), timeout=wait)
+                self.coalescer.add(moment)
+                self.processed["coalesce"] += 1
+                in_queue.task_done()
+            except asyncio.TimeoutError:
+                pass
+            self._coalesce_busy = True
+            try:
+                for moment in self.coalescer.pop_ready(flush=self._flushing):
+                    await out_queue.put(moment)
+            finally:
+                self._coalesce_busy = False
+
+    async def _reporter(self):
+        while True:
+            await asyncio.sleep(QUEUE_REPORT_INTERVAL)
+            print(f"📊 キュー深さ: {self._format_depths()}")
+
+    async def run_async(self, games):
+        handlers = self.stage_handlers()
+        self.queues = {name: asyncio.Queue(maxsize=self.queue_maxsize) for name in STAGE_NAMES}
+
+        loop = asyncio.get_running_loop()
+        loop.set_default_executor(ThreadPoolExecutor(max_workers=sum(self.concurrency.values())))
+
+        workers = {}
+        for i, name in enumerate(STAGE_NAMES):
+            out_queue = self.queues[STAGE_NAMES[i + 1]] if i + 1 < len(STAGE_NAMES) else None
+            if name == "coalesce" and self.coalescer is not None:
+                workers[name] = [asyncio.create_task(self._coalesce_loop(out_queue))]
+                continue
+            workers[name] = [
+                asyncio.create_task(self._worker(name, handlers[name], out_queue))
+                for _ in range(self.concurrency[name])
+            ]
+        reporter = asyncio.create_task(self._reporter())
+
+        started = time.monotonic()
+        suppressed_before = self.coalescer.suppressed if self.coalescer else 0
+        await loop.run_in_executor(None, seed_milestones, self.watcher, games)
+        for game in games:
+            await self.queues["fetch"].put(game)
+
+        # 上流から順に空になるのを待ち、空になったステージのワーカーを止める
+        for name in STAGE_NAMES:
+            await self.queues[name].join()
+            if name == "coalesce" and self.coalescer is not None:
+                # 上流が空になったら窓を待たずに溜まっている分を吐き出す (レート上限は守る)
+                self._flushing = True
+                while self.coalescer.pending() or self._coalesce_busy:
+                    await asyncio.sleep(0.05)
+            for task in workers[name]:
+                task.cancel()
+        reporter.cancel()
+
+        elapsed = time.monotonic() - started
+        counts = ", ".join(f"{name}={n}" for name, n in self.processed.items())
+        suppressed = self.coalescer.suppressed - suppressed_before if self.coalescer else 0
+        print(f"✅ パイプライン完了 ({elapsed:.1f}秒) 処理件数: {counts} / 公開: {len(self.published)}件 (統合: {suppressed}件)")
+        if self.local_judge is not None:
+            print(f"🧠 審判: {self.local_judge[1].summary()}")
+        return self.published
+
+    def run(self, games):
+        return asyncio.run(self.run_async(games))
+
+
+def run_highlight_pipeline(watcher, target_date, concurrency=None):
+    """指定日の全試合をパイプラインで処理する"""
+    print(f"📅 {target_date} の試合をスキャン中... (パイプラインモード)")
+    try:
+        games = mlb_api.fetch_schedule_games(target_date)
+    except Exception as e:
+        print(f"❌ 日程取得エラー: {e}")
+        return []
+    if not games:
+        print("💤 指定日に試合データがありません")
+        return []
+    return HighlightPipeline(watcher, concurrency=concurrency).run(games)
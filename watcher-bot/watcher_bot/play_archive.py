@@ -0,0 +1,246 @@
+import gzip
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+import numpy as np
+
+from . import mlb_api
+from . import statcast
+
+# --- 🔧 設定エリア ------------------------------------------------
+# 試合フィードの保存先 (1試合 = <game_pk>.json.gz。取得済みの試合は再取得しない)
+FEEDS_DIR = "feeds"
+
+# 列指向アーカイブの出力先 (列ごとの .npy を np.load(mmap_mode="r") で読む)
+ARCHIVE_DIR = "play_archive"
+
+# フィード取得の並列数
+FETCH_WORKERS = 8
+# ------------------------------------------------------------------
+
+ARCHIVE_VERSION = 1
+
+# プレイ列 (1打席 = 1行)。game は games 列の行番号
+PLAY_COLUMNS = {
+    "game": np.int32,
+    "at_bat": np.int16,
+    "inning": np.int8,
+    "bottom": np.bool_,
+    "batter_id": np.int32,
+    "pitcher_id": np.int32,
+    "event": np.int16,        # vocab["events"] の番号
+    "rbi": np.int8,
+    "outs": np.int8,
+    "risp": np.bool_,
+    "scoring": np.bool_,
+    "away_score": np.int16,   # プレイ直後のスコア
+    "home_score": np.int16,
+    **{m: np.float32 for m in statcast.METRICS},
+}
+
+# 試合列。plays は play_start から次の試合の play_start までの範囲
+GAME_COLUMNS = {
+    "game_pk": np.int64,
+    "game_type": np.int8,     # vocab["game_types"] の番号
+    "date": np.int32,         # YYYYMMDD
+    "away_team": np.int16,    # vocab["teams"] の番号
+    "home_team": np.int16,
+    "away_final": np.int16,
+    "home_final": np.int16,
+    "winner_id": np.int32,
+    "save_id": np.int32,
+    "play_start": np.int64,
+}
+
+
+# --- 取得 ---
+def _date_range(start, end):
+    day, last = date.fromisoformat(start), date.fromisoformat(end)
+    while day <= last:
+        yield day.isoformat()
+        day += timedelta(days=1)
+
+
+def fetch_feeds(start, end, feeds_dir=FEEDS_DIR, workers=FETCH_WORKERS):
+    """期間内の終了済みの試合フィードを保存する (保存済みはスキップ)"""
+    os.makedirs(feeds_dir, exist_ok=True)
+    todo = []
+    for target_date in _date_range(start, end):
+        for game in mlb_api.fetch_schedule_games(target_date):
+            path = os.path.join(feeds_dir, f"{game['gamePk']}.json.gz")
+            if game.get('status', {}).get('abstractGameState') == 'Final' and not os.path.exists(path):
+                todo.append((game['gamePk'], path))
+    print(f"📥 {start} 〜 {end}: 未取得の終了試合 {len(todo)}件")
+
+    def fetch(item):
+        game_pk, path = item
+        feed = mlb_api.fetch_feed(game_pk)
+        tmp = f"{path}.tmp"
+        with gzip.open(tmp, "wt", encoding="utf-8") as f:
+            json.dump(feed, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp, path)
+
+    failed = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for done, (item, error) in enumerate(zip(todo, pool.map(_capture(fetch), todo)), 1):
+            if error:
+                failed += 1
+                print(f"  ❌ {item[0]}: {error}")
+            elif done % 100 == 0:
+                print(f"  {done}/{len(todo)}")
+    print(f"📥 取得完了: {len(todo) - failed}件 (失敗 {failed}件)")
+
+
+def _capture(fn):
+    def run(item):
+        try:
+            fn(item)
+            return None
+        except Exception as e:
+            return e
+    return run
+
+
+def iter_feeds(feeds_dir=FEEDS_DIR):
+    for name in sorted(os.listdir(feeds_dir)):
+        path = os.path.join(feeds_dir, name)
+        if name.endswith(".json.gz"):
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                yield json.load(f)
+        elif name.endswith(".json"):
+            with open(path, encoding="utf-8") as f:
+                yield json.load(f)
+
+
+# --- 構築 ---
+class _Vocab:
+    def __init__(self):
+        self.values = []
+        self.codes = {}
+
+    def code(self, value):
+        if value not in self.codes:
+            self.codes[value] = len(self.values)
+            self.values.append(value)
+        return self.codes[value]
+
+
+def build_archive(feeds_dir=FEEDS_DIR, archive_dir=ARCHIVE_DIR):
+    """
+    保存済みフィードから列指向アーカイブを作り直す。
+    プレイ説明文は1つの UTF-8 バイト列 + オフセットにまとめる (説明文も mmap で読める)。
+    """
+    started = time.monotonic()
+    plays = {name: [] for name in PLAY_COLUMNS}
+    games = {name: [] for name in GAME_COLUMNS}
+    vocab = {"events": _Vocab(), "game_types": _Vocab(), "teams": _Vocab()}
+    players = {}
+    descriptions = bytearray()
+    desc_offsets = [0]
+
+    for feed in iter_feeds(feeds_dir):
+        game = mlb_api.game_from_feed(feed)
+        ctx = mlb_api.build_game_context(game, feed)
+        all_plays = ctx["all_plays"]
+        game_index = len(games["game_pk"])
+        decisions = ctx["decisions"]
+        games["game_pk"].append(ctx["game_pk"] or 0)
+        games["game_type"].append(vocab["game_types"].code(ctx["game_type"]))
+        games["date"].append(int((game.get("officialDate") or "0").replace("-", "")))
+        games["away_team"].append(vocab["teams"].code(ctx["away_team"]))
+        games["home_team"].append(vocab["teams"].code(ctx["home_team"]))
+        games["away_final"].append(ctx["away_score"])
+        games["home_final"].append(ctx["home_score"])
+        games["winner_id"].append(decisions.get("winner", {}).get("id", 0))
+        games["save_id"].append(decisions.get("save", {}).get("id", 0))
+        games["play_start"].append(len(plays["game"]))
+
+        metrics = statcast.extract_play_metrics(all_plays)
+        for i, play in enumerate(all_plays):
+            matchup = play.get('matchup', {})
+            result = play.get('result', {})
+            about = play.get('about', {})
+            for role in ('batter', 'pitcher'):
+                person = matchup.get(role, {})
+                if person.get('id'):
+                    players[person['id']] = person.get('fullName', '')
+            plays["game"].append(game_index)
+            plays["at_bat"].append(about.get('atBatIndex', i))
+            plays["inning"].append(about.get('inning', 0))
+            plays["bottom"].append(about.get('halfInning') == 'bottom')
+            plays["batter_id"].append(matchup.get('batter', {}).get('id') or 0)
+            plays["pitcher_id"].append(matchup.get('pitcher', {}).get('id') or 0)
+            plays["event"].append(vocab["events"].code(result.get('event', '')))
+            plays["rbi"].append(result.get('rbi', 0) or 0)
+            plays["outs"].append(play.get('count', {}).get('outs', 0) or 0)
+            plays["risp"].append(any(r.get('movement', {}).get('originBase') in ('2B', '3B')
+                                     for r in play.get('runners', [])))
+            plays["scoring"].append(bool(about.get('isScoringPlay')))
+            plays["away_score"].append(result.get('awayScore', 0) or 0)
+            plays["home_score"].append(result.get('homeScore', 0) or 0)
+            for m in statcast.METRICS:
+                plays[m].append(metrics[m][i])
+            descriptions += result.get('description', '').encode("utf-8")
+            desc_offsets.append(len(descriptions))
+
+    os.makedirs(archive_dir, exist_ok=True)
+    for group, columns, dtypes in (("plays", plays, PLAY_COLUMNS), ("games", games, GAME_COLUMNS)):
+        for name, values in columns.items():
+            np.save(os.path.join(archive_dir, f"{group}.{name}.npy"), np.array(values, dtype=dtypes[name]))
+    np.save(os.path.join(archive_dir, "plays.desc_offsets.npy"), np.array(desc_offsets, dtype=np.int64))
+    with open(os.path.join(archive_dir, "plays.desc.bin"), "wb") as f:
+        f.write(descriptions)
+    with open(os.path.join(archive_dir, "vocab.json"), "w", encoding="utf-8") as f:
+        json.dump({
+            "version": ARCHIVE_VERSION,
+            **{k: v.values for k, v in vocab.items()},
+            "players": {str(k): v for k, v in players.items()},
+        }, f, ensure_ascii=False)
+
+    size = sum(os.path.getsize(os.path.join(archive_dir, n)) for n in os.listdir(archive_dir))
+    print(f"🗄️ アーカイブ構築: {len(games['game_pk'])}試合 / {len(plays['game'])}打席 / "
+          f"{size / 1e6:.1f} MB ({time.monotonic() - started:.1f}秒)")
+
+
+# --- 読み込み ---
+class PlayArchive:
+    """列ごとの .npy をメモリマップで開く (必要な列のページだけが読まれる)"""
+
+    def __init__(self, archive_dir=ARCHIVE_DIR):
+        self.archive_dir = archive_dir
+        with open(os.path.join(archive_dir, "vocab.json"), encoding="utf-8") as f:
+            vocab = json.load(f)
+        if vocab.get("version") != ARCHIVE_VERSION:
+            raise ValueError(f"アーカイブの形式が古いため再構築してください: {archive_dir}")
+        self.events = vocab["events"]
+        self.game_types = vocab["game_types"]
+        self.teams = vocab["teams"]
+        self.players = {int(k): v for k, v in vocab["players"].items()}
+        self.plays = {name: self._open(f"plays.{name}") for name in PLAY_COLUMNS}
+        self.games = {name: self._open(f"games.{name}") for name in GAME_COLUMNS}
+        self._desc_offsets = self._open("plays.desc_offsets")
+        self._desc = np.memmap(os.path.join(archive_dir, "plays.desc.bin"), dtype=np.uint8, mode="r") \
+            if self._desc_offsets[-1] else np.zeros(0, dtype=np.uint8)
+
+    def _open(self, name):
+        return np.load(os.path.join(self.archive_dir, f"{name}.npy"), mmap_mode="r")
+
+    def __len__(self):
+        return len(self.plays["game"])
+
+    def description(self, i):
+        start, end = self._desc_offsets[i], self._desc_offsets[i + 1]
+        return bytes(self._desc[start:end]).decode("utf-8")
+
+    def game_mask(self, season=None, game_types=None):
+        """シーズン (年) と試合種別で絞り込んだプレイのマスク"""
+        keep = np.ones(len(self.games["game_pk"]), dtype=bool)
+        if season:
+            keep &= self.games["date"] // 10000 == int(season)
+        if game_types:
+            codes = [i for i, t in enumerate(self.game_types) if t in game_types]
+            keep &= np.isin(self.games["game_type"], codes)
+        return keep[self.plays["game"]]
@@ -0,0 +1,30 @@
+# 監視対象の選手リスト (2025-2026シーズン最新版)
+# IDはMLB公式 (statsapi.mlb.com / mlb.com) のPerson IDを使用
+# name_en / name_kana はカードカタログ等の表記揺れとの突き合わせに使用 (card_index.py)
+
+WATCH_LIST = [
+    # --- 🇺🇸 2025/2026 新加入・注目選手 ---
+    {"id": 808963, "name": "佐々木朗希", "name_en": "Roki Sasaki", "name_kana": "ささき ろうき", "team_code": "LAD"},  # Dodgers
+    {"id": 608372, "name": "菅野智之", "name_en": "Tomoyuki Sugano", "name_kana": "すがの ともゆき", "team_code": "BAL"},    # Orioles
+    {"id": 672960, "name": "岡本和真", "name_en": "Kazuma Okamoto", "name_kana": "おかもと かずま", "team_code": "TOR"},    # Blue Jays
+    {"id": 808959, "name": "村上宗隆", "name_en": "Munetaka Murakami", "name_kana": "むらかみ むねたか", "team_code": "CWS"},    # White Sox
+    {"id": 829272, "name": "小笠原慎之介", "name_en": "Shinnosuke Ogasawara", "name_kana": "おがさわら しんのすけ", "team_code": "WSH"},# Nationals
+
+    # --- 🌟 メジャー定着・主力選手 ---
+    {"id": 660271, "name": "大谷翔平", "name_en": "Shohei Ohtani", "name_kana": "おおたに しょうへい", "team_code": "LAD"},    # Dodgers
+    {"id": 808967, "name": "山本由伸", "name_en": "Yoshinobu Yamamoto", "name_kana": "やまもと よしのぶ", "team_code": "LAD"},    # Dodgers
+    {"id": 506433, "name": "ダルビッシュ有", "name_en": "Yu Darvish", "name_kana": "だるびっしゅ ゆう", "team_code": "SD"}, # Padres
+    {"id": 673548, "name": "鈴木誠也", "name_en": "Seiya Suzuki", "name_kana": "すずき せいや", "team_code": "CHC"},    # Cubs
+    {"id": 684007, "name": "今永昇太", "name_en": "Shota Imanaga", "name_kana": "いまなが しょうた", "team_code": "CHC"},    # Cubs
+    {"id": 807799, "name": "吉田正尚", "name_en": "Masataka Yoshida", "name_kana": "よしだ まさたか", "team_code": "BOS"},    # Red Sox
+    {"id": 673540, "name": "千賀滉大", "name_en": "Kodai Senga", "name_kana": "せんが こうだい", "team_code": "NYM"},    # Mets
+    {"id": 579328, "name": "菊池雄星", "name_en": "Yusei Kikuchi", "name_kana": "きくち ゆうせい", "team_code": "LAA"},    # Angels (2025移籍)
+    {"id": 673451, "name": "松井裕樹", "name_en": "Yuki Matsui", "name_kana": "まつい ゆうき", "team_code": "SD"},     # Padres
+    {"id": 628317, "name": "前田健太", "name_en": "Kenta Maeda", "name_kana": "まえだ けんた", "team_code": "DET"},    # Tigers
+
+    # --- 🇯🇵 侍ジャパン / 日系選手 ---
+    {"id": 663457, "name": "ラーズ・ヌートバー", "name_en": "Lars Nootbaar", "name_kana": "らーず ぬーとばー", "team_code": "STL"}, # Cardinals
+
+    # --- ⚠️ マイナー/招待選手など (必要に応じてコメントアウト解除) ---
+    # {"id": 642547, "name": "藤浪晋太郎", "name_en": "Shintaro Fujinami", "name_kana": "ふじなみ しんたろう", "team_code": "SEA"}, # Mariners (Minors)
+]
\ No newline at end of file
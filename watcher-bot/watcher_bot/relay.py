@@ -0,0 +1,357 @@
+import asyncio
+import base64
+import collections
+import hashlib
+import json
+import socket
+import struct
+import threading
+import time
+
+from . import mlb_api
+
+# --- 🔧 設定エリア ------------------------------------------------
+# 監視プロセス内で動く SSE / WebSocket 配信リレー。
+# パイプラインの publish ステージから直接モーメントを受け取り、DBを経由せずにファンへ配る。
+RELAY_HOST = "127.0.0.1"
+RELAY_PORT = 8787
+
+# シャード構成 (watch --workers) ではリレーはコーディネーターだけで動かし、
+# 各ワーカーはこのポートへモーメントを転送する (1行1JSON の TCP。127.0.0.1 でのみ待ち受け)
+RELAY_INGEST_PORT = 8788
+
+# ワーカー → コーディネーターの転送タイムアウト (秒)。届かなければそのモーメントの配信は諦める
+FORWARD_TIMEOUT_SEC = 2.0
+
+# クライアントごとの送信バッファ (溢れたら古いものから捨てる = 遅いクライアントで全体を止めない)
+CLIENT_BUFFER_SIZE = 64
+
+# 接続時に再送する直近モーメント数
+REPLAY_LAST_N = 20
+
+# SSE のキープアライブ間隔 (秒)
+KEEPALIVE_INTERVAL = 15.0
+
+# CORS (ブラウザの EventSource から直接つなぐ場合)
+ALLOW_ORIGIN = "*"
+# ------------------------------------------------------------------
+
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+
+def _ws_frame(payload, opcode=0x1):
+    """サーバー→クライアントの WebSocket フレーム (マスク無し・単一フレーム)"""
+    length = len(payload)
+    if length < 126:
+        header = struct.pack("!BB", 0x80 | opcode, length)
+    elif length < 65536:
+        header = struct.pack("!BBH", 0x80 | opcode, 126, length)
+    else:
+        header = struct.pack("!BBQ", 0x80 | opcode, 127, length)
+    return header + payload
+
+
+class RelayMessage:
+    """1モーメント分の配信データ。SSE/WS 用のバイト列は一度だけ作って全クライアントで共有する"""
+
+    __slots__ = ("seq", "sse", "ws", "created")
+
+    def __init__(self, seq, data):
+        body = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        self.seq = seq
+        self.sse = b"id: %d\nevent: moment\ndata: %s\n\n" % (seq, body)
+        self.ws = _ws_frame(body)
+        self.created = time.time()
+
+
+class RelayClient:
+    def __init__(self, kind):
+        self.kind = kind
+        self.queue = asyncio.Queue(maxsize=CLIENT_BUFFER_SIZE)
+        self.dropped = 0
+
+    def offer(self, message):
+        if self.queue.full():
+            # 遅いクライアント: 一番古いものを捨てて最新を入れる
+            try:
+                self.queue.get_nowait()
+            except asyncio.QueueEmpty:
+                pass
+            self.dropped += 1
+        self.queue.put_nowait(message)
+
+
+class MomentRelay:
+    def __init__(self, replay_last_n=REPLAY_LAST_N):
+        self.clients = set()
+        self.history = collections.deque(maxlen=replay_last_n)
+        self.seq = 0
+        self.loop = None
+        self.server = None
+        self.ingest_server = None
+        self.stats = {"published": 0, "connections_total": 0, "dropped": 0}
+
+    # --- 監視側 (別スレッド) から呼ぶ入口 ---
+    def publish(self, data):
+        """スレッドセーフ。イベントループに配信を依頼して即座に戻る"""
+        if self.loop is None:
+            return
+        self.loop.call_soon_threadsafe(self._fanout, data)
+
+    def _fanout(self, data):
+        self.seq += 1
+        message = RelayMessage(self.seq, dict(data, relay_seq=self.seq, relayed_at=time.time()))
+        self.history.append(message)
+        self.stats["published"] += 1
+        for client in self.clients:
+            client.offer(message)
+
+    # --- サーバー ---
+    async def start(self, host=RELAY_HOST, port=RELAY_PORT, ingest_port=None):
+        self.loop = asyncio.get_running_loop()
+        self.server = await asyncio.start_server(self._handle, host, port, backlog=4096)
+        if ingest_port is not None:
+            self.ingest_server = await asyncio.start_server(self._handle_ingest, "127.0.0.1", ingest_port)
+        return self.server
+
+    async def _handle_ingest(self, reader, writer):
+        """ワーカーの RelayForwarder から届く 1行1JSON をそのまま配信する"""
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    data = json.loads(line)
+                except ValueError:
+                    continue
+                self._fanout(data)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    def start_in_thread(self, host=RELAY_HOST, port=RELAY_PORT, ingest_port=None):
+        """専用スレッドでイベントループを回す (監視パイプラインと独立)"""
+        ready = threading.Event()
+        failure = []
+
+        def run():
+            loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
+            try:
+                loop.run_until_complete(self.start(host, port, ingest_port))
+            except BaseException as e:
+                # ポート使用中などで起動できなければ、呼び出し側で同じ例外を投げ直す
+                failure.append(e)
+                self.loop = None
+                loop.close()
+                return
+            finally:
+                ready.set()
+            loop.run_forever()
+
+        threading.Thread(target=run, name="moment-relay", daemon=True).start()
+        ready.wait()
+        if failure:
+            raise failure[0]
+        print(f"📡 リレー起動: SSE http://{host}:{port}/events  WS ws://{host}:{port}/ws")
+        return self
+
+    def snapshot(self):
+        return dict(
+            self.stats,
+            clients=len(self.clients),
+            dropped=self.stats["dropped"] + sum(c.dropped for c in self.clients),
+            last_seq=self.seq,
+        )
+
+    async def _handle(self, reader, writer):
+        try:
+            request_line = await reader.readline()
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                key, _, value = line.decode("latin-1").partition(":")
+                headers[key.strip().lower()] = value.strip()
+            parts = request_line.decode("latin-1").split()
+            path = parts[1] if len(parts) > 1 else "/"
+            route, _, query = path.partition("?")
+            params = dict(p.split("=", 1) for p in query.split("&") if "=" in p)
+
+            if route == "/events":
+                await self._serve_sse(writer, headers, params)
+            elif route == "/ws" and headers.get("upgrade", "").lower() == "websocket":
+                await self._serve_ws(reader, writer, headers)
+            elif route == "/stats":
+                body = json.dumps(self.snapshot()).encode("utf-8")
+                writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\nContent-Length: %d\r\nConnection: close\r\n\r\n%s" % (len(body), body))
+                await writer.drain()
+            else:
+                writer.write(b"HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    def _replay(self, last_id):
+        if last_id is None:
+            return list(self.history)
+        return [m for m in self.history if m.seq > last_id]
+
+    async def _serve_sse(self, writer, headers, params):
+        last_id = headers.get("last-event-id") or params.get("last_id")
+        last_id = int(last_id) if last_id and last_id.isdigit() else None
+
+        writer.write((
+            "HTTP/1.1 200 OK\r\n"
+            "Content-Type: text/event-stream\r\n"
+            "Cache-Control: no-cache\r\n"
+            "Connection: keep-alive\r\n"
+            f"Access-Control-Allow-Origin: {ALLOW_ORIGIN}\r\n\r\n"
+        ).encode("latin-1"))
+        client = RelayClient("sse")
+        for message in self._replay(last_id):
+            client.offer(message)
+        await self._pump(client, writer, lambda m: m.sse, keepalive=b": ping\n\n")
+
+    async def _serve_ws(self, reader, writer, headers):
+        accept = base64.b64encode(hashlib.sha1((headers.get("sec-websocket-key", "") + WS_GUID).encode()).digest())
+        writer.write(
+            b"HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+            b"Sec-WebSocket-Accept: " + accept + b"\r\n\r\n"
+        )
+        client = RelayClient("ws")
+        for message in self._replay(None):
+            client.offer(message)
+        receiver = asyncio.create_task(self._ws_receive(reader, writer))
+        try:
+            await self._pump(client, writer, lambda m: m.ws, keepalive=_ws_frame(b"", opcode=0x9), stop=receiver)
+        finally:
+            receiver.cancel()
+
+    async def _ws_receive(self, reader, writer):
+        """クライアントからのフレームを読み捨てる (close/ping のみ対応)"""
+        try:
+            while True:
+                head = await reader.readexactly(2)
+                opcode, length = head[0] & 0x0F, head[1] & 0x7F
+                if length == 126:
+                    length = struct.unpack("!H", await reader.readexactly(2))[0]
+                elif length == 127:
+                    length = struct.unpack("!Q", await reader.readexactly(8))[0]
+                mask = await reader.readexactly(4) if head[1] & 0x80 else b"\x00" * 4
+                data = bytes(b ^ mask[i % 4] for i, b in enumerate(await reader.readexactly(length)))
+                if opcode == 0x8:
+                    writer.write(_ws_frame(b"", opcode=0x8))
+                    return
+                if opcode == 0x9:
+                    writer.write(_ws_frame(data, opcode=0xA))
+        except (ConnectionError, asyncio.IncompleteReadError):
+            return
+
+    async def _pump(self, client, writer, encode, keepalive, stop=None):
+        self.clients.add(client)
+        self.stats["connections_total"] += 1
+        try:
+            while stop is None or not stop.done():
+                try:
+                    message = await asyncio.wait_for(client.queue.get(), timeout=KEEPALIVE_INTERVAL)
+                    writer.write(encode(message))
+                    # バッファに溜まっている分はまとめて書き出す
+                    while not client.queue.empty():
+                        writer.write(encode(client.queue.get_nowait()))
+                except asyncio.TimeoutError:
+                    writer.write(keepalive)
+                await writer.drain()
+        # キャンセル (サーバー停止) は握りつぶさずに上へ伝える
+        except ConnectionError:
+            pass
+        finally:
+            self.clients.discard(client)
+            self.stats["dropped"] += client.dropped
+
+
+def moment_to_public(moment):
+    """パイプライン内部のモーメントを、配信用 (live_moments 行に近い形) に変換する"""
+    ai_content = moment.get("ai_content", {})
+    return {
+        "player_name": moment["player_name"],
+        "type": moment["event_type"],
+        "title": ai_content.get("title", moment["event_type"]),
+        "description": ai_content.get("desc", moment["description"]),
+        "intensity": ai_content.get("intensity", "3"),
+        # 管理画面と同じ "LAD 5 - 4 NYY (Top 9th)" 形式 (admin/moments/page.tsx がこの形で読み戻す)
+        "match_result": f"{mlb_api.resolve_team_code(moment['away_team'])} {moment['away_score']} - "
+                        f"{moment['home_score']} {mlb_api.resolve_team_code(moment['home_team'])} ({moment['progress']})",
+        "metadata": {
+            "moment_key": moment["moment_key"],
+            "game_pk": moment["game_pk"],
+            "progress": moment["progress"],
+            "related_card_ids": moment.get("related_card_ids", []),
+            "merged_moments": moment.get("merged_moments", []),
+        },
+    }
+
+
+class RelayForwarder:
+    """
+    シャードのワーカー側でリレーの代わりに使う転送役 (publish の形は MomentRelay と同じ)。
+    コーディネーターのリレーへ接続を張りっぱなしにして送る。切れていたら1回だけ繋ぎ直す
+    """
+
+    def __init__(self, port=RELAY_INGEST_PORT, timeout=FORWARD_TIMEOUT_SEC):
+        self.port = port
+        self.timeout = timeout
+        self.sock = None
+        self.lock = threading.Lock()
+        self.stats = {"forwarded": 0, "failed": 0}
+
+    def publish(self, data):
+        line = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n"
+        with self.lock:
+            for attempt in range(2):
+                try:
+                    if self.sock is None:
+                        self.sock = socket.create_connection(("127.0.0.1", self.port), timeout=self.timeout)
+                    self.sock.sendall(line)
+                    self.stats["forwarded"] += 1
+                    return
+                except OSError as e:
+                    if self.sock is not None:
+                        self.sock.close()
+                        self.sock = None
+                    if attempt:
+                        self.stats["failed"] += 1
+                        print(f"  ⚠️ リレーへの転送に失敗 (配信は省略): {e}")
+
+
+_RELAY = None
+_RELAY_LOCK = threading.Lock()
+
+
+def get_relay(host=RELAY_HOST, port=RELAY_PORT, ingest_port=None):
+    """
+    プロセス内で共有するリレー (初回呼び出し時にスレッドで起動)。
+    use_forwarder() を呼んだプロセス (シャードのワーカー) では転送役を返す
+    """
+    global _RELAY
+    with _RELAY_LOCK:
+        if _RELAY is None:
+            _RELAY = MomentRelay().start_in_thread(host, port, ingest_port)
+        return _RELAY
+
+
+def use_forwarder(port=RELAY_INGEST_PORT):
+    """
+    このプロセスではリレーを起動せず、コーディネーターのリレーへ転送する。
+    ワーカーごとに RELAY_PORT を bind すると2つ目以降が起動に失敗するため
+    """
+    global _RELAY
+    with _RELAY_LOCK:
+        _RELAY = RelayForwarder(port)
+        return _RELAY
+
@@ -0,0 +1,80 @@
+import argparse
+import asyncio
+import json
+import time
+
+from . import relay
+
+# --- 🔧 設定エリア ------------------------------------------------
+# リレーをこのプロセス内で起動し、大量の SSE 接続へのファンアウト遅延を測る
+# (数千接続を張る場合は ulimit -n を十分に上げておくこと)
+DEFAULT_CLIENTS = 1000
+DEFAULT_MOMENTS = 20
+PUBLISH_INTERVAL_SEC = 0.5
+# ------------------------------------------------------------------
+
+
+async def sse_client(host, port, expected, latencies, connected):
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(f"GET /events HTTP/1.1\r\nHost: {host}\r\nAccept: text/event-stream\r\n\r\n".encode())
+    await writer.drain()
+    # レスポンスヘッダを読み飛ばす
+    while (await reader.readline()) not in (b"\r\n", b""):
+        pass
+    connected.release()
+
+    received = 0
+    try:
+        while received < expected:
+            line = await reader.readline()
+            if not line:
+                break
+            if line.startswith(b"data: "):
+                data = json.loads(line[6:])
+                latencies.append(time.time() - data["sent_at"])
+                received += 1
+    finally:
+        writer.close()
+
+
+async def run_loadtest(num_clients, num_moments, port):
+    # 負荷試験ではリプレイを無効にして、新規配信だけを測る
+    hub = relay.MomentRelay(replay_last_n=0)
+    server = await hub.start("127.0.0.1", port)
+    port = server.sockets[0].getsockname()[1]
+
+    latencies = []
+    connected = asyncio.Semaphore(0)
+    clients = [
+        asyncio.create_task(sse_client("127.0.0.1", port, num_moments, latencies, connected))
+        for _ in range(num_clients)
+    ]
+    for _ in range(num_clients):
+        await connected.acquire()
+    # ヘッダ受信後にサーバー側の登録が終わるのを待つ
+    while len(hub.clients) < num_clients:
+        await asyncio.sleep(0.01)
+    print(f"🔌 {num_clients} 接続完了。{num_moments}件を配信します...")
+
+    for i in range(num_moments):
+        hub.publish({"player_name": "負荷試験", "type": "BIG_PLAY", "title": f"#{i}", "sent_at": time.time()})
+        await asyncio.sleep(PUBLISH_INTERVAL_SEC)
+
+    await asyncio.wait_for(asyncio.gather(*clients), timeout=30)
+    server.close()
+
+    latencies.sort()
+    pct = lambda p: latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+    print("\n=== 📈 ファンアウト遅延 (配信→受信) ===")
+    print(f"受信数: {len(latencies)} / 期待値: {num_clients * num_moments}")
+    print(f"p50={pct(0.5):.1f}ms p95={pct(0.95):.1f}ms p99={pct(0.99):.1f}ms max={latencies[-1] * 1000:.1f}ms")
+    print(f"リレー統計: {hub.snapshot()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="配信リレーの負荷試験クライアント")
+    parser.add_argument("--clients", type=int, default=DEFAULT_CLIENTS)
+    parser.add_argument("--moments", type=int, default=DEFAULT_MOMENTS)
+    parser.add_argument("--port", type=int, default=0, help="0なら空きポート")
+    args = parser.parse_args()
+    asyncio.run(run_loadtest(args.clients, args.moments, args.port))
@@ -0,0 +1,268 @@
+import argparse
+import importlib
+import math
+import multiprocessing
+import os
+import socket
+import sqlite3
+import threading
+import time
+
+from . import coalescer
+from . import mlb_api
+from . import pipeline
+from . import relay
+
+# --- 🔧 設定エリア ------------------------------------------------
+# 全ワーカーで共有するリース/重複排除ストア (ローカルSQLite)
+SHARD_DB_PATH = "shard_state.db"
+
+# 試合リースの有効期限 (秒)。この間ハートビートが無いワーカーの試合は他ワーカーに移る
+LEASE_TTL = 30.0
+
+# モーメント処理権の有効期限 (秒)。公開/却下まで届かずに落ちたモーメントは、この後に再処理される
+MOMENT_CLAIM_TTL = 600.0
+
+# ワーカーがスケジュールを見直して担当試合を処理する間隔 (秒)
+POLL_INTERVAL = 20.0
+
+# コーディネーターがワーカーの死活を確認する間隔 (秒)
+MONITOR_INTERVAL = 5.0
+# ------------------------------------------------------------------
+
+# 試合終了後に処理済みとしてリースを固定するためのオーナー名
+DONE_OWNER = "__done__"
+
+
+class ShardStore:
+    """
+    SQLiteによる試合リースと公開済みモーメントの共有ストア。
+    各ワーカープロセスが自分用の接続を持つ。
+    """
+
+    def __init__(self, db_path=SHARD_DB_PATH):
+        self.conn = sqlite3.connect(db_path, timeout=10, isolation_level=None, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS workers (
+                worker_id TEXT PRIMARY KEY,
+                heartbeat_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS game_leases (
+                game_pk INTEGER PRIMARY KEY,
+                owner TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS claimed_moments (
+                moment_key TEXT PRIMARY KEY,
+                owner TEXT NOT NULL,
+                claimed_at REAL NOT NULL
+            );
+        """)
+        # done=0 の処理権は MOMENT_CLAIM_TTL で失効する (旧DBの行は処理済みとして扱う)
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(claimed_moments)")}
+        if "done" not in columns:
+            self.conn.execute("ALTER TABLE claimed_moments ADD COLUMN done INTEGER NOT NULL DEFAULT 1")
+
+    def heartbeat(self, worker_id, max_games=None):
+        """
+        生存を記録し、自分の試合リースを延長する。
+        max_games (公平な担当数) を超えて持っている試合はリースを手放し、他ワーカーへ回す。
+        """
+        now = time.time()
+        with self.lock:
+            self.conn.execute(
+                "INSERT INTO workers(worker_id, heartbeat_at) VALUES(?, ?) "
+                "ON CONFLICT(worker_id) DO UPDATE SET heartbeat_at=excluded.heartbeat_at",
+                (worker_id, now),
+            )
+            # 自分が持っている試合のリースも延長する
+            self.conn.execute(
+                "UPDATE game_leases SET expires_at=? WHERE owner=?",
+                (now + LEASE_TTL, worker_id),
+            )
+            if max_games is not None:
+                self.conn.execute(
+                    "DELETE FROM game_leases WHERE owner=? AND game_pk IN "
+                    "(SELECT game_pk FROM game_leases WHERE owner=? ORDER BY game_pk DESC LIMIT -1 OFFSET ?)",
+                    (worker_id, worker_id, max_games),
+                )
+
+    def live_worker_count(self):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT COUNT(*) FROM workers WHERE heartbeat_at >= ?",
+                (time.time() - LEASE_TTL,),
+            ).fetchone()
+        return max(1, row[0])
+
+    def owned_games(self, worker_id):
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT game_pk FROM game_leases WHERE owner=? AND expires_at >= ?",
+                (worker_id, time.time()),
+            ).fetchall()
+        return {r[0] for r in rows}
+
+    def try_claim_game(self, game_pk, worker_id):
+        """空き or 期限切れの試合リースを取得する。取得できたらTrue"""
+        now = time.time()
+        with self.lock:
+            self.conn.execute(
+                "INSERT INTO game_leases(game_pk, owner, expires_at) VALUES(?, ?, ?) "
+                "ON CONFLICT(game_pk) DO UPDATE SET owner=excluded.owner, expires_at=excluded.expires_at "
+                "WHERE game_leases.owner=excluded.owner OR "
+                "(game_leases.owner != ? AND game_leases.expires_at < ?)",
+                (game_pk, worker_id, now + LEASE_TTL, DONE_OWNER, now),
+            )
+            row = self.conn.execute("SELECT owner FROM game_leases WHERE game_pk=?", (game_pk,)).fetchone()
+        return row is not None and row[0] == worker_id
+
+    def mark_game_done(self, game_pk, worker_id):
+        with self.lock:
+            self.conn.execute(
+                "UPDATE game_leases SET owner=?, expires_at=? WHERE game_pk=? AND owner=?",
+                (DONE_OWNER, math.inf, game_pk, worker_id),
+            )
+
+    def claim_moment(self, moment_key, worker_id):
+        """
+        モーメントを処理する権利を取得する。処理済み or 他で処理中ならFalse。
+        処理中のまま MOMENT_CLAIM_TTL を過ぎた処理権 (AI呼び出し中に落ちた等) は取り直せる。
+        """
+        now = time.time()
+        with self.lock:
+            cur = self.conn.execute(
+                "INSERT INTO claimed_moments(moment_key, owner, claimed_at, done) VALUES(?, ?, ?, 0) "
+                "ON CONFLICT(moment_key) DO UPDATE SET owner=excluded.owner, claimed_at=excluded.claimed_at "
+                "WHERE claimed_moments.done = 0 AND claimed_moments.claimed_at < ?",
+                (moment_key, worker_id, now, now - MOMENT_CLAIM_TTL),
+            )
+        return cur.rowcount == 1
+
+    def finish_moment(self, moment_key, worker_id):
+        """公開 (または却下) まで届いたモーメントを処理済みにする。以降は二度と処理しない"""
+        with self.lock:
+            self.conn.execute(
+                "UPDATE claimed_moments SET done=1 WHERE moment_key=? AND owner=?",
+                (moment_key, worker_id),
+            )
+
+
+def _is_game_active(game, include_final):
+    state = game.get('status', {}).get('abstractGameState')
+    if state == 'Live':
+        return True
+    return include_final and state == 'Final'
+
+
+def run_worker(watcher_name, worker_id, db_path=SHARD_DB_PATH, include_final=False, target_date=None):
+    """
+    担当試合をリースで確保しながらパイプラインを回し続けるワーカー。
+    target_date を渡すとその日だけを (終了済みの試合も含めて) 処理する。省略時は監視モジュールの設定に従う。
+    """
+    watcher = importlib.import_module(f".{watcher_name}", __package__)
+    fixed_date = target_date or (watcher.TEST_TARGET_DATE if watcher.IS_TEST_MODE else None)
+    store = ShardStore(db_path)
+    if pipeline.USE_RELAY:
+        # 配信リレーはコーディネーターが1つだけ動かす。ワーカーはそこへ転送する
+        relay.use_forwarder()
+    stop = threading.Event()
+    # 公平な担当数 (スケジュールを見るたびに更新し、ハートビートで超過分を手放す)
+    share = {"games": None}
+    # 公開レート上限は周回をまたいで守る (パイプラインは周回ごとに作り直すが、まとめ役は使い回す)
+    moment_coalescer = coalescer.MomentCoalescer()
+
+    def beat():
+        while not stop.is_set():
+            store.heartbeat(worker_id, share["games"])
+            stop.wait(LEASE_TTL / 3)
+
+    threading.Thread(target=beat, daemon=True).start()
+    print(f"👷 ワーカー起動: {worker_id}")
+
+    try:
+        while True:
+            target_date = fixed_date or watcher.get_current_mlb_date()
+            try:
+                games = mlb_api.fetch_schedule_games(target_date)
+            except Exception as e:
+                # 取得失敗を「試合なし」と見なすと担当数0で全リースを手放してしまうので、次の周回を待つ
+                print(f"❌ [{worker_id}] 日程取得エラー: {e}")
+                time.sleep(POLL_INTERVAL)
+                continue
+
+            active = [g for g in games if _is_game_active(g, include_final or fixed_date is not None)]
+            fair_share = math.ceil(len(active) / store.live_worker_count()) if active else 0
+            share["games"] = fair_share
+
+            owned = store.owned_games(worker_id)
+            for game in active:
+                if len(owned) >= fair_share:
+                    break
+                if game['gamePk'] not in owned and store.try_claim_game(game['gamePk'], worker_id):
+                    owned.add(game['gamePk'])
+
+            mine = [g for g in active if g['gamePk'] in owned]
+            if mine:
+                print(f"🎯 [{worker_id}] 担当試合: {[g['gamePk'] for g in mine]}")
+                pipe = pipeline.HighlightPipeline(
+                    watcher,
+                    claim_moment=lambda m: store.claim_moment(m["moment_key"], worker_id),
+                    finish_moment=lambda key: store.finish_moment(key, worker_id),
+                    moment_coalescer=moment_coalescer,
+                )
+                pipe.run(mine)
+                for game in mine:
+                    if game.get('status', {}).get('abstractGameState') == 'Final':
+                        store.mark_game_done(game['gamePk'], worker_id)
+
+            time.sleep(POLL_INTERVAL)
+    finally:
+        stop.set()
+
+
+def run_coordinator(watcher_name, num_workers, db_path=SHARD_DB_PATH, include_final=False, target_date=None):
+    """N個のワーカープロセスを起動し、落ちたワーカーを再起動する"""
+    host = socket.gethostname()
+    procs = {}
+
+    def spawn(index):
+        worker_id = f"{host}-{os.getpid()}-w{index}-{int(time.time())}"
+        p = multiprocessing.Process(
+            target=run_worker, args=(watcher_name, worker_id, db_path, include_final, target_date), daemon=True
+        )
+        p.start()
+        procs[index] = p
+
+    print(f"🧭 コーディネーター起動: {watcher_name} × {num_workers}ワーカー (DB: {db_path})")
+    if pipeline.USE_RELAY:
+        # ファン向けのポートはここで1回だけ bind し、ワーカーからの転送を受け付ける
+        relay.get_relay(ingest_port=relay.RELAY_INGEST_PORT)
+    for i in range(num_workers):
+        spawn(i)
+
+    try:
+        while True:
+            time.sleep(MONITOR_INTERVAL)
+            for i, p in list(procs.items()):
+                if not p.is_alive():
+                    # 死んだワーカーのリースは LEASE_TTL 後に他ワーカーが引き継ぐ
+                    print(f"💀 ワーカー{i} 停止 (exit={p.exitcode})。再起動します")
+                    spawn(i)
+    except KeyboardInterrupt:
+        print("🛑 停止します")
+        for p in procs.values():
+            p.terminate()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="試合単位でシャーディングしたマルチプロセス監視")
+    parser.add_argument("--watcher", default="ai_watcher", help="使用する監視モジュール (ai_watcher / ai_watcher_claude)")
+    parser.add_argument("--workers", type=int, default=max(1, os.cpu_count() or 1))
+    parser.add_argument("--db", default=SHARD_DB_PATH)
+    parser.add_argument("--include-final", action="store_true", help="終了済みの試合も処理対象にする")
+    parser.add_argument("--date", metavar="YYYY-MM-DD", help="対象日 (省略時は監視モジュールの設定)")
+    args = parser.parse_args()
+    run_coordinator(args.watcher, args.workers, args.db, args.include_final, args.date)
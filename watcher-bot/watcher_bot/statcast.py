@@ -0,0 +1,95 @@
+import numpy as np
+
+# --- 🔧 設定エリア ------------------------------------------------
+# Statcast 閾値ルール (上から優先。1プレイにつき最初に当たったルールだけ採用)
+# metric: exit_velo (打球速度 mph) / distance (飛距離 ft) / launch_angle (打球角度) / pitch_speed (球速 mph)
+# role:   batter なら打者、pitcher なら投手が監視対象の時に発火
+# events: 対象イベント (None なら全イベント)
+STATCAST_RULES = [
+    {"name": "hr_480ft", "metric": "distance", "min": 480.0, "role": "batter",
+     "events": ["Home Run"], "moment_type": "RECORD_BREAK", "label": "飛距離 {value:.0f} ft の特大弾"},
+    {"name": "exit_velo_120", "metric": "exit_velo", "min": 120.0, "role": "batter",
+     "events": None, "moment_type": "RECORD_BREAK", "label": "打球速度 {value:.1f} mph"},
+    {"name": "hr_450ft", "metric": "distance", "min": 450.0, "role": "batter",
+     "events": ["Home Run"], "moment_type": "BIG_PLAY", "label": "飛距離 {value:.0f} ft"},
+    {"name": "exit_velo_115", "metric": "exit_velo", "min": 115.0, "role": "batter",
+     "events": None, "moment_type": "BIG_PLAY", "label": "打球速度 {value:.1f} mph"},
+    {"name": "k_100mph", "metric": "pitch_speed", "min": 100.0, "role": "pitcher",
+     "events": ["Strikeout", "Strikeout Double Play"], "moment_type": "BIG_PLAY", "label": "{value:.1f} mph で三振"},
+]
+# ------------------------------------------------------------------
+
+METRICS = ("exit_velo", "distance", "launch_angle", "pitch_speed")
+
+
+def extract_play_metrics(all_plays):
+    """
+    allPlays の playEvents/hitData/pitchData から指標を取り出し、プレイ順の配列にまとめる。
+    値が無いものは NaN。
+    """
+    n = len(all_plays)
+    batter_id = np.zeros(n, dtype=np.int64)
+    pitcher_id = np.zeros(n, dtype=np.int64)
+    metrics = {name: np.full(n, np.nan) for name in METRICS}
+    events = []
+
+    for i, play in enumerate(all_plays):
+        matchup = play.get('matchup', {})
+        batter_id[i] = matchup.get('batter', {}).get('id') or 0
+        pitcher_id[i] = matchup.get('pitcher', {}).get('id') or 0
+        events.append(play.get('result', {}).get('event', ''))
+
+        last_pitch = None
+        for ev in play.get('playEvents', []):
+            hit = ev.get('hitData')
+            if hit:
+                metrics["exit_velo"][i] = hit.get('launchSpeed', np.nan)
+                metrics["distance"][i] = hit.get('totalDistance', np.nan)
+                metrics["launch_angle"][i] = hit.get('launchAngle', np.nan)
+            if ev.get('isPitch'):
+                last_pitch = ev
+        if last_pitch:
+            metrics["pitch_speed"][i] = last_pitch.get('pitchData', {}).get('startSpeed', np.nan)
+
+    return {
+        "batter_id": batter_id,
+        "pitcher_id": pitcher_id,
+        "event": np.array(events, dtype=object),
+        **metrics,
+    }
+
+
+def evaluate_rules(arrays, watch_ids, rules=None):
+    """
+    全プレイ × 全ルールを配列演算で評価する。
+    戻り値: {プレイ番号: (ルール, 指標値, 選手ID)}
+    """
+    rules = STATCAST_RULES if rules is None else rules
+    n = len(arrays["event"])
+    if n == 0:
+        return {}
+
+    watch_arr = np.fromiter(watch_ids, dtype=np.int64)
+    watched = {
+        "batter": np.isin(arrays["batter_id"], watch_arr),
+        "pitcher": np.isin(arrays["pitcher_id"], watch_arr),
+    }
+    taken = np.zeros(n, dtype=bool)
+    hits = {}
+
+    for rule in rules:
+        values = arrays[rule["metric"]]
+        with np.errstate(invalid="ignore"):
+            mask = watched[rule["role"]] & (values >= rule["min"]) & ~taken
+        if rule.get("events"):
+            mask &= np.isin(arrays["event"], rule["events"])
+        for i in np.flatnonzero(mask):
+            player_id = arrays[f"{rule['role']}_id"][i]
+            hits[int(i)] = (rule, float(values[i]), int(player_id))
+        taken |= mask
+    return hits
+
+
+def detect_statcast_moments(all_plays, watch_ids, rules=None):
+    """1試合分のプレイから Statcast 閾値を超えたプレイを返す"""
+    return evaluate_rules(extract_play_metrics(all_plays), watch_ids, rules)